@@ -3,6 +3,13 @@ ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Run with uvicorn workers under gunicorn:
+
+    gunicorn config.asgi -k uvicorn_worker.UvicornWorker
+
+Read-only endpoints and the contact forms are then served by the async views
+from web/async_views.py (set ASYNC_VIEWS=False to keep the sync ones).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
@@ -12,5 +19,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+os.environ.setdefault('ASYNC_VIEWS', 'True')
 
 application = get_asgi_application()
@@ -1,7 +1,6 @@
 import os
 from pathlib import Path
-from decouple import config
-from datetime import timedelta
+from decouple import Csv, config
 import dj_database_url
 
 INSTALLED_APPS = [
@@ -37,6 +36,26 @@ ALLOWED_HOSTS = ['*']
 
 TELEGRAM_BOT_TOKEN = config('TELEGRAM_BOT_TOKEN')
 TELEGRAM_CHAT_ID = config('TELEGRAM_CHAT_ID')
+TELEGRAM_API_URL = config('TELEGRAM_API_URL', default='https://api.telegram.org')
+TELEGRAM_TIMEOUT = (
+    config('TELEGRAM_CONNECT_TIMEOUT', default=3.05, cast=float),
+    config('TELEGRAM_READ_TIMEOUT', default=15, cast=float),
+)
+TELEGRAM_POOL_SIZE = config('TELEGRAM_POOL_SIZE', default=4, cast=int)
+TELEGRAM_BATCH_WINDOW = config('TELEGRAM_BATCH_WINDOW', default=5, cast=int)
+TELEGRAM_RATE_PER_MINUTE = config('TELEGRAM_RATE_PER_MINUTE', default=20, cast=int)
+
+# Уведомления о заявках (web/outbox.py): 'celery' - передать дайджест задачам
+# send_telegram_*, которые сами отмечают доставленные строки, 'direct' -
+# отправить из диспетчера.
+OUTBOX_DELIVERY = config('OUTBOX_DELIVERY', default='celery')
+OUTBOX_DISPATCH_INTERVAL = config('OUTBOX_DISPATCH_INTERVAL', default=TELEGRAM_BATCH_WINDOW, cast=int)
+OUTBOX_BATCH_SIZE = config('OUTBOX_BATCH_SIZE', default=100, cast=int)
+OUTBOX_MAX_ATTEMPTS = config('OUTBOX_MAX_ATTEMPTS', default=10, cast=int)
+# Сколько секунд пачка принадлежит диспетчеру, забравшему ее; должно покрывать
+# отправку пачки, в режиме 'celery' - вместе с повторами задач send_telegram_*.
+OUTBOX_CLAIM_TIMEOUT = config('OUTBOX_CLAIM_TIMEOUT', default=10 * 60, cast=int)
+OUTBOX_RETENTION_DAYS = config('OUTBOX_RETENTION_DAYS', default=30, cast=int)
 
 
 
@@ -49,10 +68,19 @@ REST_FRAMEWORK = {
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+    'DEFAULT_THROTTLE_RATES': {
+        # Новые загрузки частями с одного адреса (UploadCreateView).
+        'uploads': config('UPLOAD_THROTTLE_RATE', default='20/hour'),
+    },
 }
 
 MIDDLEWARE = [
+    'web.metrics.MetricsMiddleware',
+    'web.logs.RequestContextMiddleware',
+    'web.replicas.ReplicaMiddleware',
+    'web.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -84,10 +112,43 @@ TEMPLATES = [
 WSGI_APPLICATION = 'config.wsgi.application'
 
 
+# Соединение с БД живет между запросами DB_CONN_MAX_AGE секунд (0 - закрывать
+# после каждого запроса) и проверяется перед повторным использованием.
+# DB_PGBOUNCER - подключение через pgbouncer в режиме transaction pooling:
+# серверные курсоры отключены, большие выборки читаются пачками по ключу
+# (web.db.scan). Замер: manage.py benchmark_db_connections.
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=60, cast=int)
+DB_PGBOUNCER = config('DB_PGBOUNCER', default=False, cast=bool)
+
 DATABASES = {
-    'default': dj_database_url.config(default=os.environ.get('DATABASE_URL'))
+    'default': dj_database_url.config(
+        default=os.environ.get('DATABASE_URL'),
+        conn_max_age=DB_CONN_MAX_AGE,
+        conn_health_checks=DB_CONN_MAX_AGE > 0,
+        disable_server_side_cursors=DB_PGBOUNCER,
+    )
 }
 
+# Реплики только для чтения (URL через запятую), на них идут чтения безопасных
+# запросов (web/replicas.py). После записи клиент REPLICA_STICKY_SECONDS читает
+# из default; реплика с отставанием больше REPLICA_MAX_LAG секунд пропускается.
+REPLICA_DATABASE_URLS = config('REPLICA_DATABASE_URLS', default='', cast=Csv())
+for index, url in enumerate(REPLICA_DATABASE_URLS, start=1):
+    DATABASES[f'replica{index}'] = {
+        **dj_database_url.parse(
+            url,
+            conn_max_age=DB_CONN_MAX_AGE,
+            conn_health_checks=DB_CONN_MAX_AGE > 0,
+            disable_server_side_cursors=DB_PGBOUNCER,
+        ),
+        'TEST': {'MIRROR': 'default'},
+    }
+REPLICA_DATABASES = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['web.replicas.ReplicaRouter']
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=5, cast=int)
+REPLICA_MAX_LAG = config('REPLICA_MAX_LAG', default=5, cast=float)
+REPLICA_LAG_CHECK_INTERVAL = config('REPLICA_LAG_CHECK_INTERVAL', default=5, cast=float)
+
 # DATABASES = {
 #     'default': {
 #         'ENGINE': 'django.db.backends.postgresql',
@@ -99,12 +160,172 @@ DATABASES = {
 #     }
 # }
 
+CACHE_URL = config('CACHE_URL', default=os.environ.get('REDIS_URL', ''))
+
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': CACHE_URL,
+            'OPTIONS': {
+                'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+                'IGNORE_EXCEPTIONS': True,
+            },
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'navis-default',
+        }
+    }
+
+# Асинхронные view из web/async_views.py; config/asgi.py включает их по умолчанию.
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
+
+# /metrics требует заголовок Authorization: Bearer <токен>; без токена
+# эндпоинт открыт только при DEBUG.
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# Логи - JSON-строки в stdout из фонового потока (web/logs.py). INFO-записи
+# запросов попадают в лог с долей LOG_SAMPLE_RATE, для частых чтений - реже.
+LOG_LEVEL = config('LOG_LEVEL', default='INFO')
+LOG_SAMPLE_RATE = config('LOG_SAMPLE_RATE', default=1.0, cast=float)
+LOG_SAMPLE_RATES = {
+    'event_detail': 0.1,
+    'service_detail': 0.1,
+    'vacancy_detail': 0.1,
+    'tools_detail': 0.1,
+}
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'web.logs.JSONFormatter'},
+    },
+    'filters': {
+        'sample': {'()': 'web.logs.RouteSampleFilter', 'rates': LOG_SAMPLE_RATES, 'default': LOG_SAMPLE_RATE},
+    },
+    'handlers': {
+        'background': {
+            'class': 'web.logs.BackgroundHandler',
+            'formatter': 'json',
+            'filters': ['sample'],
+        },
+    },
+    'root': {'handlers': ['background'], 'level': 'WARNING'},
+    'loggers': {
+        'web': {'level': LOG_LEVEL},
+        'django': {'level': 'INFO'},
+    },
+}
+
+API_CACHE_TIMEOUT = config('API_CACHE_TIMEOUT', default=60 * 60, cast=int)
+
+# Ответы меньше этого размера (байт) не сжимаются: выигрыш меньше накладных расходов.
+COMPRESSION_MIN_SIZE = config('COMPRESSION_MIN_SIZE', default=1024, cast=int)
+
+# Документ /api/home/: записей в секции и задержка пересборки после правки, с.
+HOME_SECTION_SIZE = config('HOME_SECTION_SIZE', default=6, cast=int)
+HOME_REBUILD_DELAY = config('HOME_REBUILD_DELAY', default=5, cast=int)
+
+# Статический снимок публичного API (web/snapshots.py). Пустой SNAPSHOT_ROOT
+# отключает публикацию по сохранению. SNAPSHOT_HOST обязателен для публикации
+# (от него строятся абсолютные ссылки в снимке) и должен быть в ALLOWED_HOSTS.
+SNAPSHOT_ROOT = config('SNAPSHOT_ROOT', default='')
+SNAPSHOT_HOST = config('SNAPSHOT_HOST', default='')
+SNAPSHOT_SECURE = config('SNAPSHOT_SECURE', default=True, cast=bool)
+SNAPSHOT_KEEP = config('SNAPSHOT_KEEP', default=3, cast=int)
+SNAPSHOT_DELAY = config('SNAPSHOT_DELAY', default=30, cast=int)
+
 CELERY_BROKER_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379')
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
+# Логи воркера идут через LOGGING, Celery не заменяет обработчики root.
+CELERY_WORKER_HIJACK_ROOT_LOGGER = False
+
+# Очереди и воркеры описаны в web/celery.py и Procfile. Задача подтверждается
+# после выполнения; если воркер умер, Redis вернет ее в очередь через
+# visibility_timeout (он должен быть больше самого длинного countdown/retry).
+CELERY_TASK_DEFAULT_QUEUE = 'default'
+CELERY_TASK_ROUTES = {
+    'web.utils.dispatch_outbox': {'queue': 'notifications'},
+    'web.utils.send_telegram_*': {'queue': 'notifications'},
+    'web.utils.generate_image_derivatives': {'queue': 'media'},
+    'web.utils.render_rich_text': {'queue': 'media'},
+    'web.utils.rebuild_home_document': {'queue': 'maintenance'},
+    'web.utils.publish_snapshot': {'queue': 'maintenance'},
+    'web.utils.purge_outbox': {'queue': 'maintenance'},
+    'web.utils.purge_uploads': {'queue': 'maintenance'},
+}
+CELERY_TASK_ACKS_LATE = True
+CELERY_TASK_REJECT_ON_WORKER_LOST = True
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'visibility_timeout': config('CELERY_VISIBILITY_TIMEOUT', default=60 * 60, cast=int),
+}
+# С acks_late воркер не должен держать в резерве задачи, которые мог бы взять свободный.
+CELERY_WORKER_PREFETCH_MULTIPLIER = config('CELERY_WORKER_PREFETCH_MULTIPLIER', default=1, cast=int)
+# Результаты задач никто не читает, backend результатов не настроен.
+CELERY_TASK_IGNORE_RESULT = True
+# Лимиты действуют на каждый воркер; общий лимит Telegram - web.telegram.get_rate_limiter().
+CELERY_TASK_ANNOTATIONS = {
+    'web.utils.send_telegram_digest': {'rate_limit': f'{TELEGRAM_RATE_PER_MINUTE}/m'},
+    'web.utils.send_telegram_documents': {'rate_limit': f'{TELEGRAM_RATE_PER_MINUTE}/m'},
+    'web.utils.generate_image_derivatives': {'rate_limit': config('CELERY_MEDIA_RATE_LIMIT', default='60/m')},
+    'web.utils.publish_snapshot': {'rate_limit': '2/m'},
+}
+# Периодические задачи запускает процесс beat из Procfile. Просроченный запуск
+# диспетчера outbox отбрасывается: следующий все равно заберет всю очередь.
+CELERY_BEAT_SCHEDULE = {
+    'dispatch-outbox': {
+        'task': 'web.utils.dispatch_outbox',
+        'schedule': OUTBOX_DISPATCH_INTERVAL,
+        'options': {'expires': OUTBOX_DISPATCH_INTERVAL},
+    },
+    'purge-outbox': {
+        'task': 'web.utils.purge_outbox',
+        'schedule': 24 * 60 * 60,
+    },
+    'purge-uploads': {
+        'task': 'web.utils.purge_uploads',
+        'schedule': 60 * 60,
+    },
+}
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = config('MEDIA_ROOT', default=str(BASE_DIR / 'media'))
+# Срок кэширования загруженных файлов, с (имена загрузок не переиспользуются).
+MEDIA_MAX_AGE = config('MEDIA_MAX_AGE', default=60 * 60 * 24 * 365, cast=int)
+# Вложения заявок (contacts/ и загрузки частями resumable/) отдаются только по
+# подписанным ссылкам (web/media.py). Картинки CKEditor (uploads/) публичные.
+MEDIA_PRIVATE_PREFIXES = ('contacts/', 'resumable/')
+MEDIA_SIGNED_URL_MAX_AGE = config('MEDIA_SIGNED_URL_MAX_AGE', default=60 * 60, cast=int)
+# Внутренний location nginx для X-Accel-Redirect, например /protected-media/.
+# Пустое значение - файлы отдает Django.
+MEDIA_ACCEL_REDIRECT = config('MEDIA_ACCEL_REDIRECT', default='')
+
+IMAGE_DERIVATIVE_WIDTHS = (320, 640, 1280)
+IMAGE_DERIVATIVE_FORMATS = ('webp', 'jpeg')
+IMAGE_DERIVATIVE_QUALITY = config('IMAGE_DERIVATIVE_QUALITY', default=80, cast=int)
+
+# Длина текстового анонса RichText-полей (content_excerpt).
+RICH_TEXT_EXCERPT_LENGTH = 300
+
+PHONE_CACHE_SIZE = config('PHONE_CACHE_SIZE', default=4096, cast=int)
+PHONE_BULK_LIMIT = 10000
+
+# Загрузки частями лежат отдельно от CKEDITOR_UPLOAD_PATH: это вложения заявок.
+UPLOAD_PARTIAL_DIR = 'resumable/partial'
+UPLOAD_BUFFER_SIZE = 64 * 1024
+# Брошенные и неприкрепленные загрузки удаляет задача purge_uploads.
+UPLOAD_TTL = config('UPLOAD_TTL', default=24 * 60 * 60, cast=int)
+UPLOAD_MAX_PENDING_SIZE = config('UPLOAD_MAX_PENDING_SIZE', default=500 * 1024 * 1024, cast=int)
+UPLOAD_CHUNK_TIMEOUT = config('UPLOAD_CHUNK_TIMEOUT', default=10 * 60, cast=int)
+# Лимит тела multipart-запроса формы заявки: вложение 5 МБ плюс поля формы.
+CONTACT_FORM_MAX_SIZE = config('CONTACT_FORM_MAX_SIZE', default=5 * 1024 * 1024 + 64 * 1024, cast=int)
+
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
 
 CKEDITOR_UPLOAD_PATH = "uploads/"
 CKEDITOR_CONFIGS = {
@@ -160,4 +381,13 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
+# collectstatic пишет файлы с хешем в имени и сжатые копии .gz/.br,
+# WhiteNoise отдает их с Cache-Control на год.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+}
+# Без собранного манифеста (тесты, разработка) отдаются исходные имена.
+WHITENOISE_MANIFEST_STRICT = False
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -1,13 +1,17 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
-from django.conf.urls.static import static
 from django.views.generic import RedirectView
 
+from web.media import serve as serve_media
+from web.metrics import metrics_view
+
 
 urlpatterns = [
     path('', RedirectView.as_view(url='/api/swagger/', permanent=False)),
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     path('api/', include('web.urls')),
-    path("ckeditor/", include("ckeditor_uploader.urls"))
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    path("ckeditor/", include("ckeditor_uploader.urls")),
+    re_path(r'^%s(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'), serve_media, name='media'),
+]
\ No newline at end of file
@@ -1,12 +1,27 @@
 from django.contrib import admin
+from django.utils.html import format_html
+
+from .media import signed_url
 from .models import (
     Contact, YouTubeShort, Event, EventImage, Services, Vacancy,
-    Project, Review, About, Gallery, Tools, ToolImage, ContactVacancy
+    Project, Review, About, Gallery, Tools, ToolImage, ContactVacancy, OutboxMessage
 )
 
 
+class AttachmentAdminMixin:
+    """Вложение заявки ссылкой с подписью: сами файлы закрыты (web/media.py)."""
+    exclude = ('file',)
+    readonly_fields = ('attachment',)
+
+    @admin.display(description='Файл')
+    def attachment(self, obj):
+        if not obj.file:
+            return '-'
+        return format_html('<a href="{}" target="_blank">{}</a>', signed_url(obj.file.name), obj.file.name)
+
+
 @admin.register(Contact)
-class ContactAdmin(admin.ModelAdmin):
+class ContactAdmin(AttachmentAdminMixin, admin.ModelAdmin):
     list_display = ('name', 'email', 'phone', 'created_at')
     search_fields = ('name', 'email', 'phone')
 
@@ -21,6 +36,11 @@ class EventImageInline(admin.TabularInline):
     model = Event.gallery.through
     extra = 1
 
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'eventimage':
+            kwargs['queryset'] = EventImage.objects.select_related('event')
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
 
 @admin.register(Event)
 class EventAdmin(admin.ModelAdmin):
@@ -32,6 +52,7 @@ class EventAdmin(admin.ModelAdmin):
 @admin.register(EventImage)
 class EventImageAdmin(admin.ModelAdmin):
     list_display = ('event',)
+    list_select_related = ('event',)
     search_fields = ('event__title',)
 
 
@@ -58,6 +79,7 @@ class ProjectAdmin(admin.ModelAdmin):
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
     list_display = ('author', 'created_at')
+    list_select_related = ('author',)
     search_fields = ('author__username', 'text')
 
 
@@ -70,6 +92,7 @@ class AboutAdmin(admin.ModelAdmin):
 @admin.register(Gallery)
 class GalleryAdmin(admin.ModelAdmin):
     list_display = ('title', 'related_service', 'related_project', 'created_at')
+    list_select_related = ('related_service', 'related_project')
     search_fields = ('title',)
 
 
@@ -82,10 +105,19 @@ class ToolsAdmin(admin.ModelAdmin):
 @admin.register(ToolImage)
 class ToolImageAdmin(admin.ModelAdmin):
     list_display = ('tool', 'created_at')
+    list_select_related = ('tool',)
     search_fields = ('tool__name',)
 
 
 @admin.register(ContactVacancy)
-class ContactVacancyAdmin(admin.ModelAdmin):
+class ContactVacancyAdmin(AttachmentAdminMixin, admin.ModelAdmin):
     list_display = ('name', 'email', 'phone','link' ,'created_at')
     search_fields = ('name', 'email', 'phone')
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ('id', 'created_at', 'sent_at', 'attempts', 'last_error')
+    list_filter = (('sent_at', admin.EmptyFieldListFilter),)
+    search_fields = ('message', 'last_error')
+    readonly_fields = ('created_at',)
@@ -0,0 +1,262 @@
+"""
+Асинхронные варианты публичных view для запуска под ASGI (ASYNC_VIEWS=True).
+
+Отдают те же данные, что и DRF-view из views.py: кэш и условные GET через
+web.cache, пагинация через StandardResultsSetPagination, сериализация теми же
+сериализаторами. Запросы к БД идут через асинхронный ORM, поэтому ожидание
+Postgres или Redis не занимает воркер целиком.
+"""
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404, HttpResponseNotModified, JsonResponse
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.request import Request
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import metrics, outbox, uploads
+from .cache import fill_source, is_not_modified, response_key, response_validators
+from .models import (
+    Event, EventImage, Services, Vacancy, Project, Contact, YouTubeShort,
+    About, Gallery, Tools, ToolImage, ContactVacancy
+)
+from .pagination import StandardResultsSetPagination
+from .serializers import (
+    narrow_queryset,
+    EventSerializer, ServicesSerializer, VacancySerializer, ProjectSerializer,
+    ContactSerializer, ContactVacancySerializer, YouTubeShortSerializer,
+    AboutSerializer, GallerySerializer, ToolsSerializer
+)
+from .utils import contact_message, contact_vacancy_message
+
+
+logger = logging.getLogger(__name__)
+
+
+def json_response(data, status=status.HTTP_200_OK, headers=None):
+    return JsonResponse(
+        data, status=status, headers=headers, safe=False,
+        encoder=JSONEncoder, json_dumps_params={'ensure_ascii': False},
+    )
+
+
+def error_response(exc):
+    return json_response({'detail': exc.detail}, status=exc.status_code)
+
+
+class AsyncAPIView(View):
+    queryset = None
+    serializer_class = None
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Как APIView.as_view: публичные формы шлют без CSRF-токена, сессионной
+        # аутентификации у API нет. csrf_exempt в Django 4.2 не умеет async
+        # view, поэтому флаг ставится напрямую.
+        view = super().as_view(**initkwargs)
+        view.csrf_exempt = True
+        return view
+
+    def get_queryset(self):
+        return self.queryset.all()
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        except Http404:
+            return error_response(NotFound())
+        except APIException as exc:
+            return error_response(exc)
+
+
+class AsyncCachedView(AsyncAPIView):
+    """GET с тем же кэшем ответов и ETag/Last-Modified, что и cache_response."""
+    cache_models = ()
+
+    async def get(self, request, *args, **kwargs):
+        etag, last_modified, headers = await sync_to_async(response_validators)(self, request, self.cache_models)
+        if is_not_modified(request, etag, last_modified):
+            metrics.record_cache(self, 'not_modified')
+            return HttpResponseNotModified(headers=headers)
+
+        key = response_key(self, etag)
+        data = await cache.aget(key)
+        if data is None:
+            metrics.record_cache(self, 'miss')
+            with fill_source(last_modified):
+                data = await self.get_data(request, *args, **kwargs)
+            await cache.aset(key, data, settings.API_CACHE_TIMEOUT)
+        else:
+            metrics.record_cache(self, 'hit')
+        return json_response(data, headers=headers)
+
+
+class AsyncListView(AsyncCachedView):
+    pagination_class = StandardResultsSetPagination
+
+    async def get_data(self, request):
+        request = Request(request)
+        context = {'request': request}
+        queryset = narrow_queryset(self.get_queryset(), self.serializer_class(many=True, context=context))
+        if self.pagination_class is None:
+            return self.serializer_class([row async for row in queryset], many=True, context=context).data
+
+        paginator = self.pagination_class()
+        rows = await paginator.apaginate_queryset(queryset, request, view=self)
+        data = self.serializer_class(rows, many=True, context=context).data
+        return paginator.get_paginated_response(data).data
+
+
+class AsyncDetailView(AsyncCachedView):
+    lookup_field = 'pk'
+
+    async def get_data(self, request, **kwargs):
+        try:
+            instance = await self.get_queryset().aget(**{self.lookup_field: kwargs[self.lookup_field]})
+        except self.queryset.model.DoesNotExist:
+            raise Http404
+        return self.serializer_class(instance).data
+
+
+class EventListView(AsyncListView):
+    cache_models = (Event, EventImage)
+    queryset = Event.objects.prefetch_related('gallery').order_by('created_at')
+    serializer_class = EventSerializer
+
+
+class EventDetailView(AsyncDetailView):
+    cache_models = (Event, EventImage)
+    queryset = Event.objects.prefetch_related('gallery')
+    serializer_class = EventSerializer
+
+
+class ServicesListView(AsyncListView):
+    cache_models = (Services,)
+    queryset = Services.objects.order_by('created_at')
+    serializer_class = ServicesSerializer
+
+
+class ServicesDetailView(AsyncDetailView):
+    cache_models = (Services,)
+    queryset = Services.objects.all()
+    serializer_class = ServicesSerializer
+
+
+class VacancyListView(AsyncListView):
+    cache_models = (Vacancy,)
+    queryset = Vacancy.objects.order_by('created_at')
+    serializer_class = VacancySerializer
+
+
+class VacancyDetailView(AsyncDetailView):
+    cache_models = (Vacancy,)
+    queryset = Vacancy.objects.all()
+    serializer_class = VacancySerializer
+
+
+class ProjectListView(AsyncListView):
+    cache_models = (Project,)
+    queryset = Project.objects.order_by('created_at')
+    serializer_class = ProjectSerializer
+
+
+class ProjectDetailView(AsyncDetailView):
+    cache_models = (Project,)
+    queryset = Project.objects.all()
+    serializer_class = ProjectSerializer
+
+
+class YouTubeShortListView(AsyncListView):
+    cache_models = (YouTubeShort,)
+    queryset = YouTubeShort.objects.order_by('created_at')
+    serializer_class = YouTubeShortSerializer
+
+
+class GalleryListView(AsyncListView):
+    cache_models = (Gallery, Services, Project)
+    queryset = Gallery.objects.select_related('related_service', 'related_project').order_by('created_at')
+    serializer_class = GallerySerializer
+
+
+class ToolsListView(AsyncListView):
+    cache_models = (Tools, ToolImage)
+    queryset = Tools.objects.prefetch_related('images').order_by('created_at')
+    serializer_class = ToolsSerializer
+
+
+class ToolsDetailView(AsyncDetailView):
+    cache_models = (Tools, ToolImage)
+    queryset = Tools.objects.prefetch_related('images')
+    serializer_class = ToolsSerializer
+
+
+class AboutListView(AsyncListView):
+    cache_models = (About,)
+    queryset = About.objects.order_by('created_at')
+    serializer_class = AboutSerializer
+
+
+class SubmissionView(AsyncAPIView):
+    """
+    Список и создание заявок. Тело запроса ASGI-сервер дочитывает до вызова
+    view, проверка и сохранение заявки вместе с ее уведомлением в outbox
+    идут в потоке и не блокируют цикл событий.
+    """
+    build_message = None
+
+    async def get(self, request):
+        request = Request(request)
+        context = {'request': request}
+        queryset = narrow_queryset(self.get_queryset(), self.serializer_class(many=True, context=context))
+        paginator = StandardResultsSetPagination()
+        rows = await paginator.apaginate_queryset(queryset, request, view=self)
+        data = self.serializer_class(rows, many=True, context=context).data
+        return json_response(paginator.get_paginated_response(data).data)
+
+    async def post(self, request):
+        uploads.check_content_length(request, settings.CONTACT_FORM_MAX_SIZE)
+        data = request.POST.copy()
+        data.update(request.FILES)
+        serializer = self.serializer_class(data=data, context={'request': Request(request)})
+        if not await sync_to_async(serializer.is_valid)():
+            return json_response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        contact = await sync_to_async(outbox.save_with_notification)(serializer, self.build_message)
+        logger.info("Создана заявка %s %s", self.queryset.model.__name__, contact.pk)
+        return json_response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class ContactView(SubmissionView):
+    queryset = Contact.objects.order_by('created_at')
+    serializer_class = ContactSerializer
+    build_message = staticmethod(contact_message)
+
+
+class ContactVacancyView(SubmissionView):
+    queryset = ContactVacancy.objects.order_by('created_at')
+    serializer_class = ContactVacancySerializer
+    build_message = staticmethod(contact_vacancy_message)
+
+
+# Имена маршрутов из web/urls.py, которые в режиме ASGI обслуживаются этими view.
+ASYNC_VIEWS = {
+    'event_list': EventListView,
+    'event_detail': EventDetailView,
+    'service_list': ServicesListView,
+    'service_detail': ServicesDetailView,
+    'vacancy_list': VacancyListView,
+    'vacancy_detail': VacancyDetailView,
+    'project_list': ProjectListView,
+    'project_detail': ProjectDetailView,
+    'youtube_shorts': YouTubeShortListView,
+    'gallery_list': GalleryListView,
+    'tools_list': ToolsListView,
+    'tools_detail': ToolsDetailView,
+    'about_list': AboutListView,
+    'contact_create': ContactView,
+    'contact_vacancy_create': ContactVacancyView,
+}
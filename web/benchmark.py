@@ -0,0 +1,172 @@
+"""
+Бенчмарк всех маршрутов web/urls.py внутри процесса через APIClient.
+
+Для каждого маршрута снимаются перцентили задержки, число SQL-запросов и
+размер ответа; результат сохраняется в JSON и сравнивается с базовой
+линией, чтобы замедления и лишние запросы ловились до продакшена.
+"""
+import json
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from .loadtest import percentile
+from .models import Event, Services, Vacancy, Project, Tools, Upload
+
+
+# Маршруты, которые не относятся к API и не измеряются.
+SKIPPED_ROUTES = {'schema-swagger-ui', 'schema-redoc'}
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+def first_pk(model):
+    return model.objects.order_by('pk').values_list('pk', flat=True).first()
+
+
+def contact_form(index):
+    return {'name': 'Клиент', 'email': f'bench{index}@example.com', 'message': 'Нужен сайт', 'phone': '+996700123456'}
+
+
+def vacancy_form(index):
+    return {'name': 'Кандидат', 'email': f'bench{index}@example.com', 'link': 'https://linkedin.com/in/bench', 'phone': '+996700123456'}
+
+
+# имя маршрута -> (метод, kwargs для reverse, данные запроса, нужен ли staff)
+ROUTES = {
+    'event_list': ('get', {}, None, False),
+    'event_detail': ('get', lambda: {'pk': first_pk(Event)}, None, False),
+    'service_list': ('get', {}, None, False),
+    'service_detail': ('get', lambda: {'pk': first_pk(Services)}, None, False),
+    'vacancy_list': ('get', {}, None, False),
+    'vacancy_detail': ('get', lambda: {'pk': first_pk(Vacancy)}, None, False),
+    'project_list': ('get', {}, None, False),
+    'project_detail': ('get', lambda: {'pk': first_pk(Project)}, None, False),
+    'project_filter': ('get', {}, {'is_featured': 'true'}, False),
+    'project_search': ('get', {}, {'q': 'приложение'}, False),
+    'contact_create': ('post', {}, contact_form, False),
+    'contact_vacancy_create': ('post', {}, vacancy_form, False),
+    'contact_export': ('get', {}, {'date_from': '2000-01-01'}, True),
+    'contact_vacancy_export': ('get', {}, {'format': 'ndjson'}, True),
+    'phone_validate': ('post', {}, lambda index: {'phones': ['0700123456', '+996 555 123 456', '123'] * 100}, True),
+    'upload_create': ('post', {}, lambda index: {'filename': 'cv.pdf', 'size': 1024}, False),
+    'upload_detail': ('head', lambda: {'pk': Upload.objects.values_list('pk', flat=True).first()}, None, False),
+    'review_list_create': ('get', {}, None, False),
+    'youtube_shorts': ('get', {}, None, False),
+    'gallery_list': ('get', {}, None, False),
+    'tools_list': ('get', {}, None, False),
+    'tools_detail': ('get', lambda: {'pk': first_pk(Tools)}, None, False),
+    'about_list': ('get', {}, None, False),
+    'home': ('get', {}, None, False),
+    'search': ('get', {}, {'q': 'мобильное приложение'}, False),
+}
+
+# Формы заявок принимают только multipart, остальные POST - JSON.
+MULTIPART_ROUTES = {'contact_create', 'contact_vacancy_create'}
+
+# Дополнительные варианты запросов к уже перечисленным маршрутам: (маршрут, метод, параметры).
+VARIANTS = {
+    'event_list:deep_page': ('event_list', 'get', {'page': 50}),
+    'event_list:cursor': ('event_list', 'get', {'cursor': ''}),
+    'contact_create:list': ('contact_create', 'get', {'page': 100}),
+    'review_list_create:uncounted': ('review_list_create', 'get', {'page': 100, 'count': 'false'}),
+    'gallery_list:cursor': ('gallery_list', 'get', {'cursor': '', 'page_size': 100}),
+}
+
+
+def read_body(response):
+    if response.streaming:
+        return b''.join(response.streaming_content)
+    return response.content
+
+
+def measure(client, method, url, data, iterations, warm, request_format='json'):
+    """Выполняет запрос iterations раз; без warm кэш ответов сбрасывается перед каждым."""
+    latencies, queries, sizes, status = [], [], [], None
+    for index in range(iterations):
+        if not warm:
+            cache.clear()
+        payload = data(index) if callable(data) else data
+        kwargs = {'format': request_format} if method == 'post' else {}
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = getattr(client, method)(url, payload, **kwargs)
+            body = read_body(response)
+            latencies.append(time.perf_counter() - started)
+        status = response.status_code
+        if status >= 500:
+            # Время страницы ошибки - не то, что нужно класть в базовую линию.
+            raise BenchmarkError(f"{method.upper()} {url}: {status}")
+        queries.append(len(captured))
+        sizes.append(len(body))
+
+    return {
+        'status': status,
+        'p50': percentile(latencies, 0.50) * 1000,
+        'p95': percentile(latencies, 0.95) * 1000,
+        'p99': percentile(latencies, 0.99) * 1000,
+        'mean': statistics.fmean(latencies) * 1000,
+        'queries': max(queries),
+        'bytes': max(sizes),
+    }
+
+
+def run(iterations=20, warm=False, only=None):
+    """Прогоняет все маршруты и варианты; возвращает словарь результатов по имени."""
+    client = APIClient(raise_request_exception=False)
+    staff = User.objects.filter(is_staff=True).first() or User.objects.create_superuser('bench', 'bench@example.com', None)
+
+    cases = {name: (name, ROUTES[name][0], None) for name in ROUTES}
+    cases.update(VARIANTS)
+
+    results = {}
+    # Заявки пишут уведомления в outbox тестовой БД, в Telegram они не уходят.
+    for name, (route, method, query) in cases.items():
+        if only and route not in only:
+            continue
+        _, url_kwargs, data, needs_staff = ROUTES[route]
+        url = reverse(route, kwargs=url_kwargs() if callable(url_kwargs) else url_kwargs)
+        client.force_authenticate(staff if needs_staff else None)
+        request_format = 'multipart' if route in MULTIPART_ROUTES else 'json'
+        stats = measure(client, method, url, query or data, iterations, warm, request_format)
+        results[name] = {'method': method.upper(), 'url': url, **stats}
+    return results
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Список регрессий относительно базовой линии: p95 и размер ответа выросли
+    больше чем на tolerance, число запросов выросло, либо сменился статус.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current['status'] != previous['status']:
+            regressions.append(f"{name}: статус {previous['status']} -> {current['status']}")
+        if current['queries'] > previous['queries']:
+            regressions.append(f"{name}: запросов {previous['queries']} -> {current['queries']}")
+        if current['p95'] > previous['p95'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['p95']:.1f} -> {current['p95']:.1f} мс")
+        if current['bytes'] > previous['bytes'] * (1 + tolerance):
+            regressions.append(f"{name}: размер {previous['bytes']} -> {current['bytes']} байт")
+    return regressions
+
+
+def load_baseline(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)['endpoints']
+
+
+def save_baseline(path, results, meta):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump({'meta': meta, 'endpoints': results}, file, ensure_ascii=False, indent=2, sort_keys=True)
@@ -0,0 +1,155 @@
+import hashlib
+import time
+from contextlib import nullcontext
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import metrics, replicas
+
+
+VERSION_KEY = 'web:version:{label}'
+RESPONSE_KEY = 'web:response:{view}:{etag}'
+
+TIMESTAMP_FIELDS = ('updated_at', 'created_at', 'date_joined')
+
+
+def model_label(model):
+    return model._meta.label_lower
+
+
+def seed_model_version(model):
+    """
+    Версия модели, восстановленная из БД после потери кэша: максимальная
+    отметка времени (или pk, если отметка не индексирована) плюс число строк,
+    чтобы удаления тоже меняли версию.
+    """
+    fields = {field.name: field for field in model._meta.get_fields() if field.concrete}
+    field = next((name for name in TIMESTAMP_FIELDS if name in fields and fields[name].db_index), None)
+    manager = model._default_manager
+    # MAX и COUNT отдельными запросами: MAX по индексу - один поиск, а в общем
+    # агрегате с COUNT планировщик читает всю таблицу.
+    total = manager.count()
+    latest = manager.aggregate(latest=Max(field or 'pk'))['latest']
+    if field is None:
+        return f"{latest or 0}-{total}"
+    timestamp = int(latest.timestamp() * 1_000_000_000) if latest else 0
+    return f"{timestamp}-{total}"
+
+
+def get_model_versions(models):
+    keys = {VERSION_KEY.format(label=model_label(model)): model for model in models}
+    found = cache.get_many(list(keys))
+    with replicas.primary():
+        missing = {key: seed_model_version(model) for key, model in keys.items() if key not in found}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def get_model_version(model):
+    return get_model_versions([model])[0]
+
+
+def bump_model_version(model):
+    cache.set(VERSION_KEY.format(label=model_label(model)), str(time.time_ns()), timeout=None)
+
+
+def version_timestamp(version):
+    return int(version.split('-', 1)[0]) // 1_000_000_000
+
+
+def build_etag(view, request, versions):
+    raw = f"{type(view).__name__}|{request.get_host()}|{request.path}|{request.GET.urlencode()}|{'.'.join(versions)}"
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+def is_not_modified(request, etag, last_modified):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        candidates = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+        return '*' in candidates or quote_etag(etag) in candidates
+
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return bool(last_modified and if_modified_since and last_modified <= if_modified_since)
+
+
+def response_validators(view, request, models):
+    """ETag, Last-Modified и заголовки ответа для текущих версий моделей."""
+    versions = get_model_versions(models)
+    etag = build_etag(view, request, versions)
+    last_modified = max((version_timestamp(version) for version in versions), default=0)
+    headers = {'ETag': quote_etag(etag)}
+    if last_modified:
+        headers['Last-Modified'] = http_date(last_modified)
+    return etag, last_modified, headers
+
+
+def fill_source(last_modified):
+    """
+    Откуда заполнять промах кэша ответов. Здоровая реплика отстает не больше
+    чем на REPLICA_MAX_LAG (и еще REPLICA_LAG_CHECK_INTERVAL до следующей
+    проверки), поэтому данные, не менявшиеся дольше, читаются с нее. Свежую
+    правку реплика может еще не содержать, а ответ лег бы в кэш под новым ETag
+    на весь API_CACHE_TIMEOUT, так что такой промах заполняется из default.
+    """
+    settled = settings.REPLICA_MAX_LAG + settings.REPLICA_LAG_CHECK_INTERVAL + 1
+    return nullcontext() if time.time() - last_modified > settled else replicas.primary()
+
+
+def response_key(view, etag):
+    return RESPONSE_KEY.format(view=type(view).__name__, etag=etag)
+
+
+def cache_response(*models, timeout=None):
+    """
+    Кэширует сериализованные данные GET-обработчика и отвечает на условные
+    запросы.
+
+    ETag строится из хоста, пути, строки запроса (включая номер страницы) и
+    версий моделей, от которых зависит ответ; Last-Modified - из самой свежей
+    версии. Совпавший If-None-Match/If-Modified-Since дает 304 без обращения
+    к queryset и сериализатору. Сигналы моделей поднимают версию, поэтому
+    старые записи просто перестают читаться и истекают по TTL.
+    Если модели не переданы явно, берутся из атрибута ``cache_models`` view.
+    Промах заполняется с реплики, если модели давно не менялись, иначе из
+    default (fill_source, web/replicas.py).
+    """
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            etag, last_modified, headers = response_validators(view, request, models or view.cache_models)
+            if is_not_modified(request, etag, last_modified):
+                metrics.record_cache(view, 'not_modified')
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+            key = response_key(view, etag)
+            data = cache.get(key)
+            if data is not None:
+                metrics.record_cache(view, 'hit')
+                return Response(data, headers=headers)
+
+            metrics.record_cache(view, 'miss')
+            with fill_source(last_modified):
+                response = handler(view, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                cache.set(key, response.data, timeout or settings.API_CACHE_TIMEOUT)
+                for header, value in headers.items():
+                    response[header] = value
+            return response
+        return wrapper
+    return decorator
+
+
+class CachedListMixin:
+    cache_models = ()
+
+    @cache_response()
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
@@ -1,9 +1,28 @@
+"""
+Приложение Celery. Задачи разведены по очередям (CELERY_TASK_ROUTES):
+
+* ``notifications`` - уведомления в Telegram, короткие и ждущие сети;
+* ``media`` - производные изображений и RichText, нагружают CPU;
+* ``maintenance`` - пересборка главной и снимка API, редкие и долгие;
+* ``default`` - все остальное.
+
+Каждую очередь разбирает свой воркер (Procfile), поэтому публикация снимка
+или пачка загруженных фото не задерживают уведомления о заявках. Пропускную
+способность и задержку в очереди под всплеском меряет
+``manage.py benchmark_celery``. Периодические задачи (CELERY_BEAT_SCHEDULE),
+в том числе диспетчер outbox уведомлений, ставит процесс beat.
+"""
 from __future__ import absolute_import, unicode_literals
 import os
 from celery import Celery
+from celery.signals import task_postrun, task_prerun
+
+from . import metrics
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 app = Celery('web')
 app.config_from_object('django.conf:settings', namespace='CELERY')
-app.autodiscover_tasks()
\ No newline at end of file
+app.autodiscover_tasks()
+task_prerun.connect(metrics.task_started)
+task_postrun.connect(metrics.task_finished)
@@ -0,0 +1,121 @@
+"""
+Сжатие ответов API: brotli, zstd или gzip по Accept-Encoding клиента.
+
+Сжимаются только текстовые ответы (JSON, текст) больше COMPRESSION_MIN_SIZE.
+Ответы с сильным ETag (его ставит web.cache) сжимаются один раз: сжатое тело
+кладется в кэш рядом с закэшированным ответом под ключом из ETag, типа
+содержимого и кодировки, поэтому повторные запросы не тратят CPU на сжатие.
+"""
+import gzip
+import hashlib
+
+import brotli
+import zstandard
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+
+
+COMPRESSED_KEY = 'web:compressed:{digest}'
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/', 'application/javascript', 'image/svg+xml')
+
+# Порядок предпочтения сервера при равном q.
+ENCODERS = {
+    'br': lambda body: brotli.compress(body, quality=5),
+    'zstd': lambda body: zstandard.ZstdCompressor(level=6).compress(body),
+    'gzip': lambda body: gzip.compress(body, compresslevel=6, mtime=0),
+}
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding с q > 0 в виде {кодировка: q}."""
+    accepted = {}
+    for item in header.split(','):
+        name, _, params = item.strip().partition(';')
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name:
+            accepted[name.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(header):
+    accepted = accepted_encodings(header)
+    candidates = [
+        (accepted.get(name, accepted.get('*', 0.0)), -position, name)
+        for position, name in enumerate(ENCODERS)
+    ]
+    q, _, name = max(candidates)
+    return name if q > 0 else None
+
+
+def is_compressible(response):
+    content_type = response.get('Content-Type', '').split(';')[0].strip()
+    return (
+        not response.streaming
+        and not response.has_header('Content-Encoding')
+        and response.status_code == 200
+        and content_type.startswith(COMPRESSIBLE_TYPES)
+        and len(response.content) >= settings.COMPRESSION_MIN_SIZE
+    )
+
+
+def compressed_body(response, encoding):
+    etag = response.get('ETag', '')
+    if not etag or etag.startswith('W/'):
+        return ENCODERS[encoding](response.content)
+
+    raw = f"{etag}|{response['Content-Type']}|{encoding}"
+    key = COMPRESSED_KEY.format(digest=hashlib.md5(raw.encode('utf-8')).hexdigest())
+    body = cache.get(key)
+    if body is None:
+        body = ENCODERS[encoding](response.content)
+        cache.set(key, body, settings.API_CACHE_TIMEOUT)
+    return body
+
+
+def compress_response(request, response):
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if not is_compressible(response):
+        return response
+    encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    if encoding is None:
+        return response
+
+    body = compressed_body(response, encoding)
+    if len(body) >= len(response.content):
+        return response
+    response.content = body
+    response['Content-Length'] = str(len(body))
+    response['Content-Encoding'] = encoding
+    # Сжатое тело отличается байтами, поэтому ETag становится слабым (как в GZipMiddleware).
+    etag = response.get('ETag')
+    if etag and not etag.startswith('W/'):
+        response['ETag'] = 'W/' + etag
+    return response
+
+
+class CompressionMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return compress_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return compress_response(request, await self.get_response(request))
@@ -0,0 +1,52 @@
+"""
+Работа с БД: большие выборки пачками по ключу (keyset).
+"""
+from django.db.models import Q
+
+
+def key_fields(queryset):
+    """Поля сортировки queryset с pk в конце, чтобы ключ был уникальным."""
+    ordering = [field for field in queryset.query.order_by or queryset.model._meta.ordering if isinstance(field, str)]
+    if not ordering or ordering[-1].lstrip('-') not in ('pk', 'id'):
+        descending = bool(ordering) and ordering[-1].startswith('-')
+        ordering.append('-pk' if descending else 'pk')
+    return ordering
+
+
+def after(ordering, last):
+    """Условие "строка после ключа last" для сортировки ordering."""
+    # Граница диапазона по первому полю дает индексу отсечь прочитанные строки.
+    first = ordering[0]
+    bound = Q(**{f"{first.lstrip('-')}__{'lte' if first.startswith('-') else 'gte'}": last[0]})
+    condition = Q()
+    for i, field in enumerate(ordering):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        equal = {prefix.lstrip('-'): value for prefix, value in zip(ordering[:i], last[:i])}
+        condition |= Q(**equal, **{f'{name}__{lookup}': last[i]})
+    return bound & condition
+
+
+def scan(queryset, chunk_size):
+    """
+    Итерирует большой queryset пачками по chunk_size, не загружая результат
+    в память и не держа транзакцию между пачками.
+
+    Каждая пачка - два коротких запроса: ключи сортировки следующих chunk_size
+    строк после последнего ключа (по индексу, без OFFSET) и сами строки по их
+    pk. Серверный курсор потребовал бы транзакции на все время итерации, то
+    есть на всю отдачу выгрузки или весь rebuild_index.
+    """
+    ordering = key_fields(queryset)
+    queryset = queryset.order_by(*ordering)
+    keys = queryset.values_list(*(field.lstrip('-') for field in ordering))
+    last = None
+    while True:
+        chunk = keys if last is None else keys.filter(after(ordering, last))
+        chunk = list(chunk[:chunk_size])
+        if not chunk:
+            return
+        yield from queryset.filter(pk__in=[key[-1] for key in chunk])
+        if len(chunk) < chunk_size:
+            return
+        last = chunk[-1]
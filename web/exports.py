@@ -0,0 +1,126 @@
+import csv
+import json
+import zlib
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import BaseRenderer
+
+from .db import scan
+from .models import Contact, ContactVacancy
+
+
+EXPORTS = {
+    'contacts': (Contact, ('id', 'name', 'email', 'phone', 'message', 'file', 'created_at')),
+    'contact_vacancy': (ContactVacancy, ('id', 'name', 'email', 'phone', 'link', 'file', 'created_at')),
+}
+
+
+class ExportRenderer(BaseRenderer):
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Сама выгрузка отдается StreamingHttpResponse, сюда попадают только ошибки.
+        return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+
+class CSVRenderer(ExportRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class NDJSONRenderer(ExportRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+class Echo:
+    """Псевдофайл для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def parse_day(value, name):
+    if not value:
+        return None
+    day = parse_date(value)
+    if day is None:
+        raise ValidationError({name: "Ожидается дата в формате ГГГГ-ММ-ДД"})
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def export_queryset(kind, date_from=None, date_to=None):
+    """
+    Строки выгрузки в виде кортежей values_list. Границы дат включительные
+    и превращаются в диапазон по created_at, чтобы работал индекс.
+    """
+    model, fields = EXPORTS[kind]
+    queryset = model.objects.order_by('created_at', 'id')
+    start = parse_day(date_from, 'date_from')
+    end = parse_day(date_to, 'date_to')
+    if start:
+        queryset = queryset.filter(created_at__gte=start)
+    if end:
+        queryset = queryset.filter(created_at__lt=end + timedelta(days=1))
+    return fields, queryset.values_list(*fields)
+
+
+# Ячейки, которые Excel и LibreOffice приняли бы за формулу (CSV injection).
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def serialize(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def csv_cell(value):
+    value = serialize(value)
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def iter_csv(fields, rows):
+    writer = csv.writer(Echo())
+    yield '\ufeff' + writer.writerow(fields)
+    for row in scan(rows, settings.EXPORT_CHUNK_SIZE):
+        yield writer.writerow([csv_cell(value) for value in row])
+
+
+def iter_ndjson(fields, rows):
+    for row in scan(rows, settings.EXPORT_CHUNK_SIZE):
+        yield json.dumps(dict(zip(fields, map(serialize, row))), ensure_ascii=False) + '\n'
+
+
+FORMATS = {
+    'csv': iter_csv,
+    'ndjson': iter_ndjson,
+}
+
+
+def iter_export(fields, rows, export_format, compress=False):
+    """
+    Генератор байтовых блоков выгрузки. Строки читаются из БД пачками по
+    EXPORT_CHUNK_SIZE и сразу отдаются, так что память не зависит от объема.
+    При ``compress`` поток сжимается gzip на лету.
+    """
+    chunks = (line.encode('utf-8') for line in FORMATS[export_format](fields, rows))
+    if not compress:
+        yield from chunks
+        return
+
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_filename(kind, export_format, compress=False):
+    name = f"{kind}-{timezone.localdate():%Y%m%d}.{export_format}"
+    return f"{name}.gz" if compress else name
@@ -0,0 +1,140 @@
+"""
+Наполнение БД реалистичными объемами данных для бенчмарков.
+
+Объекты создаются через bulk_create пачками, поэтому сигналы не срабатывают:
+RichText готовится перед вставкой, после наполнения поисковый индекс
+перестраивается, а кэш сбрасывается явно.
+"""
+import itertools
+import random
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+
+from . import richtext, search
+from .models import (
+    Event, EventImage, Services, Vacancy, Project, Contact, Review, YouTubeShort,
+    About, Gallery, Tools, ToolImage, ContactVacancy, Upload
+)
+
+
+BATCH_SIZE = 1000
+
+# Объемы при scale=1; масштабируются линейно.
+VOLUMES = {
+    'users': 200,
+    'events': 2000,
+    'event_images': 3,
+    'services': 50,
+    'vacancies': 100,
+    'projects': 500,
+    'gallery': 1000,
+    'tools': 100,
+    'tool_images': 4,
+    'reviews': 20000,
+    'youtube_shorts': 200,
+    'about': 5,
+    'contacts': 20000,
+    'contact_vacancies': 5000,
+}
+
+WORDS = (
+    'мобильное приложение веб разработка дизайн интерфейс сервис доставка '
+    'аналитика платформа интеграция облако безопасность маркетинг обучение '
+    'python django react flutter kotlin swift postgres redis celery'
+).split()
+
+
+def text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def rich_text(rng, paragraphs=3):
+    return ''.join(f'<p>{text(rng, 40)}</p>' for _ in range(paragraphs))
+
+
+def phone(index):
+    return f'+996 700 {index // 1000 % 1000:03d} {index % 1000:03d}'
+
+
+def create(model, objects):
+    created = []
+    iterator = iter(objects)
+    while batch := list(itertools.islice(iterator, BATCH_SIZE)):
+        for instance in batch:
+            richtext.prepare(instance)
+        created += model.objects.bulk_create(batch)
+    return created
+
+
+def seed(scale=1.0, seed_value=0):
+    """Заполняет БД и возвращает число созданных объектов по моделям."""
+    rng = random.Random(seed_value)
+    volume = {name: max(1, int(count * scale)) for name, count in VOLUMES.items()}
+    volume['event_images'] = VOLUMES['event_images']
+    volume['tool_images'] = VOLUMES['tool_images']
+
+    users = create(User, (User(username=f'user{i}', first_name=text(rng, 1)) for i in range(volume['users'])))
+
+    events = create(Event, (
+        Event(title=text(rng, 4), description=text(rng, 30), content=rich_text(rng), image=f'events/{i}.jpg')
+        for i in range(volume['events'])
+    ))
+    images = create(EventImage, (
+        EventImage(event=event, image=f'event_gallery/{event.pk}-{j}.jpg', content=text(rng, 10))
+        for event in events for j in range(volume['event_images'])
+    ))
+    create(Event.gallery.through, (
+        Event.gallery.through(event_id=image.event_id, eventimage_id=image.pk) for image in images
+    ))
+
+    services = create(Services, (
+        Services(title=text(rng, 3), content=rich_text(rng), image=f'services/{i}.jpg')
+        for i in range(volume['services'])
+    ))
+    create(Vacancy, (
+        Vacancy(title=text(rng, 3), description=text(rng, 40), requirements=text(rng, 30), conditions=text(rng, 20),
+                salary=f'{rng.randint(500, 3000)}$', is_active=rng.random() > 0.2)
+        for _ in range(volume['vacancies'])
+    ))
+    projects = create(Project, (
+        Project(title=text(rng, 4), description=text(rng, 40), content=rich_text(rng), image=f'projects/{i}.jpg',
+                link=f'https://example.com/projects/{i}', is_featured=rng.random() > 0.8)
+        for i in range(volume['projects'])
+    ))
+    create(Gallery, (
+        Gallery(title=text(rng, 3), description=text(rng, 15), image=f'gallery/{i}.jpg',
+                related_service=rng.choice(services), related_project=rng.choice(projects))
+        for i in range(volume['gallery'])
+    ))
+    tools = create(Tools, (
+        Tools(name=f'{text(rng, 2)} {i}', content=rich_text(rng), image=f'tools/{i}.jpg',
+              additional_content=text(rng, 20))
+        for i in range(volume['tools'])
+    ))
+    create(ToolImage, (
+        ToolImage(tool=tool, image=f'tool_images/{tool.pk}-{j}.jpg', content=text(rng, 10))
+        for tool in tools for j in range(volume['tool_images'])
+    ))
+    create(Review, (
+        Review(author=rng.choice(users) if rng.random() > 0.3 else None, text=text(rng, 30))
+        for _ in range(volume['reviews'])
+    ))
+    create(YouTubeShort, (
+        YouTubeShort(video_url=f'https://youtube.com/shorts/{i}', thumbnail=f'youtube_shorts/{i}.jpg')
+        for i in range(volume['youtube_shorts'])
+    ))
+    create(About, (About(title=text(rng, 3), description=text(rng, 50), content=rich_text(rng)) for _ in range(volume['about'])))
+    create(Contact, (
+        Contact(name=text(rng, 2), email=f'lead{i}@example.com', message=text(rng, 25), phone=phone(i))
+        for i in range(volume['contacts'])
+    ))
+    create(ContactVacancy, (
+        ContactVacancy(name=text(rng, 2), email=f'cv{i}@example.com', phone=phone(i), link=f'https://linkedin.com/in/{i}')
+        for i in range(volume['contact_vacancies'])
+    ))
+    Upload.objects.create(filename='cv.pdf', size=1024)
+
+    search.rebuild_index()
+    cache.clear()
+    return volume
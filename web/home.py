@@ -0,0 +1,103 @@
+"""
+Документ главной страницы: все секции лендинга одним ответом /api/home/.
+
+Документ собирается целиком и хранится в кэше одной записью. Изменение любой
+модели, из которой он состоит, ставит в Celery пересборку (с задержкой
+HOME_REBUILD_DELAY, чтобы серия правок в админке дала одну пересборку);
+до ее завершения отдается предыдущая версия. Чтение сверяет документ с
+текущими версиями моделей, так что потерянная задача тоже восстанавливается. URL файлов в документе
+относительные, так как он не привязан к конкретному запросу.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+
+from . import replicas
+from .cache import get_model_versions
+from .models import About, Services, Project, Review, YouTubeShort, Gallery, Tools, ToolImage, Vacancy
+from .serializers import (
+    AboutSerializer, ServicesSerializer, ProjectSerializer, ReviewSerializer, YouTubeShortSerializer,
+    GallerySerializer, ToolsSerializer, VacancySerializer, narrow_queryset,
+)
+
+
+HOME_KEY = 'web:home'
+PENDING_KEY = 'web:home:pending'
+
+# User - ради авторов отзывов; вход пользователя (last_login) версию не меняет,
+# см. signals.IGNORED_UPDATES.
+HOME_MODELS = (About, Services, Project, Review, User, YouTubeShort, Gallery, Tools, ToolImage, Vacancy)
+
+
+# секция -> (queryset, сериализатор, сколько последних записей; None - все).
+def sections():
+    size = settings.HOME_SECTION_SIZE
+    return {
+        'about': (About.objects.all(), AboutSerializer, size),
+        'services': (Services.objects.all(), ServicesSerializer, size),
+        'featured_projects': (Project.objects.filter(is_featured=True), ProjectSerializer, size),
+        'projects': (Project.objects.all(), ProjectSerializer, size),
+        'reviews': (Review.objects.select_related('author'), ReviewSerializer, size),
+        'youtube_shorts': (YouTubeShort.objects.all(), YouTubeShortSerializer, size),
+        'tools': (Tools.objects.prefetch_related('images'), ToolsSerializer, size),
+        'gallery': (Gallery.objects.select_related('related_service', 'related_project'), GallerySerializer, size),
+        'vacancies': (Vacancy.objects.filter(is_active=True), VacancySerializer, None),
+    }
+
+
+def versions_etag(versions):
+    return hashlib.md5('.'.join(versions).encode('utf-8')).hexdigest()
+
+
+def build_document():
+    # Версии берутся до чтения данных: правка во время сборки даст еще одну пересборку.
+    versions = get_model_versions(HOME_MODELS)
+    data = {}
+    for name, (queryset, serializer_class, limit) in sections().items():
+        # RichText в карточках не нужен, хватает анонса.
+        serializer = serializer_class(many=True, context={'field_params': {'omit': 'content'}})
+        serializer.instance = narrow_queryset(queryset, serializer).order_by('-created_at', '-id')[:limit]
+        data[name] = serializer.data
+    return {
+        'etag': versions_etag(versions),
+        'built_at': int(time.time()),
+        'data': data,
+    }
+
+
+def rebuild():
+    document = build_document()
+    cache.set(HOME_KEY, document, timeout=None)
+    return document
+
+
+def get_document():
+    """
+    Готовый документ из кэша; при пустом кэше собирается сразу. Если документ
+    собран по устаревшим версиям моделей (задача пересборки потерялась или
+    упала), отдается он же, но пересборка ставится заново.
+    """
+    document = cache.get(HOME_KEY)
+    if document is None:
+        # Документ хранится без срока: собранный с отстающей реплики не исправился бы.
+        with replicas.primary():
+            return rebuild()
+    if document['etag'] != versions_etag(get_model_versions(HOME_MODELS)):
+        enqueue_rebuild()
+    return document
+
+
+def enqueue_rebuild():
+    from .utils import rebuild_home_document
+
+    # Пока пересборка ждет в очереди, новые правки ее не дублируют.
+    if cache.add(PENDING_KEY, 1, timeout=settings.HOME_REBUILD_DELAY + 60):
+        rebuild_home_document.apply_async(countdown=settings.HOME_REBUILD_DELAY)
+
+
+def schedule_rebuild():
+    transaction.on_commit(enqueue_rebuild)
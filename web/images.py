@@ -0,0 +1,162 @@
+import base64
+import io
+import json
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import models, transaction
+from PIL import Image, ImageFilter, ImageOps
+
+
+FORMATS = {
+    'webp': ('WEBP', 'webp', {'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'optimize': True, 'progressive': True}),
+}
+PLACEHOLDER_WIDTH = 16
+
+
+def srcset_field_name(field_name):
+    return f'{field_name}_srcset'
+
+
+def image_fields(model):
+    """ImageField модели, у которых есть колонка ``<поле>_srcset`` для производных."""
+    field_names = {field.name for field in model._meta.fields}
+    return [
+        field.name for field in model._meta.fields
+        if isinstance(field, models.ImageField) and srcset_field_name(field.name) in field_names
+    ]
+
+
+def is_stale(instance, field_name):
+    source = getattr(instance, field_name)
+    manifest = getattr(instance, srcset_field_name(field_name)) or {}
+    return bool(source) and manifest.get('source') != source.name
+
+
+def derivative_name(source, width, fmt):
+    stem = os.path.splitext(source)[0]
+    return f'derivatives/{stem}/{width}w.{FORMATS[fmt][1]}'
+
+
+def flatten(image):
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def encode(image, fmt):
+    pil_format, _, options = FORMATS[fmt]
+    buffer = io.BytesIO()
+    image.save(buffer, pil_format, quality=settings.IMAGE_DERIVATIVE_QUALITY, **options)
+    return buffer.getvalue()
+
+
+def build_placeholder(image):
+    height = max(1, round(image.height * PLACEHOLDER_WIDTH / image.width))
+    tiny = image.resize((PLACEHOLDER_WIDTH, height), Image.LANCZOS).filter(ImageFilter.GaussianBlur(1))
+    buffer = io.BytesIO()
+    tiny.save(buffer, 'JPEG', quality=40)
+    return 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+def build_manifest(source):
+    """
+    Создает уменьшенные копии исходника в форматах WebP и JPEG по ширинам
+    IMAGE_DERIVATIVE_WIDTHS (не больше оригинала) и возвращает манифест
+    с размерами, именами файлов в хранилище и LQIP-заглушкой.
+    Имена производных зависят только от имени исходника, поэтому повторный
+    запуск перезаписывает те же файлы.
+    """
+    with default_storage.open(source, 'rb') as file:
+        image = ImageOps.exif_transpose(Image.open(file))
+        image.load()
+    image = flatten(image)
+
+    widths = sorted({width for width in settings.IMAGE_DERIVATIVE_WIDTHS if width < image.width})
+    widths.append(min(image.width, max(settings.IMAGE_DERIVATIVE_WIDTHS)))
+
+    variants = []
+    for width in sorted(set(widths)):
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for fmt in settings.IMAGE_DERIVATIVE_FORMATS:
+            name = derivative_name(source, width, fmt)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            default_storage.save(name, ContentFile(encode(resized, fmt)))
+            variants.append({'name': name, 'width': width, 'height': height, 'format': fmt})
+
+    return {
+        'source': source,
+        'width': image.width,
+        'height': image.height,
+        'placeholder': build_placeholder(image),
+        'variants': variants,
+    }
+
+
+def manifest_name(source):
+    return f'derivatives/{os.path.splitext(source)[0]}/manifest.json'
+
+
+def load_manifest(source):
+    """Сохраненный манифест производных изображения из RichText или None."""
+    name = manifest_name(source)
+    if not default_storage.exists(name):
+        return None
+    with default_storage.open(name, 'rb') as file:
+        return json.load(file)
+
+
+def ensure_manifest(source):
+    """
+    Манифест изображения, встроенного в RichText: у таких картинок нет своей
+    колонки _srcset, поэтому манифест хранится рядом с производными.
+    Для отсутствующего или битого файла возвращает None.
+    """
+    manifest = load_manifest(source)
+    if manifest is None:
+        try:
+            manifest = build_manifest(source)
+        except OSError:
+            return None
+        default_storage.save(manifest_name(source), ContentFile(json.dumps(manifest).encode('utf-8')))
+    return manifest
+
+
+def render_manifest(manifest, request=None):
+    if not manifest or not manifest.get('variants'):
+        return None
+
+    variants = []
+    for variant in manifest['variants']:
+        url = default_storage.url(variant['name'])
+        if request is not None:
+            url = request.build_absolute_uri(url)
+        variants.append({'url': url, 'width': variant['width'], 'height': variant['height'], 'format': variant['format']})
+
+    return {
+        'width': manifest['width'],
+        'height': manifest['height'],
+        'placeholder': manifest['placeholder'],
+        'srcset': {
+            fmt: ', '.join(f"{variant['url']} {variant['width']}w" for variant in variants if variant['format'] == fmt)
+            for fmt in dict.fromkeys(variant['format'] for variant in variants)
+        },
+        'variants': variants,
+    }
+
+
+def schedule_derivatives(instance):
+    from .utils import generate_image_derivatives
+
+    for field_name in image_fields(type(instance)):
+        if is_stale(instance, field_name):
+            args = (instance._meta.label, instance.pk, field_name, getattr(instance, field_name).name)
+            transaction.on_commit(lambda args=args: generate_image_derivatives.delay(*args))
@@ -0,0 +1,75 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+DEFAULT_PATHS = (
+    '/api/events/', '/api/services/', '/api/vacancies/', '/api/projects/',
+    '/api/youtube-shorts/', '/api/gallery/', '/api/tools/', '/api/about/',
+)
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summarize(latencies, errors, elapsed):
+    """Сводка прогона: запросы в секунду и перцентили задержки в миллисекундах."""
+    return {
+        'requests': len(latencies) + errors,
+        'errors': errors,
+        'rps': (len(latencies) + errors) / elapsed if elapsed else 0.0,
+        'mean': statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        'p50': percentile(latencies, 0.50) * 1000,
+        'p95': percentile(latencies, 0.95) * 1000,
+        'p99': percentile(latencies, 0.99) * 1000,
+    }
+
+
+def run_load(base_url, paths=DEFAULT_PATHS, total=1000, concurrency=20, timeout=30):
+    """
+    Отправляет ``total`` GET-запросов по кругу по ``paths`` в ``concurrency``
+    потоков (у каждого своя keep-alive сессия) и возвращает summarize().
+    """
+    local = threading.local()
+    lock = threading.Lock()
+    latencies, errors = [], 0
+
+    def request(index):
+        nonlocal errors
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        started = time.perf_counter()
+        try:
+            ok = session.get(base_url + paths[index % len(paths)], timeout=timeout).status_code < 500
+        except requests.RequestException:
+            ok = False
+        duration = time.perf_counter() - started
+        with lock:
+            if ok:
+                latencies.append(duration)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(request, range(total)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def wait_until_ready(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise TimeoutError(f"Сервер {url} не ответил за {timeout} с")
@@ -0,0 +1,165 @@
+"""
+Структурированное логирование: JSON-строки, выборка INFO-логов по маршрутам,
+маскирование телефонов и email и запись в stdout из фонового потока.
+
+Подключается через LOGGING в config/settings.py. В потоке запроса остаются
+только проверка уровня, решение о выборке и подстановка %-аргументов;
+сериализация в JSON, маскирование и запись идут в потоке QueueListener.
+"""
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+
+EMAIL_RE = re.compile(r'[\w.+-]+@([\w-]+\.[\w.-]+)')
+PHONE_RE = re.compile(r'(?<!\d)\+?(?:\d[\s()-]?){8,11}(\d{2})(?![\d:])')
+
+# Атрибуты LogRecord, которые не считаются дополнительными полями (extra).
+RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+# Контекст текущего запроса: request_id, имя маршрута и решение о выборке.
+request_context = ContextVar('web_log_context', default=None)
+
+
+def redact(text):
+    text = EMAIL_RE.sub(r'***@\1', text)
+    return PHONE_RE.sub(r'***\1', text)
+
+
+class RequestContextMiddleware:
+    """Задает контекст логов запроса; имя маршрута известно только в process_view."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = self.start(request)
+        try:
+            return self.get_response(request)
+        finally:
+            request_context.reset(token)
+
+    async def __acall__(self, request):
+        token = self.start(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            request_context.reset(token)
+
+    def start(self, request):
+        request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+        return request_context.set({'request_id': request_id[:64], 'route': None})
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Словарь меняется на месте: так значение видно и через sync_to_async.
+        context = request_context.get()
+        if context is not None:
+            context['route'] = request.resolver_match.url_name
+        return None
+
+
+class RouteSampleFilter(logging.Filter):
+    """
+    Пропускает INFO и ниже с долей rates[маршрут] (по умолчанию default).
+    Решение принимается один раз на запрос, поэтому строки одного запроса
+    либо попадают в лог все, либо не попадают. WARNING и выше, а также
+    логи вне запроса (Celery, команды) проходят всегда.
+    """
+
+    def __init__(self, rates=None, default=1.0):
+        super().__init__()
+        self.rates = rates or {}
+        self.default = default
+
+    def filter(self, record):
+        context = request_context.get()
+        if record.levelno >= logging.WARNING or context is None:
+            return True
+        if 'sampled' not in context:
+            rate = self.rates.get(context['route'], self.default)
+            context['sampled'] = rate >= 1 or random.random() < rate
+        return context['sampled']
+
+
+class JSONFormatter(logging.Formatter):
+    """Одна JSON-строка на запись; телефоны и email в тексте маскируются."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': redact(record.getMessage()),
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = redact(value) if isinstance(value, str) else value
+        if record.exc_info:
+            record.exc_text = record.exc_text or self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class BackgroundHandler(QueueHandler):
+    """
+    Кладет записи в очередь, а QueueListener пишет их в stream своим
+    обработчиком. Форматтер из LOGGING передается этому обработчику.
+    Поток слушателя запускается заново в каждом процессе после fork
+    (воркеры gunicorn и Celery).
+    """
+
+    def __init__(self, stream=None):
+        super().__init__(queue.SimpleQueue())
+        self.target = logging.StreamHandler(stream or sys.stdout)
+        self.listener = None
+        self.pid = None
+
+    def setFormatter(self, fmt):
+        self.target.setFormatter(fmt)
+
+    def start(self):
+        self.queue = queue.SimpleQueue()
+        self.listener = QueueListener(self.queue, self.target)
+        self.listener.start()
+        self.pid = os.getpid()
+
+    def prepare(self, record):
+        # Аргументы и контекст запроса фиксируются сейчас: в потоке слушателя их уже нет.
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        context = request_context.get()
+        if context is not None:
+            record.request_id, record.route = context['request_id'], context['route']
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def emit(self, record):
+        if self.pid != os.getpid():
+            self.start()
+        super().emit(record)
+
+    def close(self):
+        if self.listener is not None and self.pid == os.getpid():
+            self.listener.stop()
+            self.listener = None
+        super().close()
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from web import factories, queryplan
+
+
+class Command(BaseCommand):
+    help = (
+        "Наполняет тестовую БД, выполняет EXPLAIN для каждого SELECT публичных маршрутов API "
+        "и завершается с ошибкой, если план последовательно сканирует большую таблицу"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=0.1, help="Множитель объемов из web.factories.VOLUMES")
+        parser.add_argument('--min-rows', type=int, default=1000, help="С какого числа строк таблица считается большой")
+        parser.add_argument('--route', action='append', dest='routes', help="Проверить только этот маршрут")
+        parser.add_argument('--keepdb', action='store_true', help="Оставить тестовую БД и данные для следующего прогона")
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            from web.models import Event
+
+            if not Event.objects.exists():
+                factories.seed(scale=options['scale'])
+            with connection.cursor() as cursor:
+                # Статистика планировщика по только что залитым данным.
+                cursor.execute('ANALYZE')
+            problems = queryplan.audit(options['min_rows'], options['routes'])
+        except queryplan.AuditError as e:
+            raise CommandError(f"Маршрут отвечает ошибкой: {e}")
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+
+        for route, scans in problems.items():
+            for table, sql in scans:
+                self.stdout.write(f"{route}: Seq Scan {table}\n    {sql}")
+        if problems:
+            raise CommandError(f"Последовательное сканирование больших таблиц в маршрутах: {', '.join(problems)}")
+        self.stdout.write("Последовательных сканирований больших таблиц нет")
@@ -0,0 +1,53 @@
+import time
+import uuid
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+
+from web.loadtest import percentile
+from web.utils import benchmark_probe
+
+
+class Command(BaseCommand):
+    help = (
+        "Ставит пачку задач-зондов в очередь Celery разом и меряет пропускную способность "
+        "воркеров и задержку задач в очереди. Воркеры должны быть запущены"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queue', default='default', help="Очередь, в которую ставятся зонды")
+        parser.add_argument('--tasks', type=int, default=1000, help="Размер всплеска")
+        parser.add_argument('--work-ms', type=int, default=0, help="Имитация работы в каждой задаче, мс")
+        parser.add_argument('--timeout', type=float, default=300, help="Сколько ждать выполнения всех задач, с")
+
+    def collect(self, keys, deadline):
+        results = {}
+        while len(results) < len(keys):
+            if time.monotonic() > deadline:
+                raise CommandError(f"Выполнено {len(results)} из {len(keys)} задач, время ожидания истекло")
+            pending = [key for key in keys if key not in results]
+            for start in range(0, len(pending), 500):
+                results.update(cache.get_many(pending[start:start + 500]))
+            time.sleep(0.2)
+        return results
+
+    def handle(self, *args, **options):
+        run_id, total = uuid.uuid4().hex, options['tasks']
+        keys = [f'web:celery-benchmark:{run_id}:{index}' for index in range(total)]
+
+        started = time.time()
+        for index in range(total):
+            benchmark_probe.apply_async((run_id, index, time.time(), options['work_ms']), queue=options['queue'])
+        enqueued = time.time() - started
+
+        results = self.collect(keys, time.monotonic() + options['timeout'])
+        cache.delete_many(keys)
+        waits = [wait * 1000 for wait, _ in results.values()]
+        elapsed = max(finished for _, finished in results.values()) - started
+
+        self.stdout.write(f"Очередь {options['queue']}: {total} задач, постановка {enqueued:.2f} с")
+        self.stdout.write(f"Пропускная способность: {total / elapsed:.1f} задач/с за {elapsed:.2f} с")
+        self.stdout.write(
+            f"Задержка в очереди, мс: p50 {percentile(waits, 0.5):.1f}, "
+            f"p95 {percentile(waits, 0.95):.1f}, p99 {percentile(waits, 0.99):.1f}, max {max(waits):.1f}"
+        )
@@ -0,0 +1,59 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+from web.loadtest import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет накладные расходы на соединение с БД в цикле запроса: "
+        "новое соединение на каждый запрос против постоянного (CONN_MAX_AGE)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--number', type=int, default=500, help="Число запросов на режим")
+        parser.add_argument('--max-age', type=int, default=60, help="CONN_MAX_AGE постоянного режима, с")
+
+    def run(self, max_age, number):
+        """Эмулирует number запросов с одним SELECT; возвращает задержки в мс и число подключений."""
+        connection.close()
+        connection.settings_dict['CONN_MAX_AGE'] = max_age
+        connects = []
+        receiver = lambda **kwargs: connects.append(1)
+        connection_created.connect(receiver, weak=False)
+        latencies = []
+        try:
+            for _ in range(number):
+                start = time.perf_counter()
+                # Те же сигналы, что шлет обработчик запроса: close_old_connections()
+                # закрывает соединение в конце запроса, если его срок вышел.
+                request_started.send(sender=self.__class__)
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                    cursor.fetchone()
+                request_finished.send(sender=self.__class__)
+                latencies.append((time.perf_counter() - start) * 1000)
+        finally:
+            connection_created.disconnect(receiver)
+            connection.close()
+        return latencies, len(connects)
+
+    def handle(self, *args, **options):
+        number, initial = options['number'], connection.settings_dict['CONN_MAX_AGE']
+        self.stdout.write(f"{'режим':<24} {'mean':>8} {'p50':>8} {'p95':>8} {'подключений':>12}")
+        results = {}
+        try:
+            for label, max_age in (("без пула (0)", 0), (f"постоянные ({options['max_age']})", options['max_age'])):
+                latencies, connects = self.run(max_age, number)
+                results[max_age] = sum(latencies) / len(latencies)
+                self.stdout.write(
+                    f"{label:<24} {results[max_age]:8.3f} {percentile(latencies, 0.5):8.3f} "
+                    f"{percentile(latencies, 0.95):8.3f} {connects:12d}"
+                )
+        finally:
+            connection.settings_dict['CONN_MAX_AGE'] = initial
+        self.stdout.write(f"Подключение на запрос стоит ~{results[0] - results[options['max_age']]:.3f} мс")
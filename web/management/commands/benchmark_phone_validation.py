@@ -0,0 +1,42 @@
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from web import phones
+from web.serializers import ContactSerializer
+
+
+SAMPLES = ('+996 700 123 456', '0555123456', '996 (312) 62-45-67', '+7 999 123 45 67', 'не номер')
+
+
+class Command(BaseCommand):
+    help = "Замеряет стоимость проверки телефона и формы заявки: холодный разбор и попадание в кэш"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--number', type=int, default=10000, help="Число повторов на замер")
+
+    def report(self, label, seconds, number):
+        self.stdout.write(f"{label:<40} {seconds / number * 1_000_000:8.2f} мкс")
+
+    def handle(self, *args, **options):
+        number = options['number']
+
+        def cold():
+            phones.cache_clear()
+            for sample in SAMPLES:
+                phones.normalize_many([sample])
+
+        def warm():
+            for sample in SAMPLES:
+                phones.normalize_many([sample])
+
+        def submission():
+            ContactSerializer(data={
+                'name': 'Клиент', 'email': 'client@example.com', 'message': 'Привет', 'phone': SAMPLES[0],
+            }).is_valid()
+
+        warm()
+        self.report("Номер без кэша (phonenumbers)", timeit.timeit(cold, number=number) / len(SAMPLES), number)
+        self.report("Номер из LRU-кэша", timeit.timeit(warm, number=number) / len(SAMPLES), number)
+        self.report("Проверка формы заявки целиком", timeit.timeit(submission, number=number), number)
+        self.stdout.write(str(phones.cache_info()))
@@ -0,0 +1,54 @@
+import os
+import subprocess
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand
+
+from web.loadtest import DEFAULT_PATHS, run_load, wait_until_ready
+
+
+MODES = (
+    ('wsgi', 'config.wsgi', 'sync', 'False'),
+    ('asgi', 'config.asgi', 'uvicorn_worker.UvicornWorker', 'True'),
+)
+
+
+class Command(BaseCommand):
+    help = "Сравнивает WSGI (sync-воркеры) и ASGI (uvicorn-воркеры) под одинаковой нагрузкой и числом воркеров"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--path', action='append', dest='paths', help="Путь для нагрузки (можно несколько раз)")
+
+    @contextmanager
+    def server(self, app, worker_class, async_views, workers, port):
+        env = dict(os.environ, ASYNC_VIEWS=async_views)
+        process = subprocess.Popen(
+            ['gunicorn', app, '-k', worker_class, '-w', str(workers), '-b', f'127.0.0.1:{port}', '--log-level', 'warning'],
+            env=env,
+        )
+        try:
+            base_url = f'http://127.0.0.1:{port}'
+            wait_until_ready(base_url + '/api/about/')
+            yield base_url
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+    def handle(self, *args, **options):
+        paths = tuple(options['paths'] or DEFAULT_PATHS)
+        self.stdout.write(
+            f"Воркеров: {options['workers']}, запросов: {options['requests']}, параллельно: {options['concurrency']}"
+        )
+        self.stdout.write(f"{'режим':<6} {'rps':>8} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'ошибки':>7}")
+        for mode, app, worker_class, async_views in MODES:
+            with self.server(app, worker_class, async_views, options['workers'], options['port']) as base_url:
+                run_load(base_url, paths, total=len(paths), concurrency=1)  # прогрев кэша и соединений
+                stats = run_load(base_url, paths, options['requests'], options['concurrency'])
+            self.stdout.write(
+                f"{mode:<6} {stats['rps']:8.1f} {stats['mean']:8.1f} {stats['p50']:8.1f} "
+                f"{stats['p95']:8.1f} {stats['p99']:8.1f} {stats['errors']:7d}"
+            )
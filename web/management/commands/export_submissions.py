@@ -0,0 +1,32 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from web.exports import EXPORTS, FORMATS, export_queryset, iter_export
+
+
+class Command(BaseCommand):
+    help = "Потоково выгружает заявки (contacts или contact_vacancy) в CSV/NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(EXPORTS))
+        parser.add_argument('--format', dest='export_format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--from', dest='date_from', help="Начальная дата ГГГГ-ММ-ДД включительно")
+        parser.add_argument('--to', dest='date_to', help="Конечная дата ГГГГ-ММ-ДД включительно")
+        parser.add_argument('--gzip', action='store_true', help="Сжать выгрузку gzip")
+        parser.add_argument('--output', '-o', help="Файл для записи (по умолчанию stdout)")
+
+    def handle(self, *args, **options):
+        try:
+            fields, rows = export_queryset(options['kind'], options['date_from'], options['date_to'])
+        except ValidationError as e:
+            raise CommandError(e.detail)
+
+        chunks = iter_export(fields, rows, options['export_format'], options['gzip'])
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                output.writelines(chunks)
+            self.stderr.write(self.style.SUCCESS(f"Выгрузка сохранена в {options['output']}"))
+        else:
+            sys.stdout.buffer.writelines(chunks)
@@ -0,0 +1,32 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from web.images import image_fields, is_stale
+from web.utils import generate_image_derivatives
+
+
+class Command(BaseCommand):
+    help = "Создает производные (миниатюры WebP/JPEG и LQIP) для изображений, у которых их еще нет"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sync', action='store_true', help="Выполнить в текущем процессе, а не через Celery")
+        parser.add_argument('--force', action='store_true', help="Пересоздать даже актуальные производные")
+
+    def handle(self, *args, **options):
+        count = 0
+        for model in apps.get_app_config('web').get_models():
+            fields = image_fields(model)
+            if not fields:
+                continue
+            for instance in model.objects.iterator(chunk_size=500):
+                for field_name in fields:
+                    source = getattr(instance, field_name)
+                    if not source or not (options['force'] or is_stale(instance, field_name)):
+                        continue
+                    task_args = (model._meta.label, instance.pk, field_name, source.name)
+                    if options['sync']:
+                        generate_image_derivatives(*task_args)
+                    else:
+                        generate_image_derivatives.delay(*task_args)
+                    count += 1
+        self.stdout.write(self.style.SUCCESS(f"Обработано изображений: {count}"))
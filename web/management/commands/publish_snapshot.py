@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from web import snapshots
+
+
+class Command(BaseCommand):
+    help = "Публикует статический снимок публичного API (JSON + .gz + .br) и переключает на него симлинк current"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--root', help="Каталог снимков (по умолчанию SNAPSHOT_ROOT)")
+
+    def handle(self, *args, **options):
+        root = options['root'] or None
+        if not root and not snapshots.is_enabled():
+            raise CommandError("Укажите --root или SNAPSHOT_ROOT")
+        version, count = snapshots.publish(root)
+        self.stdout.write(self.style.SUCCESS(f"Снимок {version} опубликован: {count} файлов"))
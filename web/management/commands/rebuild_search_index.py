@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from web.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Перестраивает поисковые документы для проектов, услуг, мероприятий, вакансий и инструментов"
+
+    def handle(self, *args, **options):
+        count = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Проиндексировано объектов: {count}"))
@@ -0,0 +1,25 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from web.richtext import richtext_fields
+from web.utils import render_rich_text
+
+
+class Command(BaseCommand):
+    help = "Заново готовит HTML и анонсы RichText-полей, включая адаптивные версии встроенных изображений"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sync', action='store_true', help="Выполнить в текущем процессе, а не через Celery")
+
+    def handle(self, *args, **options):
+        count = 0
+        for model in apps.get_app_config('web').get_models():
+            if not richtext_fields(model):
+                continue
+            for pk in model.objects.values_list('pk', flat=True).iterator(chunk_size=500):
+                if options['sync']:
+                    render_rich_text(model._meta.label, pk)
+                else:
+                    render_rich_text.delay(model._meta.label, pk)
+                count += 1
+        self.stdout.write(self.style.SUCCESS(f"Обработано записей: {count}"))
@@ -0,0 +1,63 @@
+import platform
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from web import benchmark, factories
+
+
+class Command(BaseCommand):
+    help = (
+        "Наполняет тестовую БД реалистичными объемами, прогоняет все маршруты API и "
+        "записывает p50/p95/p99, число запросов и размер ответов в JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='benchmark.json', help="Куда записать результаты")
+        parser.add_argument('--baseline', help="JSON с базовой линией для сравнения")
+        parser.add_argument('--tolerance', type=float, default=0.2, help="Допустимый рост p95 и размера ответа")
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--scale', type=float, default=1.0, help="Множитель объемов из web.factories.VOLUMES")
+        parser.add_argument('--warm', action='store_true', help="Не сбрасывать кэш ответов между запросами")
+        parser.add_argument('--route', action='append', dest='routes', help="Измерить только этот маршрут")
+        parser.add_argument('--keepdb', action='store_true', help="Оставить тестовую БД и данные для следующего прогона")
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            from web.models import Event
+
+            if not Event.objects.exists():
+                self.stdout.write("Наполнение БД...")
+                volume = factories.seed(scale=options['scale'])
+                self.stdout.write(', '.join(f"{name}: {count}" for name, count in volume.items()))
+            results = benchmark.run(options['iterations'], options['warm'], options['routes'])
+        except benchmark.BenchmarkError as e:
+            raise CommandError(f"Маршрут отвечает ошибкой сервера: {e}")
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+
+        self.stdout.write(f"{'маршрут':<32} {'статус':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'SQL':>5} {'байт':>9}")
+        for name, stats in results.items():
+            self.stdout.write(
+                f"{name:<32} {stats['status']:>6} {stats['p50']:8.1f} {stats['p95']:8.1f} {stats['p99']:8.1f} "
+                f"{stats['queries']:>5} {stats['bytes']:>9}"
+            )
+
+        benchmark.save_baseline(options['output'], results, {
+            'created_at': timezone.now().isoformat(),
+            'scale': options['scale'],
+            'iterations': options['iterations'],
+            'warm': options['warm'],
+            'database': connection.vendor,
+            'python': platform.python_version(),
+        })
+        self.stdout.write(self.style.SUCCESS(f"Результаты записаны в {options['output']}"))
+
+        if options['baseline']:
+            regressions = benchmark.compare(results, benchmark.load_baseline(options['baseline']), options['tolerance'])
+            if regressions:
+                raise CommandError("Регрессии производительности:\n" + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS("Регрессий относительно базовой линии нет"))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from web.telegram_mock import MockTelegramServer
+
+
+class Command(BaseCommand):
+    help = "Запускает локальную заглушку Telegram Bot API (укажите ее адрес в TELEGRAM_API_URL)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8081)
+
+    def handle(self, *args, **options):
+        server = MockTelegramServer(options['host'], options['port'])
+        self.stdout.write(f"Mock Telegram API: {server.url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"Получено запросов: {len(server.calls)}")
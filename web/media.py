@@ -0,0 +1,200 @@
+"""
+Отдача загруженных файлов (MEDIA_ROOT).
+
+Публичные файлы кэшируются браузером и CDN на MEDIA_MAX_AGE как immutable:
+имена загрузок не переиспользуются (новый файл получает новое имя). Если рядом
+с файлом лежит заранее сжатая копия ``.br`` или ``.gz`` и клиент ее принимает,
+отдается она. Поддерживаются Range-запросы (один диапазон) для видео и
+докачки; под gunicorn тело отдается через os.sendfile без чтения в Python.
+
+Вложения заявок (MEDIA_PRIVATE_PREFIXES) доступны только по подписанной
+ссылке со сроком действия, см. signed_url().
+
+При непустом MEDIA_ACCEL_REDIRECT Django только проверяет доступ и заголовки,
+а сам файл отдает nginx через X-Accel-Redirect::
+
+    location /protected-media/ {
+        internal;
+        alias /srv/media/;
+    }
+
+Статика отдается WhiteNoise с хешированными именами.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote, urlencode
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import PermissionDenied, SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+
+from .cache import is_not_modified
+from .compression import accepted_encodings
+
+
+SIGNING_SALT = 'web.media'
+
+# Заранее сжатые копии: кодировка -> суффикс файла, в порядке предпочтения.
+PRECOMPRESSED = {'br': '.br', 'gzip': '.gz'}
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def is_private(name):
+    return name.startswith(tuple(settings.MEDIA_PRIVATE_PREFIXES))
+
+
+def signed_url(name):
+    """Ссылка на закрытый файл, действующая MEDIA_SIGNED_URL_MAX_AGE секунд."""
+    token = signing.dumps(name, salt=SIGNING_SALT)
+    return f"{settings.MEDIA_URL}{quote(name)}?{urlencode({'token': token})}"
+
+
+def check_signature(request, name):
+    try:
+        signed = signing.loads(request.GET.get('token', ''), salt=SIGNING_SALT, max_age=settings.MEDIA_SIGNED_URL_MAX_AGE)
+    except signing.BadSignature:
+        raise PermissionDenied
+    if signed != name:
+        raise PermissionDenied
+
+
+def resolve(name):
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, name)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(fullpath):
+        raise Http404
+    return fullpath
+
+
+def variant(request, fullpath):
+    """Путь и кодировка файла для ответа с учетом Accept-Encoding."""
+    accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    for encoding, suffix in PRECOMPRESSED.items():
+        if accepted.get(encoding, accepted.get('*', 0.0)) > 0 and os.path.isfile(fullpath + suffix):
+            return fullpath + suffix, encoding
+    return fullpath, None
+
+
+def parse_range(header, size):
+    """
+    Диапазон (начало, конец включительно) из заголовка Range. None - отдать
+    файл целиком (нет заголовка или несколько диапазонов), ValueError -
+    диапазон за пределами файла.
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if match is None:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start, end = int(start), min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def requested_range(request, etag, stat):
+    header = request.META.get('HTTP_RANGE')
+    if not header:
+        return None
+    # If-Range: диапазон действует, только если файл не изменился.
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range not in (quote_etag(etag), http_date(stat.st_mtime)):
+        return None
+    return parse_range(header, stat.st_size)
+
+
+class FileRange:
+    """
+    Часть файла для FileResponse. fileno() оставлен, чтобы gunicorn отдал
+    часть через sendfile с текущей позиции и длиной из Content-Length.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def file_response(request, name, fullpath, etag, stat):
+    content_type = mimetypes.guess_type(fullpath)[0] or 'application/octet-stream'
+    try:
+        byte_range = requested_range(request, etag, stat)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return response, None
+
+    if settings.MEDIA_ACCEL_REDIRECT:
+        # Тело, Range и sendfile обрабатывает nginx.
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT + quote(name)
+        return response, None
+
+    if byte_range is not None:
+        start, end = byte_range
+        response = FileResponse(FileRange(open(fullpath, 'rb'), start, end - start + 1), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        response['Content-Length'] = str(end - start + 1)
+        response['Accept-Ranges'] = 'bytes'
+        return response, None
+
+    # Для Range-запросов сжатые копии не используются: смещения считаются по исходному файлу.
+    filename, encoding = variant(request, fullpath) if 'HTTP_RANGE' not in request.META else (fullpath, None)
+    response = FileResponse(open(filename, 'rb'), content_type=content_type)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    else:
+        response['Accept-Ranges'] = 'bytes'
+    return response, encoding
+
+
+@require_safe
+def serve(request, path):
+    name = posixpath.normpath(path).lstrip('/')
+    private = is_private(name)
+    if private:
+        check_signature(request, name)
+    fullpath = resolve(name)
+    stat = os.stat(fullpath)
+    etag = f'{int(stat.st_mtime_ns):x}-{stat.st_size:x}'
+
+    if is_not_modified(request, etag, int(stat.st_mtime)):
+        response, encoding = HttpResponseNotModified(), None
+    else:
+        response, encoding = file_response(request, name, fullpath, etag, stat)
+    # Сжатая копия отличается байтами, поэтому ETag для нее слабый.
+    response['ETag'] = ('W/' if encoding else '') + quote_etag(etag)
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    if private:
+        patch_cache_control(response, private=True, max_age=0)
+    else:
+        patch_cache_control(response, public=True, max_age=settings.MEDIA_MAX_AGE, immutable=True)
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
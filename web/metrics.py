@@ -0,0 +1,175 @@
+"""
+Метрики Prometheus: длительность запросов по маршрутам, SQL-запросы и их
+время, время сериализации, попадания в кэш ответов, размер ответов, длительность
+задач Celery и исход отправки уведомлений из outbox.
+
+Под gunicorn несколько процессов, поэтому при заданной переменной окружения
+PROMETHEUS_MULTIPROC_DIR prometheus_client пишет значения в общий каталог,
+а /metrics собирает их через MultiProcessCollector (см. gunicorn.conf.py).
+"""
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess,
+)
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+TASK_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+REQUEST_DURATION = Histogram(
+    'web_request_duration_seconds', "Длительность обработки запроса", ('route', 'method'), buckets=LATENCY_BUCKETS,
+)
+REQUESTS = Counter('web_requests_total', "Запросы по маршрутам и статусам", ('route', 'method', 'status'))
+DB_QUERIES = Histogram(
+    'web_db_queries_per_request', "SQL-запросов на один HTTP-запрос", ('route',), buckets=QUERY_BUCKETS,
+)
+DB_DURATION = Histogram(
+    'web_db_duration_seconds', "Суммарное время SQL-запросов на один HTTP-запрос", ('route',), buckets=LATENCY_BUCKETS,
+)
+SERIALIZER_DURATION = Histogram(
+    'web_serializer_duration_seconds', "Время сериализации ответа", ('serializer',), buckets=LATENCY_BUCKETS,
+)
+RESPONSE_SIZE = Histogram('web_response_size_bytes', "Размер тела ответа", ('route',), buckets=SIZE_BUCKETS)
+CACHE_REQUESTS = Counter('web_response_cache_total', "Обращения к кэшу ответов", ('view', 'result'))
+TASK_DURATION = Histogram(
+    'web_celery_task_duration_seconds', "Длительность задач Celery", ('task', 'state'), buckets=TASK_BUCKETS,
+)
+OUTBOX_MESSAGES = Counter('web_outbox_messages_total', "Уведомления из outbox по исходу отправки", ('result',))
+
+
+class RequestStats:
+    __slots__ = ('queries', 'db_time')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+
+# Контекстная переменная переходит и в потоки sync_to_async, поэтому
+# запросы из асинхронных view тоже попадают в статистику своего запроса.
+current_stats = ContextVar('web_request_stats', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    stats = current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - started
+
+
+def install_query_recorder(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def serializer_timer(serializer):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        SERIALIZER_DURATION.labels(type(serializer).__name__).observe(time.perf_counter() - started)
+
+
+def record_cache(view, result):
+    CACHE_REQUESTS.labels(type(view).__name__, result).inc()
+
+
+def route_label(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.route if match else 'unmatched'
+
+
+def response_size(response):
+    if response.streaming:
+        return None
+    return len(response.content)
+
+
+class MetricsMiddleware:
+    """Снимает длительность, число и время SQL-запросов и размер ответа по маршруту."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, token, started = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        self.finish(request, response, stats, started)
+        return response
+
+    async def __acall__(self, request):
+        stats, token, started = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        self.finish(request, response, stats, started)
+        return response
+
+    def start(self):
+        stats = RequestStats()
+        return stats, current_stats.set(stats), time.perf_counter()
+
+    def finish(self, request, response, stats, started):
+        route = route_label(request)
+        REQUEST_DURATION.labels(route, request.method).observe(time.perf_counter() - started)
+        REQUESTS.labels(route, request.method, response.status_code).inc()
+        DB_QUERIES.labels(route).observe(stats.queries)
+        DB_DURATION.labels(route).observe(stats.db_time)
+        size = response_size(response)
+        if size is not None:
+            RESPONSE_SIZE.labels(route).observe(size)
+
+
+def task_started(task_id=None, task=None, **kwargs):
+    task.request.metrics_started = time.perf_counter()
+
+
+def task_finished(task_id=None, task=None, state=None, **kwargs):
+    started = getattr(task.request, 'metrics_started', None)
+    if started is not None:
+        TASK_DURATION.labels(task.name, state or 'UNKNOWN').observe(time.perf_counter() - started)
+
+
+def get_registry():
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def metrics_view(request):
+    # Без METRICS_TOKEN метрики открыты только при DEBUG: по IP за прокси
+    # не отличить сборщик Prometheus от внешнего клиента.
+    token = settings.METRICS_TOKEN
+    if not token and not settings.DEBUG:
+        return HttpResponseForbidden()
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    return HttpResponse(generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST)
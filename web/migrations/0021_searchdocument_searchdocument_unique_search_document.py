@@ -0,0 +1,56 @@
+# Generated by Django 4.2.21 on 2026-10-17 23:55
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX web_searchdocument_vector_gin ON web_searchdocument USING gin (search_vector)'
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE web_searchdocument_fts USING fts5("
+            "title, body, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS web_searchdocument_vector_gin')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS web_searchdocument_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0020_about_updated_at_contact_updated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('project', 'Проект'), ('service', 'Услуга'), ('event', 'Мероприятие'), ('vacancy', 'Вакансия'), ('tool', 'Инструмент')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('title', models.CharField(max_length=255)),
+                ('body', models.TextField(blank=True)),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(editable=False, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Поисковый документ',
+                'verbose_name_plural': 'Поисковые документы',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchdocument',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_search_document'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.2.21 on 2026-10-17 23:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0021_searchdocument_searchdocument_unique_search_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='about',
+            name='image_srcset',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='image_srcset',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='eventimage',
+            name='image_srcset',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='gallery',
+            name='image_srcset',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='image_srcset',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='avatar_srcset',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='services',
+            name='image_srcset',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='toolimage',
+            name='image_srcset',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tools',
+            name='image_srcset',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='youtubeshort',
+            name='thumbnail_srcset',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.21 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0022_about_image_srcset_event_image_srcset_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='about',
+            index=models.Index(fields=['created_at', 'id'], name='about_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['created_at', 'id'], name='contact_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contactvacancy',
+            index=models.Index(fields=['created_at', 'id'], name='contactvacancy_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['created_at', 'id'], name='event_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gallery',
+            index=models.Index(fields=['created_at', 'id'], name='gallery_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['created_at', 'id'], name='project_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['created_at', 'id'], name='review_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='services',
+            index=models.Index(fields=['created_at', 'id'], name='services_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tools',
+            index=models.Index(fields=['created_at', 'id'], name='tools_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vacancy',
+            index=models.Index(fields=['created_at', 'id'], name='vacancy_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='youtubeshort',
+            index=models.Index(fields=['created_at', 'id'], name='youtubeshort_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.21 on 2026-10-18 11:03
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0023_about_created_id_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Upload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255)),
+                ('size', models.PositiveIntegerField()),
+                ('offset', models.PositiveIntegerField(default=0)),
+                ('file', models.FileField(blank=True, upload_to='uploads/')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Загрузка файла',
+                'verbose_name_plural': 'Загрузки файлов',
+            },
+        ),
+    ]
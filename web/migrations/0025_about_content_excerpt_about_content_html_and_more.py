@@ -0,0 +1,130 @@
+# Generated by Django 4.2.21 on 2026-10-18 14:20
+
+from django.db import migrations, models
+
+from ._richtext_0025 import render
+
+
+RICH_TEXT_MODELS = (
+    'about', 'event', 'eventimage', 'gallery', 'project', 'review', 'services', 'toolimage', 'tools', 'vacancy',
+)
+
+
+def render_existing(apps, schema_editor):
+    for model_name in RICH_TEXT_MODELS:
+        model = apps.get_model('web', model_name)
+        for pk, content in model.objects.values_list('pk', 'content').iterator():
+            # Адаптивные версии встроенных изображений добавит команда render_rich_text.
+            html, excerpt = render(content)
+            model.objects.filter(pk=pk).update(content_html=html, content_excerpt=excerpt)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0024_upload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='about',
+            name='content_excerpt',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='about',
+            name='content_html',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='content_excerpt',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='content_html',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='eventimage',
+            name='content_excerpt',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='eventimage',
+            name='content_html',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='gallery',
+            name='content_excerpt',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='gallery',
+            name='content_html',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='content_excerpt',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='content_html',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='content_excerpt',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='content_html',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='services',
+            name='content_excerpt',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='services',
+            name='content_html',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='toolimage',
+            name='content_excerpt',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='toolimage',
+            name='content_html',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='tools',
+            name='content_excerpt',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='tools',
+            name='content_html',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='vacancy',
+            name='content_excerpt',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='vacancy',
+            name='content_html',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(render_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.21 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0025_about_content_excerpt_about_content_html_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(condition=models.Q(('is_featured', True)), fields=['created_at', 'id'], name='project_featured_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vacancy',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['created_at', 'id'], name='vacancy_active_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.21 on 2026-10-18 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0026_project_featured_idx_vacancy_active_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message', models.TextField()),
+                ('file_path', models.CharField(blank=True, max_length=500)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+            ],
+            options={
+                'verbose_name': 'Исходящее уведомление',
+                'verbose_name_plural': 'Исходящие уведомления',
+                'indexes': [models.Index(condition=models.Q(('sent_at__isnull', True)), fields=['created_at', 'id'], name='outbox_pending_idx')],
+            },
+        ),
+    ]
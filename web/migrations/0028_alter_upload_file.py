@@ -0,0 +1,18 @@
+# Generated by Django 4.2.21 on 2026-10-18 19:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0027_outboxmessage'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='upload',
+            name='file',
+            field=models.FileField(blank=True, upload_to='resumable/'),
+        ),
+    ]
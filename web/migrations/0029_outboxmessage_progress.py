@@ -0,0 +1,23 @@
+# Generated by Django 4.2.21 on 2026-10-18 21:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0028_alter_upload_file'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxmessage',
+            name='text_sent',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='outboxmessage',
+            name='claimed_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
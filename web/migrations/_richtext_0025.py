@@ -0,0 +1,185 @@
+"""
+Копия web.richtext.render на момент миграции 0025 для заполнения колонок
+``content_html``/``content_excerpt`` существующих строк. Миграции не должны
+зависеть от живого кода: его правки не должны ломать миграцию с нуля.
+Адаптивные версии изображений и настройки здесь не используются - их
+добавит команда render_rich_text.
+"""
+import re
+from html import escape
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+
+ALLOWED_TAGS = {
+    'p', 'br', 'hr', 'div', 'span', 'strong', 'b', 'em', 'i', 'u', 's', 'strike', 'sub', 'sup',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'ul', 'ol', 'li', 'blockquote', 'pre', 'code',
+    'a', 'img', 'figure', 'figcaption', 'iframe',
+    'table', 'caption', 'thead', 'tbody', 'tfoot', 'tr', 'th', 'td',
+}
+ALLOWED_ATTRS = {
+    'a': {'href', 'title', 'target'},
+    'img': {'src', 'alt', 'title', 'width', 'height'},
+    'iframe': {'src', 'width', 'height', 'title', 'allowfullscreen'},
+    'ol': {'start'},
+    'th': {'colspan', 'rowspan'},
+    'td': {'colspan', 'rowspan'},
+}
+URL_ATTRS = {'href', 'src'}
+ALLOWED_SCHEMES = {'', 'http', 'https', 'mailto', 'tel'}
+IFRAME_HOSTS = {'www.youtube.com', 'youtube.com', 'www.youtube-nocookie.com', 'player.vimeo.com'}
+# Теги, которые удаляются вместе с содержимым.
+DROPPED_TAGS = {'script', 'style', 'template', 'noscript', 'textarea', 'title', 'object', 'embed', 'svg', 'math'}
+VOID_TAGS = {'br', 'hr', 'img'}
+BLOCK_TAGS = {
+    'p', 'br', 'hr', 'div', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'ul', 'ol', 'li', 'blockquote', 'pre',
+    'figure', 'figcaption', 'table', 'caption', 'thead', 'tbody', 'tfoot', 'tr', 'th', 'td',
+}
+# Теги, которые закрываются открытием следующего (<li>one<li>two).
+IMPLICIT_CLOSE = {'li': {'li'}, 'p': {'p'}, 'tr': {'tr', 'td', 'th'}, 'td': {'td', 'th'}, 'th': {'td', 'th'}}
+EXCERPT_LENGTH = 300
+
+WHITESPACE_RE = re.compile(r'\s+')
+CONTROL_RE = re.compile(r'[\x00-\x20\x7f]+')
+
+
+def safe_url(value, tag):
+    value = value.strip()
+    try:
+        # Схему проверяем без управляющих символов и пробелов: браузеры их пропускают.
+        parts = urlsplit(CONTROL_RE.sub('', value))
+    except ValueError:
+        return None
+    if parts.scheme.lower() not in ALLOWED_SCHEMES:
+        return None
+    if tag == 'iframe' and (parts.scheme not in ('http', 'https') or parts.hostname not in IFRAME_HOSTS):
+        return None
+    return value
+
+
+def truncate(text, length):
+    if len(text) <= length:
+        return text
+    cut = text[:length].rsplit(' ', 1)[0] or text[:length]
+    return cut.rstrip(' .,;:!?-') + '…'
+
+
+class Renderer(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out = []
+        self.text = []
+        self.stack = []
+        self.dropped = 0
+        self.pre = 0
+        self.block_boundary = True
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROPPED_TAGS:
+            self.dropped += 1
+            return
+        if self.dropped:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+        if tag not in ALLOWED_TAGS:
+            return
+
+        allowed = ALLOWED_ATTRS.get(tag, set())
+        clean = {}
+        for name, value in attrs:
+            if name not in allowed:
+                continue
+            value = value or ''
+            if name in URL_ATTRS:
+                value = safe_url(value, tag)
+                if value is None:
+                    continue
+            clean[name] = value
+
+        if tag in ('img', 'iframe'):
+            if 'src' not in clean:
+                return
+            clean['loading'] = 'lazy'
+        if tag == 'a' and 'target' in clean:
+            clean['target'] = '_blank'
+            clean['rel'] = 'noopener noreferrer'
+        if tag == 'img':
+            self.write_image(clean)
+            return
+
+        while self.stack and self.stack[-1] in IMPLICIT_CLOSE.get(tag, ()):
+            self.close_tag(self.stack.pop())
+        self.out.append(self.tag(tag, clean))
+        self.block_boundary = tag in BLOCK_TAGS
+        if tag not in VOID_TAGS:
+            self.stack.append(tag)
+            if tag == 'pre':
+                self.pre += 1
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and tag in DROPPED_TAGS:
+            self.dropped -= 1
+        elif tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROPPED_TAGS:
+            self.dropped = max(0, self.dropped - 1)
+            return
+        if self.dropped:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+        if tag not in self.stack:
+            return
+        # Незакрытые внутри теги закрываются вместе с ним.
+        while self.stack:
+            opened = self.stack.pop()
+            self.close_tag(opened)
+            if opened == tag:
+                break
+
+    def close_tag(self, tag):
+        self.out.append(f'</{tag}>')
+        self.block_boundary = tag in BLOCK_TAGS
+        if tag == 'pre':
+            self.pre -= 1
+
+    def handle_data(self, data):
+        if self.dropped:
+            return
+        self.text.append(data)
+        if not self.pre:
+            data = WHITESPACE_RE.sub(' ', data)
+            # Пробелы после блочных тегов не видны и только занимают место.
+            if self.block_boundary:
+                data = data.lstrip()
+            if not data:
+                return
+        self.out.append(escape(data, quote=False))
+        self.block_boundary = False
+
+    def tag(self, tag, attrs):
+        rendered = ''.join(f' {name}="{escape(value)}"' if value else f' {name}' for name, value in attrs.items())
+        return f'<{tag}{rendered}>'
+
+    def write_image(self, attrs):
+        attrs['decoding'] = 'async'
+        self.block_boundary = False
+        self.out.append(self.tag('img', attrs))
+
+    def result(self):
+        while self.stack:
+            self.close_tag(self.stack.pop())
+        html = ''.join(self.out).strip()
+        text = WHITESPACE_RE.sub(' ', ''.join(self.text)).strip()
+        return html, truncate(text, EXCERPT_LENGTH)
+
+
+def render(source):
+    renderer = Renderer()
+    renderer.feed(source or '')
+    renderer.close()
+    return renderer.result()
@@ -1,44 +1,39 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.contrib.postgres.search import SearchVectorField
 from django.core.exceptions import ValidationError
 import re
 import os
-import phonenumbers
+import uuid
 from ckeditor.fields import RichTextField
 from django.utils.translation import gettext_lazy as _
 
+from .phones import normalize_phone
+
+
+KG_PHONE_PATTERN = re.compile(r'^\+996\d{9}$')
+
 
 def validate_phone(value):
-    pattern = r'^\+996\d{9}$'
-    if not re.fullmatch(pattern, value):
+    if not KG_PHONE_PATTERN.fullmatch(value):
         raise ValidationError("Номер должен быть в формате +996XXXXXXXXX (9 цифр после +996)")
 
 
-def validate_file(value):
-    max_size = 5 * 1024 * 1024  # 5 МБ
-    disallowed_extensions = ('.json', '.py', '.js', '.sh', '.bat', '.cmd')
+MAX_FILE_SIZE = 5 * 1024 * 1024  # 5 МБ
+DISALLOWED_EXTENSIONS = ('.json', '.py', '.js', '.sh', '.bat', '.cmd')
 
-    if value.size > max_size:
-        raise ValidationError(f'Размер файла не должен превышать 5 МБ! Текущий размер: {value.size / 1024 / 1024:.2f} МБ')
 
-    file_extension = os.path.splitext(value.name.lower())[1]
-    if file_extension in disallowed_extensions:
-        raise ValidationError('Недопустимый тип файла! Запрещены .json, .py, .js, .sh, .bat, .cmd.')
+def check_file(name, size):
+    if size > MAX_FILE_SIZE:
+        raise ValidationError(f'Размер файла не должен превышать 5 МБ! Текущий размер: {size / 1024 / 1024:.2f} МБ')
 
+    file_extension = os.path.splitext(name.lower())[1]
+    if file_extension in DISALLOWED_EXTENSIONS:
+        raise ValidationError('Недопустимый тип файла! Запрещены .json, .py, .js, .sh, .bat, .cmd.')
 
-def normalize_kg_phone(phone: str) -> str:
-    cleaned = re.sub(r'[^\d+]', '', phone)
 
-    if cleaned.startswith('+996'):
-        return cleaned
-    elif cleaned.startswith('996'):
-        return '+' + cleaned
-    elif cleaned.startswith('0') and len(cleaned) >= 10:
-        return '+996' + cleaned[1:]
-    elif cleaned.startswith('7') and len(cleaned) == 9:
-        return '+996' + cleaned
-    else:
-        raise ValidationError("Неверный формат номера. Используйте +996 XXX XXX XXX")
+def validate_file(value):
+    check_file(value.name, value.size)
 
 
 class Contact(models.Model):
@@ -48,30 +43,25 @@ class Contact(models.Model):
     file = models.FileField(upload_to='contacts/', null=True, blank=True, validators=[validate_file])
     phone = models.CharField(max_length=20, validators=[], null=False, blank=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         verbose_name = _("Заявка")
         verbose_name_plural = _("Заявки")
+        indexes = [models.Index(fields=['created_at', 'id'], name='contact_created_id_idx')]
 
     def clean(self):
         super().clean()
         if self.phone:
             try:
-                normalized_phone = normalize_kg_phone(self.phone)
-
-                parsed = phonenumbers.parse(normalized_phone, None)
-                if not phonenumbers.is_valid_number(parsed) or parsed.country_code != 996:
-                    raise ValidationError({'phone': "Неверный кыргызский номер. Ожидается +996 XXX XXX XXX"})
-
-                self.phone = phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.INTERNATIONAL)
-
-            except phonenumbers.NumberParseException:
-                raise ValidationError({'phone': "Неверный формат номера. Используйте +996 XXX XXX XXX"})
+                self.phone = normalize_phone(self.phone)
             except ValidationError as e:
-                raise e
+                raise ValidationError({'phone': e.messages})
 
-    def save(self, *args, **kwargs):
-        self.full_clean()
+    def save(self, *args, validate=True, **kwargs):
+        # validate=False передают сериализаторы, которые уже проверили данные.
+        if validate:
+            self.full_clean()
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -80,58 +70,79 @@ class Contact(models.Model):
 class YouTubeShort(models.Model):
     video_url = models.URLField()
     thumbnail = models.ImageField(upload_to='youtube_shorts/', null=True, blank=True)
+    thumbnail_srcset = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         verbose_name = _("Ютуб-Шортс")
         verbose_name_plural = _("Ютуб-Шортсы")
+        indexes = [models.Index(fields=['created_at', 'id'], name='youtubeshort_created_id_idx')]
 
     def __str__(self):
         return self.video_url
 
 class Event(models.Model):
     content = RichTextField(default='', blank=True)
+    content_html = models.TextField(default='', blank=True, editable=False)
+    content_excerpt = models.TextField(default='', blank=True, editable=False)
     title = models.CharField(max_length=255)
     description = models.TextField()
     date = models.DateField(null=True, blank=True)  # Разрешаем NULL
     image = models.ImageField(upload_to='events/', null=True, blank=True)
+    image_srcset = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     gallery = models.ManyToManyField('EventImage', related_name='events')
 
     class Meta:
         verbose_name = _("Мероприятие")
         verbose_name_plural = _("Мероприятия")
+        indexes = [models.Index(fields=['created_at', 'id'], name='event_created_id_idx')]
 
     def __str__(self):
         return self.title
 
 class EventImage(models.Model):
     content = RichTextField(default='', blank=True)
+    content_html = models.TextField(default='', blank=True, editable=False)
+    content_excerpt = models.TextField(default='', blank=True, editable=False)
     image = models.ImageField(upload_to='event_gallery/')
+    image_srcset = models.JSONField(default=dict, blank=True, editable=False)
     event = models.ForeignKey(Event, related_name='gallery_images', on_delete=models.CASCADE)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         verbose_name = _("Фото мероприятия")
         verbose_name_plural = _("Фото мероприятий")
 
     def __str__(self):
-        return f"Image for {self.event.title}"
+        if EventImage.event.is_cached(self):
+            return f"Image for {self.event.title}"
+        return f"Image for event #{self.event_id}"
 
 class Services(models.Model):
     content = RichTextField(default='', blank=True)
+    content_html = models.TextField(default='', blank=True, editable=False)
+    content_excerpt = models.TextField(default='', blank=True, editable=False)
     title = models.CharField(max_length=200)
     image = models.ImageField(upload_to='services/', blank=True)
+    image_srcset = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         verbose_name = _("Услуга")
         verbose_name_plural = _("Услуги")
+        indexes = [models.Index(fields=['created_at', 'id'], name='services_created_id_idx')]
 
     def __str__(self):
         return self.title
 
 class Vacancy(models.Model):
     content = RichTextField(default='', blank=True)
+    content_html = models.TextField(default='', blank=True, editable=False)
+    content_excerpt = models.TextField(default='', blank=True, editable=False)
     title = models.CharField(max_length=255)
     description = models.TextField()
     requirements = models.TextField()
@@ -139,26 +150,39 @@ class Vacancy(models.Model):
     salary = models.CharField(max_length=255, blank=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         verbose_name = _("Вакансия")
         verbose_name_plural = _("Вакансии")
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='vacancy_created_id_idx'),
+            models.Index(fields=['created_at', 'id'], condition=models.Q(is_active=True), name='vacancy_active_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
 class Project(models.Model):
     content = RichTextField(default='', blank=True)
+    content_html = models.TextField(default='', blank=True, editable=False)
+    content_excerpt = models.TextField(default='', blank=True, editable=False)
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True)
     image = models.ImageField(upload_to='projects/', null=True, blank=True)
+    image_srcset = models.JSONField(default=dict, blank=True, editable=False)
     link = models.URLField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     is_featured = models.BooleanField(default=False)
 
     class Meta:
         verbose_name = _("Проект")
         verbose_name_plural = _("Проекты")
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='project_created_id_idx'),
+            models.Index(fields=['created_at', 'id'], condition=models.Q(is_featured=True), name='project_featured_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -166,75 +190,105 @@ class Project(models.Model):
 
 class Review(models.Model):
     content = RichTextField(default='', blank=True)
+    content_html = models.TextField(default='', blank=True, editable=False)
+    content_excerpt = models.TextField(default='', blank=True, editable=False)
     author = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     avatar = models.ImageField(upload_to='reviews/avatars/', null=True, blank=True)
+    avatar_srcset = models.JSONField(default=dict, blank=True, editable=False)
     text = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         verbose_name = _("Отзыв")
         verbose_name_plural = _("Отзывы")
+        indexes = [models.Index(fields=['created_at', 'id'], name='review_created_id_idx')]
 
     def __str__(self):
-        return f"Review by {self.author.username if self.author else 'Anonymous'}"
+        if self.author_id is None:
+            return "Review by Anonymous"
+        if Review.author.is_cached(self):
+            return f"Review by {self.author.username}"
+        return f"Review by user #{self.author_id}"
 
 
 class About(models.Model):
     content = RichTextField(default='', blank=True)
+    content_html = models.TextField(default='', blank=True, editable=False)
+    content_excerpt = models.TextField(default='', blank=True, editable=False)
     title = models.CharField(max_length=200)
     image = models.ImageField(upload_to='about/', null=True, blank=True)
+    image_srcset = models.JSONField(default=dict, blank=True, editable=False)
     description = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         verbose_name = _("О нас")
         verbose_name_plural = _("О нас")
+        indexes = [models.Index(fields=['created_at', 'id'], name='about_created_id_idx')]
 
     def __str__(self):
         return self.title
 
 class Gallery(models.Model):
     content = RichTextField(default='', blank=True)
+    content_html = models.TextField(default='', blank=True, editable=False)
+    content_excerpt = models.TextField(default='', blank=True, editable=False)
     title = models.CharField(max_length=200, blank=True, null=True)
     image = models.ImageField(upload_to='gallery/', null=True, blank=True)
+    image_srcset = models.JSONField(default=dict, blank=True, editable=False)
     description = models.TextField(blank=True, null=True)
     related_service = models.ForeignKey(Services, on_delete=models.SET_NULL, null=True, blank=True)
     related_project = models.ForeignKey(Project, on_delete=models.SET_NULL, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         verbose_name = _("Галерея")
         verbose_name_plural = _("Галерея")
+        indexes = [models.Index(fields=['created_at', 'id'], name='gallery_created_id_idx')]
 
     def __str__(self):
         return f"Gallery Image - {self.title or 'No Title'}"
 
 class Tools(models.Model):
     content = RichTextField(default='', blank=True)
+    content_html = models.TextField(default='', blank=True, editable=False)
+    content_excerpt = models.TextField(default='', blank=True, editable=False)
     name = models.CharField(max_length=255)
     image = models.ImageField(upload_to='tools/')
+    image_srcset = models.JSONField(default=dict, blank=True, editable=False)
     additional_content = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         verbose_name = _("Инструменты")
         verbose_name_plural = _("Инструменты")
+        indexes = [models.Index(fields=['created_at', 'id'], name='tools_created_id_idx')]
 
     def __str__(self):
         return self.name
 
 class ToolImage(models.Model):
     content = RichTextField(default='', blank=True)
+    content_html = models.TextField(default='', blank=True, editable=False)
+    content_excerpt = models.TextField(default='', blank=True, editable=False)
     tool = models.ForeignKey(Tools, related_name='images', on_delete=models.CASCADE)
     image = models.ImageField(upload_to='tool_images/')
+    image_srcset = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         verbose_name = _("Фото инструментов")
         verbose_name_plural = _("Фото инструментов")
 
     def __str__(self):
-        return f"Image for {self.tool.name}"
+        if ToolImage.tool.is_cached(self):
+            return f"Image for {self.tool.name}"
+        return f"Image for tool #{self.tool_id}"
 
 
 class ContactVacancy(models.Model):
@@ -244,32 +298,107 @@ class ContactVacancy(models.Model):
     link = models.URLField(null=False, blank=False)
     file = models.FileField(upload_to='contacts/vacancy/', null=True, blank=True, validators=[validate_file])
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         verbose_name = _("Заявка вакансии")
         verbose_name_plural = _("Заявки вакансий")
+        indexes = [models.Index(fields=['created_at', 'id'], name='contactvacancy_created_id_idx')]
 
     def clean(self):
         super().clean()
         if self.phone:
             try:
-                normalized_phone = normalize_kg_phone(self.phone)
-
-                parsed = phonenumbers.parse(normalized_phone, None)
-                if not phonenumbers.is_valid_number(parsed) or parsed.country_code != 996:
-                    raise ValidationError({'phone': "Неверный кыргызский номер. Ожидается +996 XXX XXX XXX"})
-
-                self.phone = phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.INTERNATIONAL)
-
-            except phonenumbers.NumberParseException:
-                raise ValidationError({'phone': "Неверный формат номера. Используйте +996 XXX XXX XXX"})
+                self.phone = normalize_phone(self.phone)
             except ValidationError as e:
-                raise e
+                raise ValidationError({'phone': e.messages})
 
-    def save(self, *args, **kwargs):
-        self.full_clean()
+    def save(self, *args, validate=True, **kwargs):
+        # validate=False передают сериализаторы, которые уже проверили данные.
+        if validate:
+            self.full_clean()
         super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Message from {self.name}"
 
+
+
+class SearchDocument(models.Model):
+    KIND_CHOICES = (
+        ('project', _("Проект")),
+        ('service', _("Услуга")),
+        ('event', _("Мероприятие")),
+        ('vacancy', _("Вакансия")),
+        ('tool', _("Инструмент")),
+    )
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    title = models.CharField(max_length=255)
+    body = models.TextField(blank=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("Поисковый документ")
+        verbose_name_plural = _("Поисковые документы")
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_search_document'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.object_id}: {self.title}"
+
+
+class Upload(models.Model):
+    """
+    Вложение заявки, загружаемое частями до отправки формы. Пока загрузка не
+    завершена, данные дописываются во временный файл; после последней части
+    файл переносится в хранилище и на него можно сослаться через upload_id.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveIntegerField()
+    offset = models.PositiveIntegerField(default=0)
+    file = models.FileField(upload_to='resumable/', blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("Загрузка файла")
+        verbose_name_plural = _("Загрузки файлов")
+
+    @property
+    def is_complete(self):
+        return bool(self.file)
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+
+
+class OutboxMessage(models.Model):
+    """
+    Уведомление о заявке, записанное в той же транзакции, что и сама заявка.
+    Пока sent_at пуст, сообщение ждет диспетчера (web/outbox.py); text_sent
+    отмечает, что текст уже ушел и осталось отправить файл.
+    """
+    message = models.TextField()
+    file_path = models.CharField(max_length=500, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    text_sent = models.BooleanField(default=False)
+    claimed_until = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name = _("Исходящее уведомление")
+        verbose_name_plural = _("Исходящие уведомления")
+        indexes = [
+            models.Index(fields=['created_at', 'id'], condition=models.Q(sent_at__isnull=True), name='outbox_pending_idx'),
+        ]
+
+    def __str__(self):
+        state = 'отправлено' if self.sent_at else f'попыток: {self.attempts}'
+        return f"Уведомление #{self.pk} ({state})"
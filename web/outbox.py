@@ -0,0 +1,162 @@
+"""
+Transactional outbox для уведомлений о заявках.
+
+Заявка и ее уведомление (OutboxMessage) пишутся в одной транзакции, поэтому
+POST стоит один лишний INSERT вместо обращения к брокеру: уведомление не уйдет
+до коммита и не потеряется, если Redis недоступен в момент запроса.
+
+Задача dispatch_outbox (Celery beat, раз в OUTBOX_DISPATCH_INTERVAL секунд)
+в короткой транзакции забирает пачку неотправленных строк через SELECT ...
+FOR UPDATE SKIP LOCKED и помечает их claimed_until, так что параллельные
+диспетчеры не отправят одно и то же дважды. Сама отправка идет уже без
+транзакции и блокировок: дайджест передается задачам Celery
+(OUTBOX_DELIVERY='celery') или уходит в Telegram из диспетчера ('direct').
+Строки получают text_sent или sent_at только после ответа Telegram на свою
+часть, поэтому при ошибке на файлах текст повторно не отправляется, а задача,
+не дошедшая до Telegram, оставляет строку на повтор. Упавшая пачка сохраняет attempts и
+last_error, и следующий запуск повторит остаток, пока не исчерпан
+OUTBOX_MAX_ATTEMPTS; строки умершего диспетчера вернутся по истечении
+OUTBOX_CLAIM_TIMEOUT.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import metrics, telegram
+from .models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+ERROR_LIMIT = 1000
+
+
+def save_with_notification(serializer, build_message):
+    """Сохраняет заявку и ее уведомление одной транзакцией."""
+    with transaction.atomic():
+        contact = serializer.save()
+        OutboxMessage.objects.create(
+            message=build_message(contact),
+            file_path=contact.file.path if contact.file else '',
+        )
+    return contact
+
+
+def pending():
+    return OutboxMessage.objects.filter(
+        sent_at__isnull=True, attempts__lt=settings.OUTBOX_MAX_ATTEMPTS,
+    ).filter(
+        Q(claimed_until__isnull=True) | Q(claimed_until__lt=timezone.now()),
+    ).order_by('created_at', 'id')
+
+
+def claim(batch_size=None):
+    """Забирает пачку строк на OUTBOX_CLAIM_TIMEOUT секунд; каждая выдача - попытка."""
+    with transaction.atomic():
+        batch = list(pending().select_for_update(skip_locked=True)[:batch_size or settings.OUTBOX_BATCH_SIZE])
+        if batch:
+            claimed_until = timezone.now() + timedelta(seconds=settings.OUTBOX_CLAIM_TIMEOUT)
+            OutboxMessage.objects.filter(pk__in=[message.pk for message in batch]).update(
+                claimed_until=claimed_until, attempts=F('attempts') + 1,
+            )
+    return batch
+
+
+def wait_for_token():
+    limiter = telegram.get_rate_limiter()
+    while wait := limiter.consume():
+        time.sleep(wait)
+
+
+def send_text(text, message_ids):
+    if settings.OUTBOX_DELIVERY == 'direct':
+        wait_for_token()
+        telegram.send_message(text)
+        text_delivered(message_ids)
+    else:
+        from .utils import send_telegram_digest
+
+        send_telegram_digest.delay(text, message_ids)
+
+
+def send_files(messages):
+    file_paths = [message.file_path for message in messages]
+    message_ids = [message.pk for message in messages]
+    if settings.OUTBOX_DELIVERY == 'direct':
+        wait_for_token()
+        telegram.send_documents(file_paths)
+        files_delivered(message_ids)
+    else:
+        from .utils import send_telegram_documents
+
+        send_telegram_documents.delay(file_paths, message_ids)
+
+
+def sent():
+    return {'sent_at': timezone.now(), 'claimed_until': None, 'last_error': ''}
+
+
+def file_groups(messages):
+    for start in range(0, len(messages), telegram.MEDIA_GROUP_LIMIT):
+        yield messages[start:start + telegram.MEDIA_GROUP_LIMIT]
+
+
+def text_delivered(message_ids):
+    """Текст доставлен: строки без файла отправлены, файлы остальных уходят следом."""
+    messages = OutboxMessage.objects.filter(pk__in=message_ids)
+    messages.filter(file_path='').update(text_sent=True, **sent())
+    messages.exclude(file_path='').update(text_sent=True)
+    for part in file_groups(list(messages.exclude(file_path='').order_by('created_at', 'id'))):
+        send_files(part)
+
+
+def files_delivered(message_ids):
+    OutboxMessage.objects.filter(pk__in=message_ids).update(**sent())
+
+
+def deliver(messages):
+    """
+    Отправляет тексты частями дайджеста, за каждой частью - ее файлы альбомами.
+    Строки отмечаются только после ответа Telegram: в режиме 'celery' это
+    делают сами задачи, диспетчер лишь ставит их в очередь.
+    """
+    texts = [message for message in messages if not message.text_sent]
+    for group in telegram.digest_groups([message.message for message in texts]):
+        part, texts = texts[:len(group)], texts[len(group):]
+        send_text(telegram.build_digest(group)[0], [message.pk for message in part])
+
+    # Текст этих строк ушел в прошлый раз, не дошли только файлы.
+    for part in file_groups([message for message in messages if message.file_path and message.text_sent]):
+        send_files(part)
+
+
+def dispatch(batch_size=None):
+    """Отправляет одну пачку уведомлений; возвращает число отправленных или переданных задачам."""
+    batch = claim(batch_size)
+    if not batch:
+        return 0
+
+    try:
+        deliver(batch)
+    except Exception as e:
+        logger.exception("Ошибка отправки %s уведомлений из outbox", len(batch))
+        failed = OutboxMessage.objects.filter(pk__in=[message.pk for message in batch], sent_at__isnull=True)
+        count = failed.update(claimed_until=None, last_error=str(e)[:ERROR_LIMIT])
+        metrics.OUTBOX_MESSAGES.labels('failed').inc(count)
+        metrics.OUTBOX_MESSAGES.labels('sent').inc(len(batch) - count)
+        return len(batch) - count
+
+    metrics.OUTBOX_MESSAGES.labels('sent').inc(len(batch))
+    logger.info("Из outbox отправлено уведомлений: %s", len(batch))
+    return len(batch)
+
+
+def purge(days=None):
+    """Удаляет отправленные уведомления старше OUTBOX_RETENTION_DAYS дней."""
+    cutoff = timezone.now() - timedelta(days=days or settings.OUTBOX_RETENTION_DAYS)
+    deleted, _ = OutboxMessage.objects.filter(sent_at__lt=cutoff).delete()
+    return deleted
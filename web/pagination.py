@@ -0,0 +1,154 @@
+import base64
+
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+KEYSET_FIELDS = ('created_at', 'id')
+
+
+def encode_cursor(instance):
+    raw = f"{instance.created_at.isoformat()}|{instance.pk}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, pk = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|')
+        created_at, pk = parse_datetime(created_at), int(pk)
+    except ValueError:
+        created_at = None
+    if created_at is None:
+        raise NotFound("Неверный курсор")
+    return created_at, pk
+
+
+def supports_keyset(queryset):
+    ordering = queryset.query.order_by
+    return bool(ordering) and ordering[0] == 'created_at'
+
+
+class StandardResultsSetPagination(PageNumberPagination):
+    """
+    Постраничная выдача с двумя дополнительными режимами:
+
+    * ``?cursor=`` - keyset-пагинация по ``(created_at, id)``: следующая
+      страница выбирается условием ``WHERE (created_at, id) > курсор``
+      по составному индексу, без COUNT и OFFSET, поэтому глубокие страницы
+      стоят столько же, сколько первая. Пустой курсор - первая страница,
+      переход только вперед по ссылке ``next``. Работает для queryset,
+      отсортированных по ``created_at``; остальные остаются постраничными.
+    * ``?count=false`` - обычные номера страниц без запроса COUNT(*);
+      наличие следующей страницы определяется по лишней строке.
+
+    Без этих параметров ответ совпадает с PageNumberPagination.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+
+    def get_mode(self, queryset, request):
+        if self.cursor_query_param in request.query_params and supports_keyset(queryset):
+            return 'cursor'
+        if request.query_params.get(self.count_query_param, '').lower() in ('false', '0'):
+            return 'uncounted'
+        return 'page'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.mode = self.get_mode(queryset, request)
+        if self.mode == 'page':
+            return super().paginate_queryset(queryset, request, view)
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        return self.finish(list(self.window(queryset, request, page_size)), page_size)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """То же, что paginate_queryset, но через асинхронный ORM."""
+        self.request = request
+        self.mode = self.get_mode(queryset, request)
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        if self.mode == 'page':
+            paginator = self.django_paginator_class(queryset, page_size)
+            paginator.count = await queryset.acount()
+            page_number = self.get_page_number(request, paginator)
+            try:
+                self.page = paginator.page(page_number)
+            except InvalidPage as exc:
+                raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+            self.page.object_list = [row async for row in self.page.object_list]
+            return list(self.page)
+
+        return self.finish([row async for row in self.window(queryset, request, page_size)], page_size)
+
+    def window(self, queryset, request, page_size):
+        """Срез queryset на страницу и одну лишнюю строку, по которой видно продолжение."""
+        if self.mode == 'cursor':
+            cursor = request.query_params[self.cursor_query_param]
+            queryset = queryset.order_by(*KEYSET_FIELDS)
+            if cursor:
+                created_at, pk = decode_cursor(cursor)
+                # created_at__gte - граница диапазона по индексу; без нее OR
+                # фильтрует все строки до курсора и глубина снова стоит O(N).
+                queryset = queryset.filter(created_at__gte=created_at).filter(
+                    Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk),
+                )
+            return queryset[:page_size + 1]
+
+        try:
+            self.page_number = int(request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            self.page_number = 0
+        if self.page_number < 1:
+            raise NotFound(self.invalid_page_message.format(page_number=self.page_number, message=''))
+        offset = (self.page_number - 1) * page_size
+        return queryset[offset:offset + page_size + 1]
+
+    def finish(self, rows, page_size):
+        if self.mode == 'uncounted' and not rows and self.page_number > 1:
+            raise NotFound(self.invalid_page_message.format(page_number=self.page_number, message=''))
+        self.has_next = len(rows) > page_size
+        self.rows = rows[:page_size]
+        return self.rows
+
+    def get_next_link(self):
+        if self.mode == 'page':
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.mode == 'cursor':
+            url = remove_query_param(url, self.page_query_param)
+            return replace_query_param(url, self.cursor_query_param, encode_cursor(self.rows[-1]))
+        return replace_query_param(url, self.page_query_param, self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.mode == 'page':
+            return super().get_previous_link()
+        if self.mode == 'cursor' or self.page_number == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.page_number - 1)
+
+    def get_paginated_response(self, data):
+        if self.mode == 'page':
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
@@ -0,0 +1,65 @@
+import re
+from functools import lru_cache
+
+import phonenumbers
+from django.conf import settings
+from django.core.exceptions import ValidationError
+
+
+NON_PHONE_CHARS = re.compile(r'[^\d+]')
+
+FORMAT_ERROR = "Неверный формат номера. Используйте +996 XXX XXX XXX"
+INVALID_ERROR = "Неверный кыргызский номер. Ожидается +996 XXX XXX XXX"
+
+
+def normalize_kg_phone(phone: str) -> str:
+    cleaned = NON_PHONE_CHARS.sub('', phone)
+
+    if cleaned.startswith('+996'):
+        return cleaned
+    elif cleaned.startswith('996'):
+        return '+' + cleaned
+    elif cleaned.startswith('0') and len(cleaned) >= 10:
+        return '+996' + cleaned[1:]
+    elif cleaned.startswith('7') and len(cleaned) == 9:
+        return '+996' + cleaned
+    else:
+        raise ValidationError(FORMAT_ERROR)
+
+
+@lru_cache(maxsize=settings.PHONE_CACHE_SIZE)
+def _normalize(phone):
+    """Возвращает пару (номер, ошибка); кэшируются и удачные, и неудачные разборы."""
+    try:
+        parsed = phonenumbers.parse(normalize_kg_phone(phone), None)
+    except (ValidationError, phonenumbers.NumberParseException):
+        return None, FORMAT_ERROR
+    if parsed.country_code != 996 or not phonenumbers.is_valid_number(parsed):
+        return None, INVALID_ERROR
+    return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.INTERNATIONAL), None
+
+
+def normalize_phone(phone):
+    """
+    Приводит кыргызский номер к виду ``+996 XXX XXX XXX``. Результаты разбора
+    phonenumbers кэшируются в LRU на PHONE_CACHE_SIZE номеров, поэтому
+    повторная проверка того же номера (сериализатор, админка, импорт) почти
+    бесплатна. Уже нормализованный номер возвращается без изменений.
+    """
+    number, error = _normalize(phone.strip())
+    if error:
+        raise ValidationError(error, code='invalid_phone')
+    return number
+
+
+def normalize_many(phones):
+    """Пакетная проверка списка номеров, например импортируемых лидов."""
+    results = []
+    for phone in phones:
+        number, error = _normalize(str(phone).strip())
+        results.append({'input': phone, 'phone': number, 'error': error})
+    return results
+
+
+cache_info = _normalize.cache_info
+cache_clear = _normalize.cache_clear
@@ -0,0 +1,86 @@
+"""
+Аудит планов запросов: EXPLAIN для каждого SELECT, который выполняют
+публичные GET-маршруты из benchmark.ROUTES, и поиск последовательного
+сканирования больших таблиц.
+
+В PostgreSQL план строится с ``enable_seqscan = off``: на небольших тестовых
+данных планировщик и так выбирает Seq Scan, а с запретом он остается только
+там, где ни один индекс не подходит. В SQLite последовательное сканирование -
+``SCAN <таблица>`` без ``USING INDEX``.
+"""
+import re
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from .benchmark import ROUTES
+
+
+SEQ_SCAN_RE = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(r'\bSCAN (?:TABLE )?(\w+)\b(?! USING| VIRTUAL)'),
+}
+
+
+class AuditError(Exception):
+    pass
+
+
+def explain(sql):
+    """План запроса одной строкой на узел."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SET enable_seqscan = off')
+            try:
+                cursor.execute('EXPLAIN ' + sql)
+                rows = cursor.fetchall()
+            finally:
+                cursor.execute('RESET enable_seqscan')
+        else:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            rows = cursor.fetchall()
+    return '\n'.join(' '.join(str(value) for value in row) for row in rows)
+
+
+def seq_scans(plan, tables):
+    return sorted({table for table in SEQ_SCAN_RE[connection.vendor].findall(plan) if table in tables})
+
+
+def large_tables(min_rows):
+    return {
+        model._meta.db_table
+        for model in apps.get_models(include_auto_created=True)
+        if model._meta.managed and not model._meta.proxy and model._base_manager.count() >= min_rows
+    }
+
+
+def audit(min_rows=1000, only=None):
+    """
+    Прогоняет публичные GET-маршруты с пустым кэшем ответов и возвращает
+    {маршрут: [(таблица, sql)]} для запросов, которые последовательно
+    сканируют таблицу с min_rows строками и больше. Ответ не 2xx - AuditError:
+    план страницы ошибки ничего не говорит о запросах маршрута.
+    """
+    tables = large_tables(min_rows)
+    client = APIClient(raise_request_exception=False)
+    problems = {}
+    for route, (method, url_kwargs, data, needs_staff) in ROUTES.items():
+        if method != 'get' or needs_staff or (only and route not in only):
+            continue
+        url = reverse(route, kwargs=url_kwargs() if callable(url_kwargs) else url_kwargs)
+        cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get(url, data)
+        if not 200 <= response.status_code < 300:
+            raise AuditError(f"GET {url}: {response.status_code}")
+        for query in captured:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            for table in seq_scans(explain(sql), tables):
+                problems.setdefault(route, []).append((table, sql))
+    return problems
@@ -0,0 +1,138 @@
+"""
+Чтение с реплик БД для безопасных запросов.
+
+ReplicaMiddleware помечает GET/HEAD/OPTIONS-запросы, и ReplicaRouter
+направляет их чтения на случайную реплику из REPLICA_DATABASES. Запись и
+все остальное идут в default, как и чтения внутри транзакции на default.
+
+Read-your-writes: после успешного небезопасного запроса клиент получает
+cookie на REPLICA_STICKY_SECONDS, и пока она жива, его чтения идут в default.
+Реплика с отставанием больше REPLICA_MAX_LAG секунд (или недоступная)
+временно исключается; отставание проверяется не чаще раза в
+REPLICA_LAG_CHECK_INTERVAL секунд на процесс.
+
+Промах кэша ответов (web/cache.py) заполняется с реплики, только если
+модели ответа не менялись дольше, чем она может отставать; сразу после
+поднятия версии отстающая реплика легла бы в кэш под новым ETag на весь
+API_CACHE_TIMEOUT, поэтому такие промахи читаются из default. Документ
+главной, хранимый без срока, всегда собирается из default. View, где клиент
+читает только что созданное без cookie (HEAD загрузки по Location из ответа
+POST), закреплены за default через PrimaryReadsMixin.
+
+Локально: две записи в REPLICA_DATABASE_URLS на тот же SQLite-файл или на
+второй экземпляр PostgreSQL.
+"""
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+
+PIN_COOKIE = 'use_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+use_replicas = ContextVar('use_replicas', default=False)
+
+# alias -> (время проверки по time.monotonic(), реплика годна для чтения)
+health = {}
+
+LAG_SQL = (
+    "SELECT CASE "
+    "WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+def replica_lag(alias):
+    """Отставание реплики в секундах; не-PostgreSQL считается синхронным."""
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute(LAG_SQL)
+        return float(cursor.fetchone()[0])
+
+
+def is_healthy(alias):
+    now = time.monotonic()
+    checked = health.get(alias)
+    if checked and now - checked[0] < settings.REPLICA_LAG_CHECK_INTERVAL:
+        return checked[1]
+    try:
+        healthy = replica_lag(alias) <= settings.REPLICA_MAX_LAG
+    except DatabaseError:
+        healthy = False
+    health[alias] = (now, healthy)
+    return healthy
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not use_replicas.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        aliases = [alias for alias in settings.REPLICA_DATABASES if is_healthy(alias)]
+        return random.choice(aliases) if aliases else None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и default.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.REPLICA_DATABASES:
+            return False
+        return None
+
+
+@contextmanager
+def primary():
+    """Чтения внутри блока идут в default."""
+    token = use_replicas.set(False)
+    try:
+        yield
+    finally:
+        use_replicas.reset(token)
+
+
+class PrimaryReadsMixin:
+    def dispatch(self, request, *args, **kwargs):
+        with primary():
+            return super().dispatch(request, *args, **kwargs)
+
+
+def begin(request):
+    return use_replicas.set(request.method in SAFE_METHODS and PIN_COOKIE not in request.COOKIES)
+
+
+def finish(request, response, token):
+    use_replicas.reset(token)
+    if request.method not in SAFE_METHODS and response.status_code < 400 and settings.REPLICA_DATABASES:
+        response.set_cookie(PIN_COOKIE, '1', max_age=settings.REPLICA_STICKY_SECONDS, httponly=True, samesite='Lax')
+    return response
+
+
+class ReplicaMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = begin(request)
+        return finish(request, self.get_response(request), token)
+
+    async def __acall__(self, request):
+        token = begin(request)
+        return finish(request, await self.get_response(request), token)
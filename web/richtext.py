@@ -0,0 +1,280 @@
+"""
+Подготовка HTML из CKEditor к выдаче: очистка по списку разрешенных тегов и
+атрибутов, минификация, адаптивные версии встроенных изображений и текстовый
+анонс для карточек.
+
+Результат хранится в колонках ``<поле>_html`` и ``<поле>_excerpt`` рядом с
+исходным RichTextField и пересчитывается при сохранении (см. signals.py),
+поэтому API отдает готовый HTML без обработки на каждый запрос.
+"""
+import re
+from html import escape
+from html.parser import HTMLParser
+from urllib.parse import unquote, urlsplit
+
+from ckeditor.fields import RichTextField
+from django.conf import settings
+from django.db import transaction
+
+from .images import render_manifest
+
+
+ALLOWED_TAGS = {
+    'p', 'br', 'hr', 'div', 'span', 'strong', 'b', 'em', 'i', 'u', 's', 'strike', 'sub', 'sup',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'ul', 'ol', 'li', 'blockquote', 'pre', 'code',
+    'a', 'img', 'figure', 'figcaption', 'iframe',
+    'table', 'caption', 'thead', 'tbody', 'tfoot', 'tr', 'th', 'td',
+}
+ALLOWED_ATTRS = {
+    'a': {'href', 'title', 'target'},
+    'img': {'src', 'alt', 'title', 'width', 'height'},
+    'iframe': {'src', 'width', 'height', 'title', 'allowfullscreen'},
+    'ol': {'start'},
+    'th': {'colspan', 'rowspan'},
+    'td': {'colspan', 'rowspan'},
+}
+URL_ATTRS = {'href', 'src'}
+ALLOWED_SCHEMES = {'', 'http', 'https', 'mailto', 'tel'}
+IFRAME_HOSTS = {'www.youtube.com', 'youtube.com', 'www.youtube-nocookie.com', 'player.vimeo.com'}
+# Теги, которые удаляются вместе с содержимым.
+DROPPED_TAGS = {'script', 'style', 'template', 'noscript', 'textarea', 'title', 'object', 'embed', 'svg', 'math'}
+VOID_TAGS = {'br', 'hr', 'img'}
+BLOCK_TAGS = {
+    'p', 'br', 'hr', 'div', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'ul', 'ol', 'li', 'blockquote', 'pre',
+    'figure', 'figcaption', 'table', 'caption', 'thead', 'tbody', 'tfoot', 'tr', 'th', 'td',
+}
+# Теги, которые закрываются открытием следующего (<li>one<li>two).
+IMPLICIT_CLOSE = {'li': {'li'}, 'p': {'p'}, 'tr': {'tr', 'td', 'th'}, 'td': {'td', 'th'}, 'th': {'td', 'th'}}
+IMAGE_SIZES = '(max-width: 1280px) 100vw, 1280px'
+
+WHITESPACE_RE = re.compile(r'\s+')
+CONTROL_RE = re.compile(r'[\x00-\x20\x7f]+')
+
+
+def html_field_name(field_name):
+    return f'{field_name}_html'
+
+
+def excerpt_field_name(field_name):
+    return f'{field_name}_excerpt'
+
+
+def richtext_fields(model):
+    """RichTextField модели, у которых есть колонки ``<поле>_html`` и ``<поле>_excerpt``."""
+    field_names = {field.name for field in model._meta.fields}
+    return [
+        field.name for field in model._meta.fields
+        if isinstance(field, RichTextField)
+        and {html_field_name(field.name), excerpt_field_name(field.name)} <= field_names
+    ]
+
+
+def safe_url(value, tag):
+    value = value.strip()
+    try:
+        # Схему проверяем без управляющих символов и пробелов: браузеры их пропускают.
+        parts = urlsplit(CONTROL_RE.sub('', value))
+    except ValueError:
+        return None
+    if parts.scheme.lower() not in ALLOWED_SCHEMES:
+        return None
+    if tag == 'iframe' and (parts.scheme not in ('http', 'https') or parts.hostname not in IFRAME_HOSTS):
+        return None
+    return value
+
+
+def upload_name(src):
+    """Имя файла в хранилище для изображения, загруженного через CKEditor, иначе None."""
+    prefix = settings.MEDIA_URL + settings.CKEDITOR_UPLOAD_PATH
+    parts = urlsplit(src)
+    if parts.netloc or not parts.path.startswith(prefix):
+        return None
+    return unquote(parts.path[len(settings.MEDIA_URL):])
+
+
+def truncate(text, length):
+    if len(text) <= length:
+        return text
+    cut = text[:length].rsplit(' ', 1)[0] or text[:length]
+    return cut.rstrip(' .,;:!?-') + '…'
+
+
+class Renderer(HTMLParser):
+    def __init__(self, manifest_loader=None):
+        super().__init__(convert_charrefs=True)
+        self.manifest_loader = manifest_loader
+        self.out = []
+        self.text = []
+        self.stack = []
+        self.dropped = 0
+        self.pre = 0
+        self.block_boundary = True
+        self.missing = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROPPED_TAGS:
+            self.dropped += 1
+            return
+        if self.dropped:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+        if tag not in ALLOWED_TAGS:
+            return
+
+        allowed = ALLOWED_ATTRS.get(tag, set())
+        clean = {}
+        for name, value in attrs:
+            if name not in allowed:
+                continue
+            value = value or ''
+            if name in URL_ATTRS:
+                value = safe_url(value, tag)
+                if value is None:
+                    continue
+            clean[name] = value
+
+        if tag in ('img', 'iframe'):
+            if 'src' not in clean:
+                return
+            clean['loading'] = 'lazy'
+        if tag == 'a' and 'target' in clean:
+            clean['target'] = '_blank'
+            clean['rel'] = 'noopener noreferrer'
+        if tag == 'img':
+            self.write_image(clean)
+            return
+
+        while self.stack and self.stack[-1] in IMPLICIT_CLOSE.get(tag, ()):
+            self.close_tag(self.stack.pop())
+        self.out.append(self.tag(tag, clean))
+        self.block_boundary = tag in BLOCK_TAGS
+        if tag not in VOID_TAGS:
+            self.stack.append(tag)
+            if tag == 'pre':
+                self.pre += 1
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and tag in DROPPED_TAGS:
+            self.dropped -= 1
+        elif tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROPPED_TAGS:
+            self.dropped = max(0, self.dropped - 1)
+            return
+        if self.dropped:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+        if tag not in self.stack:
+            return
+        # Незакрытые внутри теги закрываются вместе с ним.
+        while self.stack:
+            opened = self.stack.pop()
+            self.close_tag(opened)
+            if opened == tag:
+                break
+
+    def close_tag(self, tag):
+        self.out.append(f'</{tag}>')
+        self.block_boundary = tag in BLOCK_TAGS
+        if tag == 'pre':
+            self.pre -= 1
+
+    def handle_data(self, data):
+        if self.dropped:
+            return
+        self.text.append(data)
+        if not self.pre:
+            data = WHITESPACE_RE.sub(' ', data)
+            # Пробелы после блочных тегов не видны и только занимают место.
+            if self.block_boundary:
+                data = data.lstrip()
+            if not data:
+                return
+        self.out.append(escape(data, quote=False))
+        self.block_boundary = False
+
+    def tag(self, tag, attrs):
+        rendered = ''.join(f' {name}="{escape(value)}"' if value else f' {name}' for name, value in attrs.items())
+        return f'<{tag}{rendered}>'
+
+    def write_image(self, attrs):
+        attrs['decoding'] = 'async'
+        name = upload_name(attrs['src'])
+        manifest = self.manifest_loader(name) if name and self.manifest_loader else None
+        if name and manifest is None:
+            self.missing.append(name)
+        rendered = render_manifest(manifest)
+        self.block_boundary = False
+        if rendered is None:
+            self.out.append(self.tag('img', attrs))
+            return
+
+        attrs.setdefault('width', str(rendered['width']))
+        attrs.setdefault('height', str(rendered['height']))
+        sources = ''.join(
+            self.tag('source', {'type': f'image/{fmt}', 'srcset': srcset, 'sizes': IMAGE_SIZES})
+            for fmt, srcset in rendered['srcset'].items() if fmt != 'jpeg'
+        )
+        if 'jpeg' in rendered['srcset']:
+            attrs.update(srcset=rendered['srcset']['jpeg'], sizes=IMAGE_SIZES)
+        self.out.append(f"<picture>{sources}{self.tag('img', attrs)}</picture>")
+
+    def result(self):
+        while self.stack:
+            self.close_tag(self.stack.pop())
+        html = ''.join(self.out).strip()
+        text = WHITESPACE_RE.sub(' ', ''.join(self.text)).strip()
+        return html, truncate(text, settings.RICH_TEXT_EXCERPT_LENGTH)
+
+
+def render(source, manifest_loader=None):
+    """
+    Возвращает (html, excerpt, missing): очищенный и минифицированный HTML,
+    текстовый анонс и имена встроенных загрузок, для которых manifest_loader
+    не вернул манифест производных.
+    """
+    renderer = Renderer(manifest_loader)
+    renderer.feed(source or '')
+    renderer.close()
+    html, excerpt = renderer.result()
+    return html, excerpt, renderer.missing
+
+
+def prepare(instance, manifest_loader=None, update_fields=None):
+    """
+    Заполняет колонки ``_html`` и ``_excerpt`` экземпляра. Возвращает True,
+    если для части встроенных изображений еще нет производных.
+    """
+    missing = False
+    for field_name in richtext_fields(type(instance)):
+        if update_fields is not None and field_name not in update_fields:
+            continue
+        html, excerpt, pending = render(getattr(instance, field_name), manifest_loader)
+        setattr(instance, html_field_name(field_name), html)
+        setattr(instance, excerpt_field_name(field_name), excerpt)
+        missing = missing or bool(pending)
+    return missing
+
+
+def unsaved_columns(model, update_fields):
+    """
+    Колонки ``_html``/``_excerpt`` RichText-полей из update_fields, которых
+    в самом update_fields нет: save() их не запишет, хотя prepare() их обновил.
+    """
+    columns = []
+    for field_name in richtext_fields(model):
+        if field_name in update_fields:
+            columns += [name for name in (html_field_name(field_name), excerpt_field_name(field_name)) if name not in update_fields]
+    return columns
+
+
+def schedule_images(instance):
+    from .utils import render_rich_text
+
+    args = (instance._meta.label, instance.pk)
+    transaction.on_commit(lambda: render_rich_text.delay(*args))
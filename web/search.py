@@ -0,0 +1,150 @@
+import re
+
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils.html import strip_tags
+
+from .db import scan
+from .models import Event, Project, SearchDocument, Services, Tools, Vacancy
+
+
+SEARCH_CONFIG = 'russian'
+FTS_TABLE = 'web_searchdocument_fts'
+HIGHLIGHT = ('<mark>', '</mark>')
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+# kind -> (модель, поле заголовка, поля текста)
+SEARCHABLE = {
+    'project': (Project, 'title', ('description', 'content')),
+    'service': (Services, 'title', ('content',)),
+    'event': (Event, 'title', ('description', 'content')),
+    'vacancy': (Vacancy, 'title', ('description', 'requirements', 'conditions', 'content')),
+    'tool': (Tools, 'name', ('additional_content', 'content')),
+}
+KIND_BY_MODEL = {model: kind for kind, (model, _, _) in SEARCHABLE.items()}
+
+
+def is_postgres():
+    return connection.vendor == 'postgresql'
+
+
+def is_indexable(instance):
+    return not isinstance(instance, Vacancy) or instance.is_active
+
+
+def document_text(instance):
+    _, title_field, body_fields = SEARCHABLE[KIND_BY_MODEL[type(instance)]]
+    title = getattr(instance, title_field) or ''
+    body = '\n'.join(strip_tags(getattr(instance, field) or '').strip() for field in body_fields)
+    return title[:255], body.strip()
+
+
+def index_instance(instance):
+    kind = KIND_BY_MODEL[type(instance)]
+    if not is_indexable(instance):
+        remove_instance(instance)
+        return
+
+    title, body = document_text(instance)
+    with transaction.atomic():
+        document, _ = SearchDocument.objects.update_or_create(
+            kind=kind, object_id=instance.pk, defaults={'title': title, 'body': body},
+        )
+        if is_postgres():
+            SearchDocument.objects.filter(pk=document.pk).update(
+                search_vector=(
+                    SearchVector('title', weight='A', config=SEARCH_CONFIG)
+                    + SearchVector('body', weight='B', config=SEARCH_CONFIG)
+                )
+            )
+        elif connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [document.pk])
+                cursor.execute(
+                    f'INSERT INTO {FTS_TABLE} (rowid, title, body) VALUES (%s, %s, %s)',
+                    [document.pk, title, body],
+                )
+
+
+def remove_instance(instance):
+    documents = SearchDocument.objects.filter(kind=KIND_BY_MODEL[type(instance)], object_id=instance.pk)
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            for pk in documents.values_list('pk', flat=True):
+                cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [pk])
+    documents.delete()
+
+
+def rebuild_index():
+    count = 0
+    for model, _, _ in SEARCHABLE.values():
+        for instance in scan(model.objects.all(), 500):
+            index_instance(instance)
+            count += 1
+    return count
+
+
+def search(query, kinds=None):
+    """
+    Ранжированный поиск по документам. В PostgreSQL - websearch-запрос к
+    GIN-индексу tsvector с русским стеммингом, ts_rank и ts_headline;
+    в SQLite - FTS5 с bm25 и snippet (префиксный поиск вместо стемминга).
+    Каждый результат несет атрибуты ``rank`` и ``headline``.
+    """
+    if is_postgres():
+        return search_postgres(query, kinds)
+    return search_sqlite(query, kinds)
+
+
+def search_postgres(query, kinds=None):
+    search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+    documents = SearchDocument.objects.filter(search_vector=search_query)
+    if kinds:
+        documents = documents.filter(kind__in=kinds)
+    return documents.annotate(
+        rank=SearchRank(F('search_vector'), search_query),
+        headline=SearchHeadline(
+            'body', search_query, config=SEARCH_CONFIG,
+            start_sel=HIGHLIGHT[0], stop_sel=HIGHLIGHT[1], max_fragments=2,
+        ),
+    ).order_by('-rank', '-updated_at')
+
+
+def fts_query(query):
+    tokens = TOKEN_PATTERN.findall(query.lower())
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def search_sqlite(query, kinds=None):
+    match = fts_query(query)
+    if not match:
+        return []
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, bm25({FTS_TABLE}, 10.0, 1.0), "
+            f"snippet({FTS_TABLE}, 1, %s, %s, '…', 16) "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY 2",
+            [*HIGHLIGHT, match],
+        )
+        rows = cursor.fetchall()
+
+    documents = SearchDocument.objects.in_bulk([pk for pk, _, _ in rows])
+    results = []
+    for pk, rank, headline in rows:
+        document = documents.get(pk)
+        if document is None or (kinds and document.kind not in kinds):
+            continue
+        # bm25 возвращает отрицательные значения: чем меньше, тем релевантнее.
+        document.rank = -rank
+        document.headline = headline
+        results.append(document)
+    return results
+
+
+def ranked_object_ids(query, kind):
+    results = search(query, kinds=[kind])
+    if isinstance(results, list):
+        return [document.object_id for document in results]
+    return list(results.values_list('object_id', flat=True))
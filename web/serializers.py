@@ -1,73 +1,341 @@
+from django.contrib.auth.models import User
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
 from rest_framework import serializers
+
+from . import metrics
+from .images import render_manifest
+from .pagination import KEYSET_FIELDS
+from .richtext import html_field_name
 from .models import (
-    Event, Services, Vacancy, Project, Contact,
-    Review, YouTubeShort, About, Gallery, Tools, ContactVacancy
+    Event, EventImage, Services, Vacancy, Project, Contact,
+    Review, YouTubeShort, About, Gallery, Tools, ToolImage, ContactVacancy, Upload,
+    check_file,
 )
+from .phones import normalize_phone
+
+
+class TimedListSerializer(serializers.ListSerializer):
+    @property
+    def data(self):
+        with metrics.serializer_timer(self.child):
+            return super().data
 
 
-class EventSerializer(serializers.ModelSerializer):
+class TimedModelSerializer(serializers.ModelSerializer):
+    """
+    ModelSerializer, который пишет время сериализации ответа в метрики.
+    Меряется только верхний уровень (.data), вложенные сериализаторы
+    входят во время родителя.
+    """
+
     class Meta:
+        # Meta наследников наследует этот класс: many=True меряется целиком.
+        list_serializer_class = TimedListSerializer
+
+    @property
+    def data(self):
+        with metrics.serializer_timer(self):
+            return super().data
+
+
+def split_param(value):
+    return {name.strip() for name in (value or '').split(',') if name.strip()}
+
+
+class DynamicFieldsMixin:
+    """
+    Выбор полей ответа параметрами GET-запроса:
+
+    * ``?fields=title,image`` - только перечисленные поля (``id`` всегда);
+    * ``?omit=content`` - все поля, кроме перечисленных;
+    * ``?expand=content`` - добавить поля из ``Meta.deferred_fields``,
+      которые в списках по умолчанию не отдаются.
+
+    Параметры берутся из request в context (или из ``context['field_params']``
+    при сериализации вне запроса) и действуют только на сериализатор верхнего
+    уровня, вложенные сериализаторы отдаются целиком.
+    """
+
+    def is_root(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def field_params(self):
+        if 'field_params' in self.context:
+            return self.context['field_params']
+        request = self.context.get('request')
+        if request is None or request.method not in ('GET', 'HEAD'):
+            return None
+        return request.query_params
+
+    def get_fields(self):
+        fields = super().get_fields()
+        params = self.field_params()
+        if params is None or not self.is_root():
+            return fields
+
+        only, omit = split_param(params.get('fields')), split_param(params.get('omit'))
+        if only:
+            keep = only | {'id'}
+        else:
+            keep = set(fields)
+            if isinstance(self.parent, serializers.ListSerializer):
+                keep -= set(getattr(self.Meta, 'deferred_fields', ())) - split_param(params.get('expand'))
+        keep -= omit
+        return {name: field for name, field in fields.items() if name in keep}
+
+    def model_columns(self):
+        """Колонки модели, которые нужны выбранным полям, для QuerySet.only()."""
+        model = self.Meta.model
+        columns = {model._meta.pk.name}
+        for field in self.fields.values():
+            try:
+                model_field = model._meta.get_field(getattr(field, 'column', field.source).split('.')[0])
+            except FieldDoesNotExist:
+                continue
+            if model_field.concrete and not model_field.many_to_many:
+                columns.add(model_field.name)
+        return columns
+
+
+def narrow_queryset(queryset, serializer):
+    """Ограничивает SELECT колонками, которые попадут в ответ, и ключом keyset-пагинации."""
+    child = getattr(serializer, 'child', serializer)
+    if not isinstance(child, DynamicFieldsMixin):
+        return queryset
+    field_names = {field.name for field in queryset.model._meta.concrete_fields}
+    columns = child.model_columns() | {name for name in KEYSET_FIELDS if name in field_names}
+    # Связь из select_related нельзя одновременно отложить и присоединить.
+    if isinstance(queryset.query.select_related, dict):
+        columns |= set(queryset.query.select_related)
+    return queryset.only(*columns)
+
+
+class ResponsiveImageField(serializers.ReadOnlyField):
+    """Манифест производных изображения в виде srcset с абсолютными URL."""
+
+    def to_representation(self, value):
+        return render_manifest(value, self.context.get('request'))
+
+
+class RenderedHTMLField(serializers.CharField):
+    """
+    RichText-поле: принимает исходный HTML, а отдает очищенный и подготовленный
+    из колонки ``<поле>_html`` (см. web/richtext.py).
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('required', False)
+        kwargs.setdefault('allow_blank', True)
+        super().__init__(**kwargs)
+
+    @property
+    def column(self):
+        return html_field_name(self.source)
+
+    def get_attribute(self, instance):
+        return getattr(instance, self.column)
+
+
+class EventImageSerializer(TimedModelSerializer):
+    content = RenderedHTMLField()
+    image_srcset = ResponsiveImageField()
+
+    class Meta(TimedModelSerializer.Meta):
+        model = EventImage
+        fields = ('id', 'image', 'image_srcset', 'content')
+
+
+class EventSerializer(DynamicFieldsMixin, TimedModelSerializer):
+    content = RenderedHTMLField()
+    image_srcset = ResponsiveImageField()
+    gallery = EventImageSerializer(many=True, read_only=True)
+
+    class Meta(TimedModelSerializer.Meta):
         model = Event
-        fields = '__all__'
+        exclude = ('content_html',)
+        deferred_fields = ('content',)
 
 
-class ServicesSerializer(serializers.ModelSerializer):
-    class Meta:
+class ServicesSerializer(DynamicFieldsMixin, TimedModelSerializer):
+    content = RenderedHTMLField()
+    image_srcset = ResponsiveImageField()
+
+    class Meta(TimedModelSerializer.Meta):
         model = Services
-        fields = '__all__'
+        exclude = ('content_html',)
+        deferred_fields = ('content',)
 
 
-class VacancySerializer(serializers.ModelSerializer):
-    class Meta:
+class VacancySerializer(DynamicFieldsMixin, TimedModelSerializer):
+    content = RenderedHTMLField()
+
+    class Meta(TimedModelSerializer.Meta):
         model = Vacancy
-        fields = '__all__'
+        exclude = ('content_html',)
 
 
-class ProjectSerializer(serializers.ModelSerializer):
-    class Meta:
+class ProjectSerializer(DynamicFieldsMixin, TimedModelSerializer):
+    content = RenderedHTMLField()
+    image_srcset = ResponsiveImageField()
+
+    class Meta(TimedModelSerializer.Meta):
         model = Project
-        fields = '__all__'
+        exclude = ('content_html',)
+        deferred_fields = ('content',)
 
 
-class ContactSerializer(serializers.ModelSerializer):
-    class Meta:
+class UploadSerializer(TimedModelSerializer):
+    class Meta(TimedModelSerializer.Meta):
+        model = Upload
+        fields = ('id', 'filename', 'size', 'offset', 'created_at')
+        read_only_fields = ('offset', 'created_at')
+
+    def validate(self, attrs):
+        try:
+            check_file(attrs['filename'], attrs['size'])
+        except DjangoValidationError as e:
+            raise serializers.ValidationError({'file': e.messages})
+        return attrs
+
+
+class PhoneField(serializers.CharField):
+    """Принимает номер в свободной записи и возвращает его в формате +996 XXX XXX XXX."""
+
+    def to_internal_value(self, data):
+        try:
+            return normalize_phone(super().to_internal_value(data))
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.messages)
+
+
+class SubmissionSerializerMixin(serializers.Serializer):
+    """
+    Общая часть форм заявок: нормализация телефона и вложение через id
+    завершенной загрузки вместо файла в multipart. Все поля проверяются здесь
+    (валидаторы модели переносятся в поля сериализатора), поэтому модель
+    сохраняется без повторного full_clean().
+    """
+    phone = PhoneField()
+    upload_id = serializers.PrimaryKeyRelatedField(
+        queryset=Upload.objects.exclude(file=''), write_only=True, required=False,
+    )
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        if attrs.get('upload_id') and attrs.get('file'):
+            raise serializers.ValidationError({'upload_id': "Передайте либо файл, либо upload_id"})
+        return attrs
+
+    def create(self, validated_data):
+        upload = validated_data.pop('upload_id', None)
+        if upload is not None:
+            validated_data['file'] = upload.file.name
+        instance = self.Meta.model(**validated_data)
+        instance.save(validate=False)
+        if upload is not None:
+            upload.delete()
+        return instance
+
+
+class ContactSerializer(SubmissionSerializerMixin, DynamicFieldsMixin, TimedModelSerializer):
+    class Meta(TimedModelSerializer.Meta):
         model = Contact
         fields = '__all__'
 
 
-class ReviewSerializer(serializers.ModelSerializer):
-    class Meta:
+class ReviewAuthorSerializer(TimedModelSerializer):
+    class Meta(TimedModelSerializer.Meta):
+        model = User
+        fields = ('id', 'username', 'first_name', 'last_name')
+
+
+class ReviewSerializer(DynamicFieldsMixin, TimedModelSerializer):
+    content = RenderedHTMLField()
+    avatar_srcset = ResponsiveImageField()
+    author = ReviewAuthorSerializer(read_only=True)
+
+    class Meta(TimedModelSerializer.Meta):
         model = Review
-        fields = '__all__'
+        exclude = ('content_html',)
 
 
-class YouTubeShortSerializer(serializers.ModelSerializer):
-    class Meta:
+class YouTubeShortSerializer(DynamicFieldsMixin, TimedModelSerializer):
+    thumbnail_srcset = ResponsiveImageField()
+
+    class Meta(TimedModelSerializer.Meta):
         model = YouTubeShort
         fields = '__all__'
 
 
-class AboutSerializer(serializers.ModelSerializer):
-    class Meta:
+class AboutSerializer(DynamicFieldsMixin, TimedModelSerializer):
+    content = RenderedHTMLField()
+    image_srcset = ResponsiveImageField()
+
+    class Meta(TimedModelSerializer.Meta):
         model = About
-        fields = '__all__'
+        exclude = ('content_html',)
 
 
-class GallerySerializer(serializers.ModelSerializer):
-    class Meta:
+class GalleryServiceSerializer(TimedModelSerializer):
+    image_srcset = ResponsiveImageField()
+
+    class Meta(TimedModelSerializer.Meta):
+        model = Services
+        fields = ('id', 'title', 'image', 'image_srcset')
+
+
+class GalleryProjectSerializer(TimedModelSerializer):
+    image_srcset = ResponsiveImageField()
+
+    class Meta(TimedModelSerializer.Meta):
+        model = Project
+        fields = ('id', 'title', 'image', 'image_srcset', 'link')
+
+
+class GallerySerializer(DynamicFieldsMixin, TimedModelSerializer):
+    content = RenderedHTMLField()
+    image_srcset = ResponsiveImageField()
+    related_service = GalleryServiceSerializer(read_only=True)
+    related_project = GalleryProjectSerializer(read_only=True)
+
+    class Meta(TimedModelSerializer.Meta):
         model = Gallery
-        fields = '__all__'
+        exclude = ('content_html',)
+        deferred_fields = ('content',)
 
 
-class ToolsSerializer(serializers.ModelSerializer):
-    class Meta:
+class ToolImageSerializer(TimedModelSerializer):
+    content = RenderedHTMLField()
+    image_srcset = ResponsiveImageField()
+
+    class Meta(TimedModelSerializer.Meta):
+        model = ToolImage
+        fields = ('id', 'image', 'image_srcset', 'content', 'created_at')
+
+
+class ToolsSerializer(DynamicFieldsMixin, TimedModelSerializer):
+    content = RenderedHTMLField()
+    image_srcset = ResponsiveImageField()
+    images = ToolImageSerializer(many=True, read_only=True)
+
+    class Meta(TimedModelSerializer.Meta):
         model = Tools
-        fields = '__all__'
+        exclude = ('content_html',)
+        deferred_fields = ('content',)
 
 
-class ContactVacancySerializer(serializers.ModelSerializer):
-    class Meta:
+class ContactVacancySerializer(SubmissionSerializerMixin, DynamicFieldsMixin, TimedModelSerializer):
+    class Meta(TimedModelSerializer.Meta):
         model = ContactVacancy
         fields = '__all__'
 
 
+class SearchResultSerializer(serializers.Serializer):
+    type = serializers.CharField(source='kind')
+    id = serializers.IntegerField(source='object_id')
+    title = serializers.CharField()
+    rank = serializers.FloatField()
+    headline = serializers.CharField()
@@ -0,0 +1,117 @@
+from functools import partial
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import home, images, metrics, richtext, search, snapshots
+from .cache import bump_model_version
+
+
+# Вход пользователя обновляет только last_login, на ответы API это не влияет.
+IGNORED_UPDATES = {User: frozenset({'last_login'})}
+
+
+def is_tracked(model):
+    return model._meta.app_label == 'web' or model is User
+
+
+def bump_after_commit(model):
+    # Версия поднимается только после коммита: иначе параллельный GET успеет
+    # прочитать старые строки и закэшировать их под новой версией.
+    transaction.on_commit(partial(bump_model_version, model))
+
+
+def is_ignored_update(sender, update_fields):
+    return update_fields is not None and update_fields <= IGNORED_UPDATES.get(sender, frozenset())
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_model_cache(sender, update_fields=None, **kwargs):
+    if is_tracked(sender) and not is_ignored_update(sender, update_fields):
+        bump_after_commit(sender)
+
+
+@receiver(m2m_changed)
+def invalidate_m2m_cache(sender, instance, action, model, **kwargs):
+    if not action.startswith('post_'):
+        return
+    for changed in (type(instance), model):
+        if is_tracked(changed):
+            bump_after_commit(changed)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def rebuild_home_document(sender, raw=False, update_fields=None, **kwargs):
+    if sender in home.HOME_MODELS and not raw and not is_ignored_update(sender, update_fields):
+        home.schedule_rebuild()
+
+
+@receiver(m2m_changed)
+def rebuild_home_document_m2m(sender, instance, action, model, **kwargs):
+    if action.startswith('post_') and {type(instance), model} & set(home.HOME_MODELS):
+        home.schedule_rebuild()
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def publish_snapshot(sender, raw=False, update_fields=None, **kwargs):
+    if sender in snapshots.SNAPSHOT_MODELS and not raw and not is_ignored_update(sender, update_fields):
+        snapshots.schedule_publish()
+
+
+@receiver(m2m_changed)
+def publish_snapshot_m2m(sender, instance, action, model, **kwargs):
+    if action.startswith('post_') and {type(instance), model} & set(snapshots.SNAPSHOT_MODELS):
+        snapshots.schedule_publish()
+
+
+@receiver(post_save)
+def update_search_document(sender, instance, raw=False, **kwargs):
+    if sender in search.KIND_BY_MODEL and not raw:
+        search.index_instance(instance)
+
+
+@receiver(post_delete)
+def delete_search_document(sender, instance, **kwargs):
+    if sender in search.KIND_BY_MODEL:
+        search.remove_instance(instance)
+
+
+@receiver(post_save)
+def schedule_image_derivatives(sender, instance, raw=False, **kwargs):
+    if sender._meta.app_label == 'web' and not raw:
+        images.schedule_derivatives(instance)
+
+
+@receiver(pre_save)
+def render_rich_text(sender, instance, raw=False, update_fields=None, **kwargs):
+    if sender._meta.app_label == 'web' and not raw:
+        instance._rich_text_pending = richtext.prepare(instance, images.load_manifest, update_fields)
+
+
+@receiver(post_save)
+def save_rendered_rich_text(sender, instance, raw=False, update_fields=None, **kwargs):
+    # update_fields к pre_save уже frozenset, дополнить его нельзя, поэтому
+    # пересчитанные колонки дописываются отдельным UPDATE в той же транзакции.
+    if update_fields is None or raw or sender._meta.app_label != 'web':
+        return
+    columns = richtext.unsaved_columns(sender, update_fields)
+    if columns:
+        sender._base_manager.filter(pk=instance.pk).update(**{name: getattr(instance, name) for name in columns})
+
+
+@receiver(post_save)
+def schedule_rich_text_images(sender, instance, raw=False, **kwargs):
+    if getattr(instance, '_rich_text_pending', False) and not raw:
+        instance._rich_text_pending = False
+        richtext.schedule_images(instance)
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    metrics.install_query_recorder(connection)
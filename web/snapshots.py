@@ -0,0 +1,168 @@
+"""
+Статический снимок публичного API для отдачи через nginx/CDN без Django.
+
+Все страницы списков и детальные страницы контента рендерятся теми же view,
+что обслуживают API, и пишутся в новый каталог версии рядом со сжатыми
+копиями .gz и .br. Затем симлинк ``current`` атомарно переключается на эту
+версию, старые версии удаляются (остается SNAPSHOT_KEEP последних).
+
+Раскладка: ``/api/events/`` -> ``api/events/index.json``, ``?page=2`` ->
+``api/events/page-2.json``, ``/api/events/5/`` -> ``api/events/5/index.json``.
+Пример для nginx (запросы с другими параметрами уходят в Django)::
+
+    location /api/ {
+        root /srv/snapshots/current;
+        gzip_static on;
+        brotli_static on;
+        default_type application/json;
+        if ($args !~ "^(page=\\d+)?$") { return 418; }
+        error_page 418 = @django;
+        try_files $uri/page-$arg_page.json $uri/index.json @django;
+    }
+"""
+import gzip
+import json
+import os
+import shutil
+import time
+import uuid
+from urllib.parse import parse_qs, urlsplit
+
+import brotli
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.test import Client
+from django.urls import reverse
+
+from . import replicas
+from .models import Event, EventImage, Services, Vacancy, Project, Review, YouTubeShort, About, Gallery, Tools, ToolImage
+
+
+PENDING_KEY = 'web:snapshot:pending'
+CURRENT = 'current'
+
+# Модели, изменение которых требует новой публикации.
+SNAPSHOT_MODELS = (Event, EventImage, Services, Vacancy, Project, Review, User, YouTubeShort, About, Gallery, Tools, ToolImage)
+
+# Маршруты списков со всеми страницами и детальные маршруты с моделью для перебора pk.
+LIST_ROUTES = (
+    'event_list', 'service_list', 'vacancy_list', 'project_list', 'review_list_create',
+    'youtube_shorts', 'gallery_list', 'tools_list', 'about_list', 'home',
+)
+DETAIL_ROUTES = {
+    'event_detail': Event,
+    'service_detail': Services,
+    'vacancy_detail': Vacancy,
+    'project_detail': Project,
+    'tools_detail': Tools,
+}
+
+
+def is_enabled():
+    return bool(settings.SNAPSHOT_ROOT)
+
+
+def write(root, path, name, body):
+    directory = os.path.join(root, path.strip('/'))
+    os.makedirs(directory, exist_ok=True)
+    target = os.path.join(directory, name)
+    with open(target, 'wb') as file:
+        file.write(body)
+    with open(target + '.gz', 'wb') as file:
+        file.write(gzip.compress(body, compresslevel=9, mtime=0))
+    with open(target + '.br', 'wb') as file:
+        file.write(brotli.compress(body, quality=11))
+
+
+def fetch(client, url):
+    response = client.get(url, secure=settings.SNAPSHOT_SECURE, HTTP_HOST=settings.SNAPSHOT_HOST)
+    if response.status_code != 200:
+        raise RuntimeError(f"{url}: статус {response.status_code}")
+    return response
+
+
+def render_list(client, root, path):
+    """Пишет все страницы списка; возвращает число файлов."""
+    url, page, count = path, 1, 0
+    while url:
+        response = fetch(client, url)
+        write(root, path, 'index.json' if page == 1 else f'page-{page}.json', response.content)
+        count += 1
+        data = json.loads(response.content)
+        next_url = data.get('next') if isinstance(data, dict) else None
+        if not next_url:
+            break
+        page = int(parse_qs(urlsplit(next_url).query)['page'][0])
+        url = f'{path}?page={page}'
+    return count
+
+
+def render(root):
+    client = Client(raise_request_exception=True)
+    # Снимок живет дольше кэша ответов: читаем из default, а не с реплики.
+    client.cookies[replicas.PIN_COOKIE] = '1'
+    count = 0
+    for route in LIST_ROUTES:
+        count += render_list(client, root, reverse(route))
+    for route, model in DETAIL_ROUTES.items():
+        for pk in model.objects.values_list('pk', flat=True).iterator():
+            path = reverse(route, kwargs={'pk': pk})
+            write(root, path, 'index.json', fetch(client, path).content)
+            count += 1
+    return count
+
+
+def switch(base, version):
+    """Атомарно направляет симлинк current на каталог версии."""
+    link = os.path.join(base, CURRENT)
+    temporary = os.path.join(base, f'.{CURRENT}-{uuid.uuid4().hex}')
+    os.symlink(version, temporary)
+    os.replace(temporary, link)
+
+
+def cleanup(base, keep):
+    current = os.path.realpath(os.path.join(base, CURRENT))
+    versions = sorted(
+        entry.path for entry in os.scandir(base)
+        if entry.is_dir(follow_symlinks=False) and not entry.name.startswith('.')
+    )
+    for path in versions[:-keep] if keep else versions:
+        if os.path.realpath(path) != current:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def publish(base=None):
+    """Рендерит новую версию снимка и переключает на нее current; возвращает (версия, число файлов)."""
+    # Ссылки next/previous и абсолютные URL медиа в снимке строятся от этого хоста.
+    if not settings.SNAPSHOT_HOST:
+        raise ImproperlyConfigured("Для публикации снимка задайте SNAPSHOT_HOST")
+    base = base or settings.SNAPSHOT_ROOT
+    os.makedirs(base, exist_ok=True)
+    # Имя версии сортируется по времени создания, на этом держится cleanup().
+    now = time.time_ns()
+    version = time.strftime('%Y%m%d%H%M%S', time.gmtime(now // 10**9)) + f'-{now % 10**9:09d}'
+    root = os.path.join(base, version)
+    try:
+        count = render(root)
+    except Exception:
+        shutil.rmtree(root, ignore_errors=True)
+        raise
+    switch(base, version)
+    cleanup(base, settings.SNAPSHOT_KEEP)
+    return version, count
+
+
+def enqueue_publish():
+    from .utils import publish_snapshot
+
+    # Пока публикация ждет в очереди, новые правки ее не дублируют.
+    if cache.add(PENDING_KEY, 1, timeout=settings.SNAPSHOT_DELAY + 600):
+        publish_snapshot.apply_async(countdown=settings.SNAPSHOT_DELAY)
+
+
+def schedule_publish():
+    if is_enabled():
+        transaction.on_commit(enqueue_publish)
@@ -0,0 +1,142 @@
+import json
+import os
+import time
+from contextlib import ExitStack
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+
+
+MESSAGE_LIMIT = 4096
+MEDIA_GROUP_LIMIT = 10
+DIGEST_SEPARATOR = '\n\n' + '—' * 10 + '\n\n'
+
+BUCKET_KEY = 'web:telegram:bucket'
+BUCKET_LOCK_KEY = 'web:telegram:bucket-lock'
+
+
+class TelegramError(Exception):
+    pass
+
+
+class TelegramRetryAfter(TelegramError):
+    def __init__(self, retry_after):
+        super().__init__(f"Telegram попросил повторить через {retry_after} с")
+        self.retry_after = retry_after
+
+
+_session = None
+_session_pid = None
+
+
+def get_session():
+    """
+    Одна requests.Session с пулом соединений на процесс воркера: TLS-рукопожатие
+    с api.telegram.org выполняется один раз, а не на каждое сообщение.
+    После fork (prefork-воркеры Celery) сессия создается заново.
+    """
+    global _session, _session_pid
+    if _session is None or _session_pid != os.getpid():
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.TELEGRAM_POOL_SIZE)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        _session, _session_pid = session, os.getpid()
+    return _session
+
+
+def api_url(method):
+    return f"{settings.TELEGRAM_API_URL}/bot{settings.TELEGRAM_BOT_TOKEN}/{method}"
+
+
+def call(method, data=None, files=None):
+    response = get_session().post(api_url(method), data=data, files=files, timeout=settings.TELEGRAM_TIMEOUT)
+    if response.status_code == 429:
+        retry_after = response.json().get('parameters', {}).get('retry_after', 1)
+        raise TelegramRetryAfter(retry_after)
+    if 400 <= response.status_code < 500:
+        # Ошибка в самом запросе (токен, chat_id, файл): повтор ее не исправит.
+        raise TelegramError(f"Telegram отклонил {method}: {response.status_code} {response.text[:200]}")
+    response.raise_for_status()
+    return response.json()
+
+
+def send_message(text):
+    return call('sendMessage', data={'chat_id': settings.TELEGRAM_CHAT_ID, 'text': text})
+
+
+def send_document(file_path):
+    with open(file_path, 'rb') as file:
+        return call('sendDocument', data={'chat_id': settings.TELEGRAM_CHAT_ID}, files={'document': file})
+
+
+def send_documents(file_paths):
+    """Отправляет файлы альбомами sendMediaGroup по 10 штук (одиночный файл - sendDocument)."""
+    results = []
+    for start in range(0, len(file_paths), MEDIA_GROUP_LIMIT):
+        group = file_paths[start:start + MEDIA_GROUP_LIMIT]
+        if len(group) == 1:
+            results.append(send_document(group[0]))
+            continue
+
+        with ExitStack() as stack:
+            files = {f'file{i}': stack.enter_context(open(path, 'rb')) for i, path in enumerate(group)}
+            media = [{'type': 'document', 'media': f'attach://{name}'} for name in files]
+            data = {'chat_id': settings.TELEGRAM_CHAT_ID, 'media': json.dumps(media)}
+            results.append(call('sendMediaGroup', data=data, files=files))
+    return results
+
+
+def digest_groups(messages):
+    """Делит сообщения на группы, каждая из которых помещается в одну часть дайджеста."""
+    groups, length = [], 0
+    for message in messages:
+        size = min(len(message), MESSAGE_LIMIT)
+        if groups and length + len(DIGEST_SEPARATOR) + size <= MESSAGE_LIMIT:
+            groups[-1].append(message)
+            length += len(DIGEST_SEPARATOR) + size
+        else:
+            groups.append([message])
+            length = size
+    return groups
+
+
+def build_digest(messages):
+    """Склеивает сообщения в дайджест, разбитый на части не длиннее лимита Telegram."""
+    return [DIGEST_SEPARATOR.join(message[:MESSAGE_LIMIT] for message in group) for group in digest_groups(messages)]
+
+
+class TokenBucket:
+    """
+    Token bucket в общем кэше, чтобы лимит соблюдался всеми воркерами сразу.
+    ``consume`` возвращает 0, если токен получен, иначе - сколько секунд ждать.
+    """
+
+    def __init__(self, key, rate, capacity):
+        self.key = key
+        self.lock_key = f'{key}:lock'
+        self.rate = rate
+        self.capacity = capacity
+
+    def consume(self, tokens=1):
+        if not cache.add(self.lock_key, 1, timeout=5):
+            return 1 / self.rate
+        try:
+            now = time.time()
+            available, updated = cache.get(self.key, (self.capacity, now))
+            available = min(self.capacity, available + (now - updated) * self.rate)
+            if available < tokens:
+                cache.set(self.key, (available, now), timeout=None)
+                return (tokens - available) / self.rate
+            cache.set(self.key, (available - tokens, now), timeout=None)
+            return 0
+        finally:
+            cache.delete(self.lock_key)
+
+
+def get_rate_limiter():
+    per_minute = settings.TELEGRAM_RATE_PER_MINUTE
+    return TokenBucket(BUCKET_KEY, rate=per_minute / 60, capacity=per_minute)
+
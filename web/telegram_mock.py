@@ -0,0 +1,85 @@
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+
+PATH_PATTERN = re.compile(r'^/bot(?P<token>[^/]+)/(?P<method>\w+)$')
+
+
+class MockTelegramHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        match = PATH_PATTERN.match(self.path)
+        if not match:
+            self.reply(404, {'ok': False, 'description': 'Not Found'})
+            return
+
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        content_type = self.headers.get('Content-Type', '')
+        data = {}
+        if content_type.startswith('application/x-www-form-urlencoded'):
+            data = dict(parse_qsl(body.decode('utf-8')))
+
+        server = self.server
+        with server.lock:
+            server.calls.append({
+                'method': match['method'],
+                'content_type': content_type,
+                'data': data,
+                'body': body,
+            })
+            rate_limited = server.rate_limited > 0
+            if rate_limited:
+                server.rate_limited -= 1
+
+        if rate_limited:
+            self.reply(429, {'ok': False, 'error_code': 429, 'parameters': {'retry_after': 1}})
+        else:
+            self.reply(200, {'ok': True, 'result': {'message_id': len(server.calls)}})
+
+    def reply(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockTelegramServer(ThreadingHTTPServer):
+    """
+    Локальная заглушка Bot API для тестов и бенчмарков: принимает любые
+    методы, запоминает вызовы в ``calls`` и может вернуть 429 на первые
+    ``rate_limited`` запросов. Используется как контекстный менеджер,
+    адрес для TELEGRAM_API_URL - в ``url``.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, rate_limited=0):
+        super().__init__((host, port), MockTelegramHandler)
+        self.calls = []
+        self.rate_limited = rate_limited
+        self.lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def methods(self):
+        return [call['method'] for call in self.calls]
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
@@ -1,3 +1,1188 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, ValidationError as DjangoValidationError
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, connection
+from django.http import HttpResponse
+from asgiref.sync import async_to_sync
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path, resolve, reverse
+from django.utils import timezone
+import brotli
+import requests
+from PIL import Image
+from rest_framework.response import Response
 from rest_framework.test import APITestCase
 
+from . import async_views, benchmark, compression, db, factories, home, logs, media, metrics, outbox, phones, queryplan, replicas, richtext, snapshots, search, telegram, uploads, urls as web_urls, views as web_views
+from .cache import bump_model_version, cache_response, get_model_versions
+from .celery import app as celery_app
+from .models import (
+    Event, EventImage, Services, Vacancy, Project, Contact, Review, YouTubeShort,
+    About, Gallery, Tools, ToolImage, SearchDocument, Upload, OutboxMessage
+)
+from .telegram_mock import MockTelegramServer
+from .serializers import ContactSerializer
+from .utils import (
+    benchmark_probe, dispatch_outbox, generate_image_derivatives,
+    publish_snapshot, send_telegram_digest,
+)
+
+
+class QueryCountTests(APITestCase):
+    rows = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create(username='author')
+        for i in range(cls.rows):
+            event = Event.objects.create(title=f'Event {i}', description='')
+            images = [EventImage.objects.create(event=event, image=f'event_gallery/{i}-{j}.jpg') for j in range(3)]
+            event.gallery.add(*images)
+
+            service = Services.objects.create(title=f'Service {i}')
+            project = Project.objects.create(title=f'Project {i}', is_featured=i % 2 == 0)
+            Gallery.objects.create(title=f'Gallery {i}', related_service=service, related_project=project)
+            Vacancy.objects.create(title=f'Vacancy {i}', description='', requirements='')
+            Review.objects.create(author=author if i % 2 else None, text=f'Review {i}')
+            YouTubeShort.objects.create(video_url=f'https://youtube.com/shorts/{i}')
+            About.objects.create(title=f'About {i}', description='')
+
+            tool = Tools.objects.create(name=f'Tool {i}', image=f'tools/{i}.jpg')
+            for j in range(3):
+                ToolImage.objects.create(tool=tool, image=f'tool_images/{i}-{j}.jpg')
+
+        cls.event = Event.objects.first()
+        cls.service = Services.objects.first()
+        cls.vacancy = Vacancy.objects.first()
+        cls.project = Project.objects.first()
+
+    def setUp(self):
+        cache.clear()
+
+    def assertEndpointQueries(self, url, num, data=None):
+        # Версии моделей прогреваются заранее, чтобы считать только запросы самого view.
+        get_model_versions(resolve(url).func.view_class.cache_models)
+        with self.assertNumQueries(num):
+            response = self.client.get(url, data)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_event_list(self):
+        response = self.assertEndpointQueries(reverse('event_list'), 3)
+        self.assertEqual(len(response.data['results'][0]['gallery']), 3)
+
+    def test_event_detail(self):
+        response = self.assertEndpointQueries(reverse('event_detail', args=[self.event.pk]), 2)
+        self.assertIn('image', response.data['gallery'][0])
+
+    def test_service_list(self):
+        self.assertEndpointQueries(reverse('service_list'), 2)
+
+    def test_service_detail(self):
+        self.assertEndpointQueries(reverse('service_detail', args=[self.service.pk]), 1)
+
+    def test_vacancy_list(self):
+        self.assertEndpointQueries(reverse('vacancy_list'), 2)
+
+    def test_vacancy_detail(self):
+        self.assertEndpointQueries(reverse('vacancy_detail', args=[self.vacancy.pk]), 1)
+
+    def test_project_list(self):
+        self.assertEndpointQueries(reverse('project_list'), 2)
+
+    def test_project_detail(self):
+        self.assertEndpointQueries(reverse('project_detail', args=[self.project.pk]), 1)
+
+    def test_review_list(self):
+        response = self.assertEndpointQueries(reverse('review_list_create'), 2)
+        self.assertEqual(response.data['results'][1]['author']['username'], 'author')
+
+    def test_youtube_shorts_list(self):
+        self.assertEndpointQueries(reverse('youtube_shorts'), 2)
+
+    def test_gallery_list(self):
+        response = self.assertEndpointQueries(reverse('gallery_list'), 2)
+        self.assertEqual(response.data['results'][0]['related_service']['title'], 'Service 0')
+
+    def test_tools_list(self):
+        response = self.assertEndpointQueries(reverse('tools_list'), 3)
+        self.assertEqual(len(response.data['results'][0]['images']), 3)
+
+    def test_about_list(self):
+        self.assertEndpointQueries(reverse('about_list'), 2)
+
+    def test_gallery_list_cursor_skips_count(self):
+        response = self.assertEndpointQueries(reverse('gallery_list'), 1, {'cursor': ''})
+        self.assertNotIn('count', response.data)
+
+    def test_cached_response_skips_database(self):
+        url = reverse('event_list')
+        self.assertEndpointQueries(url, 3)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+
+class ResponseCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        # Коллбеки after-commit ставят задачи (пересборка /api/home/ и т.п.): без брокера.
+        celery_app.conf.task_always_eager = True
+        self.addCleanup(setattr, celery_app.conf, 'task_always_eager', False)
+        Services.objects.create(title='Service')
+
+    def test_cached_response_skips_database(self):
+        self.client.get(reverse('service_list'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('service_list'))
+        self.assertEqual(response.data['count'], 1)
+
+    def test_model_change_invalidates_cached_response(self):
+        self.client.get(reverse('service_list'))
+        with self.captureOnCommitCallbacks(execute=True):
+            Services.objects.create(title='Another service')
+        self.assertEqual(self.client.get(reverse('service_list')).data['count'], 2)
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        celery_app.conf.task_always_eager = True
+        self.addCleanup(setattr, celery_app.conf, 'task_always_eager', False)
+        Services.objects.create(title='Service')
+
+    def test_matching_etag_returns_not_modified(self):
+        response = self.client.get(reverse('service_list'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('service_list'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_if_modified_since_returns_not_modified(self):
+        response = self.client.get(reverse('service_list'))
+        response = self.client.get(reverse('service_list'), HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_model_change_invalidates_etag_after_commit(self):
+        etag = self.client.get(reverse('service_list'))['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Services.objects.create(title='Another service')
+            self.assertEqual(self.client.get(reverse('service_list'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        response = self.client.get(reverse('service_list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+
+    def test_login_does_not_invalidate_reviews(self):
+        user = User.objects.create_user('reader', password='secret')
+        etag = self.client.get(reverse('review_list_create'))['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.login(username='reader', password='secret')
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('review_list_create'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        self.assertEqual(self.client.get(reverse('review_list_create'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class PaginationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        for i in range(5):
+            Review.objects.create(text=f'Review {i}')
+
+    def collect(self, url):
+        texts = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            texts += [item['text'] for item in response.data['results']]
+            url = response.data['next']
+        return texts
+
+    def test_cursor_walks_all_rows_in_order(self):
+        url = reverse('review_list_create') + '?cursor=&page_size=2'
+        self.assertEqual(self.collect(url), [f'Review {i}' for i in range(5)])
+
+    def test_uncounted_pages_match_counted_pages(self):
+        url = reverse('review_list_create') + '?page_size=2'
+        self.assertEqual(self.collect(url + '&count=false'), self.collect(url))
+        response = self.client.get(reverse('review_list_create'), {'page_size': 2, 'count': 'false', 'page': 3})
+        self.assertNotIn('count', response.data)
+        self.assertIsNone(response.data['next'])
+        self.assertIsNotNone(response.data['previous'])
+
+    def test_cursor_is_a_range_bound(self):
+        first = self.client.get(reverse('review_list_create'), {'cursor': '', 'page_size': 2})
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(first.data['next'])
+        sql = next(query['sql'] for query in queries.captured_queries if 'web_review' in query['sql'])
+        self.assertIn('"web_review"."created_at" >=', sql)
+
+    def test_invalid_cursor_returns_not_found(self):
+        response = self.client.get(reverse('review_list_create'), {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 404)
+
+
+class SparseFieldsTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.event = Event.objects.create(title='Event', description='Description', content='<p>Content</p>')
+        service = Services.objects.create(title='Service', content='<p>Service</p>')
+        Gallery.objects.create(title='Gallery', related_service=service)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_list_defers_content_unless_expanded(self):
+        self.assertNotIn('content', self.client.get(reverse('event_list')).data['results'][0])
+        row = self.client.get(reverse('event_list'), {'expand': 'content'}).data['results'][0]
+        self.assertEqual(row['content'], '<p>Content</p>')
+        self.assertEqual(self.client.get(reverse('event_detail', args=[self.event.pk])).data['content'], '<p>Content</p>')
+
+    def test_fields_narrow_response_and_select(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('event_list'), {'fields': 'title,image'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title', 'image'})
+        select = next(query['sql'] for query in queries if 'FROM "web_event"' in query['sql'] and 'COUNT' not in query['sql'])
+        self.assertNotIn('"web_event"."content"', select)
+        self.assertNotIn('"web_event"."description"', select)
+
+    def test_omit_and_select_related_fields(self):
+        row = self.client.get(reverse('gallery_list'), {'fields': 'title'}).data['results'][0]
+        self.assertEqual(row, {'id': row['id'], 'title': 'Gallery'})
+        row = self.client.get(reverse('service_list'), {'omit': 'image,image_srcset'}).data['results'][0]
+        self.assertNotIn('image', row)
+        self.assertNotIn('content', row)
+        self.assertEqual(row['title'], 'Service')
+
+
+class HomeTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        celery_app.conf.task_always_eager = True
+        self.addCleanup(setattr, celery_app.conf, 'task_always_eager', False)
+        Project.objects.create(title='Featured', is_featured=True, content='<p>Большой текст</p>')
+        Project.objects.create(title='Regular')
+        Vacancy.objects.create(title='Open', description='', requirements='', is_active=True)
+        Vacancy.objects.create(title='Closed', description='', requirements='', is_active=False)
+
+    def test_document_has_all_sections_and_is_served_from_cache(self):
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data), {
+            'about', 'services', 'featured_projects', 'projects', 'reviews',
+            'youtube_shorts', 'tools', 'gallery', 'vacancies',
+        })
+        self.assertEqual([row['title'] for row in response.data['featured_projects']], ['Featured'])
+        self.assertEqual([row['title'] for row in response.data['projects']], ['Regular', 'Featured'])
+        self.assertEqual([row['title'] for row in response.data['vacancies']], ['Open'])
+        self.assertNotIn('content', response.data['projects'][0])
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(reverse('home'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+
+    def test_document_is_rebuilt_after_change(self):
+        self.client.get(reverse('home'))
+        with self.captureOnCommitCallbacks(execute=True):
+            Services.objects.create(title='New service')
+        self.assertEqual([row['title'] for row in self.client.get(reverse('home')).data['services']], ['New service'])
+
+    def test_stale_document_is_rebuilt_when_task_was_lost(self):
+        self.client.get(reverse('home'))
+        # Правка без on_commit-колбэков: задача пересборки так и не была поставлена.
+        Services.objects.create(title='New service')
+        bump_model_version(Services)
+        self.assertEqual(self.client.get(reverse('home')).data['services'], [])
+        self.assertEqual([row['title'] for row in self.client.get(reverse('home')).data['services']], ['New service'])
+
+    def test_login_does_not_schedule_rebuild(self):
+        User.objects.create_user('reader', password='secret')
+        with mock.patch.object(home, 'enqueue_rebuild') as enqueue, self.captureOnCommitCallbacks(execute=True):
+            self.client.login(username='reader', password='secret')
+        enqueue.assert_not_called()
+
+
+@override_settings(SNAPSHOT_HOST='testserver', SNAPSHOT_KEEP=1)
+class SnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.base = directory.name
+        for i in range(11):
+            Event.objects.create(title=f'Event {i}', description='')
+
+    def read(self, *parts):
+        return (Path(self.base) / 'current' / 'api' / Path(*parts)).read_bytes()
+
+    def test_publish_writes_compressed_pages_and_switches_current(self):
+        first, count = snapshots.publish(self.base)
+        self.assertGreater(count, 11)
+        self.assertEqual(len(json.loads(self.read('events', 'index.json'))['results']), 10)
+        self.assertEqual(len(json.loads(self.read('events', 'page-2.json'))['results']), 1)
+        self.assertEqual(gzip.decompress(self.read('events', 'index.json.gz')), self.read('events', 'index.json'))
+        self.assertTrue((Path(self.base) / 'current' / 'api' / 'events' / 'index.json.br').exists())
+        event = Event.objects.first()
+        self.assertEqual(json.loads(self.read('events', str(event.pk), 'index.json'))['title'], event.title)
+
+        second, _ = snapshots.publish(self.base)
+        self.assertEqual(os.readlink(Path(self.base) / 'current'), second)
+        self.assertFalse((Path(self.base) / first).exists())
+
+    def test_tools_are_published(self):
+        tool = Tools.objects.create(name='Tool', image='tools/tool.jpg')
+        snapshots.publish(self.base)
+        self.assertEqual(json.loads(self.read('tools', str(tool.pk), 'index.json'))['name'], tool.name)
+
+    @override_settings(SNAPSHOT_HOST='')
+    def test_publish_requires_host(self):
+        with self.assertRaises(ImproperlyConfigured):
+            snapshots.publish(self.base)
+        self.assertEqual(os.listdir(self.base), [])
+
+
+class CompressionTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        for i in range(10):
+            Event.objects.create(title=f'Event {i}', description='Описание события ' * 20)
+
+    def test_large_json_is_compressed_and_cached(self):
+        plain = self.client.get(reverse('event_list'))
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', plain['Vary'])
+
+        response = self.client.get(reverse('event_list'), HTTP_ACCEPT_ENCODING='gzip;q=0.5, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), plain.content)
+        self.assertEqual(response['ETag'], 'W/' + plain['ETag'])
+
+        # Сжатое тело кешируется по ключу с кодировкой: повтор не вызывает кодировщик.
+        with mock.patch.dict(compression.ENCODERS, br=mock.Mock(side_effect=AssertionError)):
+            cached = self.client.get(reverse('event_list'), HTTP_ACCEPT_ENCODING='gzip;q=0.5, br')
+        self.assertEqual(cached['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(cached.content), plain.content)
+
+        response = self.client.get(reverse('event_list'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+
+    @override_settings(COMPRESSION_MIN_SIZE=10 ** 6)
+    def test_small_response_is_not_compressed(self):
+        response = self.client.get(reverse('event_list'), HTTP_ACCEPT_ENCODING='br, gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_choose_encoding(self):
+        self.assertEqual(compression.choose_encoding('gzip, deflate, br, zstd'), 'br')
+        self.assertEqual(compression.choose_encoding('br;q=0, *'), 'zstd')
+        self.assertIsNone(compression.choose_encoding('identity'))
+
+    def test_media_is_served_precompressed_with_long_cache(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        Path(directory.name, 'doc.svg').write_bytes(b'<svg/>')
+        Path(directory.name, 'doc.svg.gz').write_bytes(gzip.compress(b'<svg/>'))
+
+        with override_settings(MEDIA_ROOT=directory.name):
+            response = self.client.get('/media/doc.svg', HTTP_ACCEPT_ENCODING='gzip')
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), b'<svg/>')
+            self.assertIn('immutable', response['Cache-Control'])
+
+            not_modified = self.client.get('/media/doc.svg', HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(not_modified.status_code, 304)
+            self.assertEqual(self.client.get('/media/../settings.py').status_code, 404)
+
+
+class MediaTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        Path(directory.name, 'videos').mkdir()
+        Path(directory.name, 'videos', 'clip.mp4').write_bytes(bytes(range(100)))
+        Path(directory.name, 'contacts').mkdir()
+        Path(directory.name, 'contacts', 'cv.pdf').write_bytes(b'%PDF')
+        Path(directory.name, 'uploads').mkdir()
+        Path(directory.name, 'uploads', 'a.jpg').write_bytes(b'\xff\xd8')
+        media_root = override_settings(MEDIA_ROOT=directory.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+
+    def test_range_request(self):
+        response = self.client.get('/media/videos/clip.mp4', HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(10, 20)))
+
+        suffix = self.client.get('/media/videos/clip.mp4', HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(suffix.streaming_content), bytes(range(95, 100)))
+        self.assertEqual(self.client.get('/media/videos/clip.mp4', HTTP_RANGE='bytes=200-').status_code, 416)
+
+        stale = self.client.get('/media/videos/clip.mp4', HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(stale.status_code, 200)
+        self.assertEqual(stale['Accept-Ranges'], 'bytes')
+
+    def test_private_file_requires_valid_signature(self):
+        self.assertEqual(self.client.get('/media/contacts/cv.pdf').status_code, 403)
+        self.assertEqual(self.client.get('/media/contacts/cv.pdf', {'token': 'forged'}).status_code, 403)
+
+        response = self.client.get(media.signed_url('contacts/cv.pdf'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+        with override_settings(MEDIA_SIGNED_URL_MAX_AGE=-1):
+            self.assertEqual(self.client.get(media.signed_url('contacts/cv.pdf')).status_code, 403)
+
+    def test_editor_images_are_public(self):
+        response = self.client.get('/media/uploads/a.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('public', response['Cache-Control'])
+
+    @override_settings(MEDIA_ACCEL_REDIRECT='/protected-media/')
+    def test_accel_redirect(self):
+        response = self.client.get(media.signed_url('contacts/cv.pdf'))
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/contacts/cv.pdf')
+        self.assertEqual(response.content, b'')
+
+
+class QueryPlanTests(TestCase):
+    @classmethod
+    @mock.patch.dict(factories.VOLUMES, {**{name: 100 for name in factories.VOLUMES}, 'event_images': 2, 'tool_images': 2})
+    def setUpTestData(cls):
+        factories.seed()
+
+    def test_endpoints_do_not_scan_large_tables(self):
+        self.assertEqual(queryplan.audit(min_rows=100), {})
+
+    def test_error_response_fails_audit(self):
+        with mock.patch('web.views.ToolsDetailAPIView.get', side_effect=RuntimeError):
+            with self.assertRaises(queryplan.AuditError):
+                queryplan.audit(min_rows=100, only=['tools_detail'])
+
+    def test_seq_scan_is_detected(self):
+        tables = queryplan.large_tables(100)
+        self.assertIn(Review._meta.db_table, tables)
+        plan = queryplan.explain(f"SELECT id, text FROM {Review._meta.db_table} WHERE text LIKE '%x%'")
+        self.assertEqual(queryplan.seq_scans(plan, tables), [Review._meta.db_table])
+
+
+class ScanTests(TestCase):
+    def test_scan_reads_all_rows_in_order_by_key(self):
+        moment = timezone.now()
+        for i in range(5):
+            Contact.objects.create(name=f'Клиент {i}', email=f'client{i}@example.com', message='Привет', phone='+996700123456')
+        # Одинаковый created_at: порядок и границы пачек держатся на pk.
+        Contact.objects.update(created_at=moment)
+
+        rows = Contact.objects.order_by('created_at', 'id').values_list('name', flat=True)
+        with self.assertNumQueries(6):
+            names = list(db.scan(rows, 2))
+        self.assertEqual(names, [f'Клиент {i}' for i in range(5)])
+
+        names = list(db.scan(Contact.objects.order_by('-id').values_list('name', flat=True), 2))
+        self.assertEqual(names, [f'Клиент {i}' for i in reversed(range(5))])
+
+
+class SubmissionExportTests(APITestCase):
+    def setUp(self):
+        for i in range(3):
+            Contact.objects.create(name=f'Клиент {i}', email=f'client{i}@example.com', message='Привет', phone='+996700123456')
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+    def test_csv_export_streams_all_rows(self):
+        response = self.client.get(reverse('contact_export'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(lines[0], 'id,name,email,phone,message,file,created_at')
+        self.assertEqual(len(lines), 4)
+
+    def test_csv_export_neutralizes_formulas(self):
+        Contact.objects.create(name='=HYPERLINK("http://evil")', email='x@example.com', message='@SUM(1)', phone='+996700123456')
+        response = self.client.get(reverse('contact_export'))
+        row = list(csv.reader(b''.join(response.streaming_content).decode('utf-8-sig').splitlines()))[-1]
+        self.assertEqual((row[1], row[4]), ('\'=HYPERLINK("http://evil")', "'@SUM(1)"))
+
+    def test_gzipped_ndjson_export(self):
+        response = self.client.get(reverse('contact_export'), {'format': 'ndjson', 'gzip': 'true'})
+        self.assertIn('.ndjson.gz', response['Content-Disposition'])
+        rows = [json.loads(line) for line in gzip.decompress(b''.join(response.streaming_content)).splitlines()]
+        self.assertEqual([row['name'] for row in rows], ['Клиент 0', 'Клиент 1', 'Клиент 2'])
+
+    def test_date_range_filter(self):
+        response = self.client.get(reverse('contact_export'), {'format': 'ndjson', 'date_to': '2000-01-01'})
+        self.assertEqual(b''.join(response.streaming_content), b'')
+        response = self.client.get(reverse('contact_export'), {'date_from': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_export_requires_staff(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(reverse('contact_vacancy_export')).status_code, 401)
+
+
+class ChunkedUploadTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def start(self, size, filename='cv.pdf'):
+        return self.client.post(reverse('upload_create'), {'filename': filename, 'size': size}, format='json')
+
+    def send(self, url, chunk, offset):
+        return self.client.patch(url, chunk, content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET=str(offset))
+
+    def test_resumable_upload_is_attached_to_contact(self):
+        response = self.start(10)
+        self.assertEqual(response.status_code, 201)
+        upload_id, url = response.data['id'], response['Location']
+
+        self.assertEqual(self.send(url, b'%PDF-', 0).status_code, 204)
+        self.assertEqual(self.send(url, b'-1.4!', 0).status_code, 409)
+        self.assertEqual(self.client.head(url)['Upload-Offset'], '5')
+        self.assertEqual(self.send(url, b'-1.4!', 5).status_code, 204)
+
+        response = self.client.post(reverse('contact_create'), {
+            'name': 'Клиент', 'email': 'client@example.com', 'message': 'Привет',
+            'phone': '+996700123456', 'upload_id': upload_id,
+        })
+        self.assertEqual(response.status_code, 201)
+        contact = Contact.objects.get()
+        self.assertEqual(contact.file.read(), b'%PDF--1.4!')
+        self.assertFalse(Upload.objects.exists())
+        self.assertEqual(OutboxMessage.objects.get().file_path, contact.file.path)
+
+    def test_chunk_beyond_declared_size_is_rejected(self):
+        url = self.start(4)['Location']
+        self.assertEqual(self.send(url, b'12345', 0).status_code, 413)
+        self.assertEqual(self.client.head(url)['Upload-Offset'], '0')
+
+    def test_chunk_is_rejected_while_another_is_written(self):
+        response = self.start(4)
+        with uploads.chunk_lock(response.data['id']):
+            self.assertEqual(self.send(response['Location'], b'1234', 0).status_code, 409)
+        self.assertEqual(self.send(response['Location'], b'1234', 0).status_code, 204)
+
+    @override_settings(UPLOAD_MAX_PENDING_SIZE=15)
+    def test_pending_uploads_are_capped(self):
+        self.assertEqual(self.start(10).status_code, 201)
+        self.assertEqual(self.start(10).status_code, 507)
+
+    def test_expired_uploads_are_purged(self):
+        response = self.start(10)
+        self.send(response['Location'], b'12345', 0)
+        upload = Upload.objects.get()
+        self.assertTrue(os.path.exists(uploads.partial_path(upload)))
+
+        Upload.objects.update(updated_at=timezone.now() - timedelta(seconds=settings.UPLOAD_TTL + 1))
+        self.assertEqual(uploads.purge_expired(), 1)
+        self.assertFalse(Upload.objects.exists())
+        self.assertFalse(os.path.exists(uploads.partial_path(upload)))
+
+    def test_oversized_or_forbidden_upload_is_rejected_upfront(self):
+        self.assertEqual(self.start(6 * 1024 * 1024).status_code, 400)
+        self.assertEqual(self.start(10, filename='run.sh').status_code, 400)
+
+    def test_oversized_form_is_rejected_by_content_length(self):
+        response = self.client.post(
+            reverse('contact_create'), b'x', content_type='multipart/form-data; boundary=x',
+            CONTENT_LENGTH=str(10 * 1024 * 1024),
+        )
+        self.assertEqual(response.status_code, 413)
+
+
+class PhoneValidationTests(APITestCase):
+    def test_normalizes_common_spellings(self):
+        for raw in ('+996700123456', '996 700 123 456', '0700123456', '700123456'):
+            self.assertEqual(phones.normalize_phone(raw), '+996 700 123 456')
+
+    def test_repeated_numbers_hit_cache(self):
+        phones.cache_clear()
+        phones.normalize_many(['0700123456', '0700123456', 'abc', 'abc'])
+        self.assertEqual(phones.cache_info().hits, 2)
+
+    def test_serializer_validates_phone_once(self):
+        serializer = ContactSerializer(data={'name': 'Клиент', 'email': 'client@example.com', 'message': 'Привет', 'phone': '0700123456'})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        with mock.patch.object(Contact, 'full_clean') as full_clean:
+            contact = serializer.save()
+        full_clean.assert_not_called()
+        self.assertEqual(contact.phone, '+996 700 123 456')
+
+    def test_model_save_still_validates(self):
+        with self.assertRaises(DjangoValidationError) as error:
+            Contact.objects.create(name='Клиент', email='client@example.com', message='Привет', phone='+7 999 123 45 67')
+        self.assertIn('phone', error.exception.message_dict)
+
+    def test_bulk_endpoint(self):
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        response = self.client.post(reverse('phone_validate'), {'phones': ['0700123456', '123']}, format='json')
+        self.assertEqual((response.data['valid'], response.data['invalid']), (1, 1))
+        self.assertEqual(response.data['results'][0]['phone'], '+996 700 123 456')
+
+
+class AsyncViewTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(12):
+            event = Event.objects.create(title=f'Event {i}', description='')
+            event.gallery.add(EventImage.objects.create(event=event, image=f'event_gallery/{i}.jpg'))
+        cls.event = Event.objects.first()
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def call(self, view, request, **kwargs):
+        return async_to_sync(view.as_view())(request, **kwargs)
+
+    def test_list_matches_sync_view(self):
+        for query in ({}, {'page': 2}, {'count': 'false'}, {'cursor': ''}):
+            response = self.call(async_views.EventListView, self.factory.get('/api/events/', query))
+            self.assertEqual(response.status_code, 200)
+            expected = self.client.get(reverse('event_list'), query).json()
+            self.assertEqual(json.loads(response.content), expected)
+
+    def test_detail_and_conditional_get(self):
+        url = reverse('event_detail', args=[self.event.pk])
+        response = self.call(async_views.EventDetailView, self.factory.get(url), pk=self.event.pk)
+        self.assertEqual(json.loads(response.content), self.client.get(url).json())
+
+        request = self.factory.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(self.call(async_views.EventDetailView, request, pk=self.event.pk).status_code, 304)
+
+    def test_missing_object_returns_json_404(self):
+        response = self.call(async_views.EventDetailView, self.factory.get('/api/events/0/'), pk=0)
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('detail', json.loads(response.content))
+
+    def test_contact_submission(self):
+        request = self.factory.post(reverse('contact_create'), {
+            'name': 'Клиент', 'email': 'client@example.com', 'message': 'Привет', 'phone': '0700123456',
+        })
+        response = self.call(async_views.ContactView, request)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(json.loads(response.content)['phone'], '+996 700 123 456')
+        self.assertIn('Новая заявка на консультацию', OutboxMessage.objects.get().message)
+
+        request = self.factory.post(reverse('contact_create'), {'name': 'Клиент'})
+        self.assertEqual(self.call(async_views.ContactView, request).status_code, 400)
+
+    def test_submission_through_middleware_skips_csrf(self):
+        class urlconf:
+            urlpatterns = [path('api/contacts/', async_views.ContactView.as_view(), name='contact_create')]
+
+        with override_settings(ROOT_URLCONF=urlconf):
+            response = Client(enforce_csrf_checks=True).post('/api/contacts/', {
+                'name': 'Клиент', 'email': 'client@example.com', 'message': 'Привет', 'phone': '0700123456',
+            })
+        self.assertEqual(response.status_code, 201)
+
+
+class BenchmarkTests(TestCase):
+    def test_every_route_is_benchmarked(self):
+        names = {pattern.name for pattern in web_urls.urlpatterns if getattr(pattern, 'name', None)}
+        self.assertEqual(names - benchmark.SKIPPED_ROUTES, set(benchmark.ROUTES))
+
+    @mock.patch.dict(factories.VOLUMES, {name: 3 for name in factories.VOLUMES})
+    def test_run_records_latency_queries_and_size(self):
+        factories.seed()
+        results = benchmark.run(iterations=2, only={'event_list', 'contact_create'})
+        self.assertEqual(set(results), {'event_list', 'event_list:deep_page', 'event_list:cursor', 'contact_create', 'contact_create:list'})
+        self.assertEqual(results['event_list']['status'], 200)
+        self.assertEqual(results['contact_create']['status'], 201)
+        self.assertGreater(results['event_list']['queries'], 0)
+        self.assertGreater(results['event_list']['bytes'], 0)
+
+        baseline = {'event_list': dict(results['event_list'], queries=results['event_list']['queries'] - 1)}
+        self.assertEqual(len(benchmark.compare(results, baseline)), 1)
+
+    @mock.patch.dict(factories.VOLUMES, {name: 3 for name in factories.VOLUMES})
+    def test_tools_detail_and_project_filter_succeed(self):
+        factories.seed()
+        results = benchmark.run(iterations=1, only={'tools_detail', 'project_filter'})
+        self.assertEqual({name: stats['status'] for name, stats in results.items()}, {'tools_detail': 200, 'project_filter': 200})
+
+    @mock.patch.dict(factories.VOLUMES, {name: 3 for name in factories.VOLUMES})
+    def test_server_error_fails_run(self):
+        factories.seed()
+        with mock.patch('web.views.ToolsDetailAPIView.get', side_effect=RuntimeError):
+            with self.assertRaises(benchmark.BenchmarkError):
+                benchmark.run(iterations=1, only={'tools_detail'})
+
+
+class MetricsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.install_query_recorder(connection)
+
+    def sample(self, name, **labels):
+        return metrics.REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_request_records_route_queries_serializer_and_cache(self):
+        Event.objects.create(title='Event', description='Description', content='<p>Content</p>', image='events/e.jpg')
+        route = {'route': 'api/events/'}
+        requests = self.sample('web_requests_total', method='GET', status='200', **route)
+        queries = self.sample('web_db_queries_per_request_sum', **route)
+        serialized = self.sample('web_serializer_duration_seconds_count', serializer='EventSerializer')
+        misses = self.sample('web_response_cache_total', view='EventListAPIView', result='miss')
+
+        self.client.get(reverse('event_list'))
+        self.client.get(reverse('event_list'))
+
+        self.assertEqual(self.sample('web_requests_total', method='GET', status='200', **route), requests + 2)
+        self.assertGreater(self.sample('web_db_queries_per_request_sum', **route), queries)
+        self.assertEqual(self.sample('web_serializer_duration_seconds_count', serializer='EventSerializer'), serialized + 1)
+        self.assertEqual(self.sample('web_response_cache_total', view='EventListAPIView', result='miss'), misses + 1)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_endpoint(self):
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'web_request_duration_seconds', response.content)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_endpoint_requires_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+
+    @override_settings(METRICS_TOKEN='', DEBUG=False)
+    def test_metrics_endpoint_is_closed_without_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+
+@override_settings(REPLICA_DATABASES=['replica1'])
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        replicas.health.clear()
+        self.router = replicas.ReplicaRouter()
+
+    def call(self, request):
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(Event))
+            return HttpResponse(status=201 if request.method == 'POST' else 200)
+
+        response = replicas.ReplicaMiddleware(view)(request)
+        return seen[0], response
+
+    @mock.patch.object(replicas, 'replica_lag', return_value=0)
+    def test_safe_requests_read_from_replica_until_write(self, lag):
+        factory = RequestFactory()
+        self.assertEqual(self.call(factory.get('/api/events/'))[0], 'replica1')
+
+        alias, response = self.call(factory.post('/api/contact/'))
+        self.assertIsNone(alias)
+        self.assertEqual(response.cookies[replicas.PIN_COOKIE]['max-age'], settings.REPLICA_STICKY_SECONDS)
+
+        pinned = factory.get('/api/events/')
+        pinned.COOKIES[replicas.PIN_COOKIE] = '1'
+        self.assertIsNone(self.call(pinned)[0])
+        self.assertIsNone(self.router.db_for_read(Event))
+
+    def fill_cache(self, version):
+        seen = []
+
+        class View:
+            cache_models = (Event,)
+
+        @cache_response()
+        def handler(view, request):
+            seen.append(self.router.db_for_read(Event))
+            return Response({})
+
+        with mock.patch('web.cache.get_model_versions', return_value=[version]):
+            replicas.ReplicaMiddleware(lambda request: handler(View(), request))(RequestFactory().get('/api/events/'))
+        return seen
+
+    @mock.patch.object(replicas, 'replica_lag', return_value=0)
+    def test_fresh_cache_miss_is_filled_from_primary(self, lag):
+        self.assertEqual(self.fill_cache(str(time.time_ns())), [None])
+
+    @mock.patch.object(replicas, 'replica_lag', return_value=0)
+    def test_settled_cache_miss_is_filled_from_replica(self, lag):
+        changed = time.time_ns() - 60 * 1_000_000_000
+        self.assertEqual(self.fill_cache(str(changed)), ['replica1'])
+
+    @mock.patch.object(replicas, 'replica_lag', return_value=0)
+    def test_home_document_is_built_on_primary(self, lag):
+        seen = []
+
+        def build():
+            seen.append(self.router.db_for_read(Event))
+            return {'etag': ''}
+
+        def view(request):
+            home.get_document()
+            return HttpResponse()
+
+        with mock.patch.object(home, 'build_document', side_effect=build), \
+                mock.patch.object(home.cache, 'get', return_value=None), mock.patch.object(home.cache, 'set'):
+            replicas.ReplicaMiddleware(view)(RequestFactory().get('/api/home/'))
+        self.assertEqual(seen, [None])
+
+    @mock.patch.object(replicas, 'replica_lag', return_value=0)
+    def test_upload_offset_is_read_from_primary(self, lag):
+        seen = []
+
+        def lookup(model, pk):
+            seen.append(self.router.db_for_read(model))
+            return Upload(pk=pk, size=10, offset=4)
+
+        view = web_views.UploadDetailAPIView.as_view()
+        with mock.patch.object(web_views, 'get_object_or_404', side_effect=lookup):
+            response = replicas.ReplicaMiddleware(lambda request: view(request, pk=1))(RequestFactory().head('/api/uploads/1/'))
+        self.assertEqual((response['Upload-Offset'], seen), ('4', [None]))
+
+    def test_lagging_or_broken_replica_falls_back_to_primary(self):
+        token = replicas.use_replicas.set(True)
+        self.addCleanup(replicas.use_replicas.reset, token)
+        with mock.patch.object(replicas, 'replica_lag', return_value=settings.REPLICA_MAX_LAG + 1):
+            self.assertIsNone(self.router.db_for_read(Event))
+        replicas.health.clear()
+        with mock.patch.object(replicas, 'replica_lag', side_effect=DatabaseError):
+            self.assertIsNone(self.router.db_for_read(Event))
+        self.assertFalse(self.router.allow_migrate('replica1', 'web'))
+
+
+class LoggingTests(TestCase):
+    def record(self, msg, *args, level=logging.INFO):
+        return logging.LogRecord('web.views', level, __file__, 1, msg, args, None)
+
+    def test_json_formatter_redacts_phone_and_email(self):
+        line = logs.JSONFormatter().format(self.record("Заявка от %s, %s", 'client@mail.kg', '+996 700 123 456'))
+        entry = json.loads(line)
+        self.assertEqual(entry['level'], 'INFO')
+        self.assertEqual(entry['message'], 'Заявка от ***@mail.kg, ***56')
+
+    def test_sampling_is_decided_once_per_request(self):
+        sample = logs.RouteSampleFilter(rates={'event_detail': 0}, default=1)
+        token = logs.request_context.set({'request_id': '1', 'route': 'event_detail'})
+        self.addCleanup(logs.request_context.reset, token)
+        self.assertFalse(sample.filter(self.record('first')))
+        self.assertFalse(sample.filter(self.record('second')))
+        self.assertTrue(sample.filter(self.record('failure', level=logging.ERROR)))
+
+    def test_background_handler_writes_from_listener_thread(self):
+        stream = io.StringIO()
+        handler = logs.BackgroundHandler(stream)
+        handler.setFormatter(logs.JSONFormatter())
+        token = logs.request_context.set({'request_id': 'abc', 'route': 'contact_create'})
+        handler.handle(self.record('Создана заявка %s', 7))
+        logs.request_context.reset(token)
+        handler.close()
+
+        entry = json.loads(stream.getvalue())
+        self.assertEqual(entry['message'], 'Создана заявка 7')
+        self.assertEqual((entry['request_id'], entry['route']), ('abc', 'contact_create'))
+
+
+class ModelStrTests(TestCase):
+    def test_image_str_does_not_query_related_object(self):
+        tool = Tools.objects.create(name='Tool', image='tools/tool.jpg')
+        image = ToolImage.objects.create(tool=tool, image='tool_images/tool.jpg')
+        image = ToolImage.objects.get(pk=image.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(str(image), f'Image for tool #{tool.pk}')
+        self.assertEqual(str(ToolImage.objects.select_related('tool').get(pk=image.pk)), 'Image for Tool')
+
+
+class CeleryRoutingTests(SimpleTestCase):
+    def queue(self, task):
+        return celery_app.amqp.router.route({}, task.name)['queue'].name
+
+    def test_tasks_are_routed_to_their_queues(self):
+        self.assertEqual(self.queue(send_telegram_digest), 'notifications')
+        self.assertEqual(self.queue(dispatch_outbox), 'notifications')
+        self.assertEqual(self.queue(generate_image_derivatives), 'media')
+        self.assertEqual(self.queue(publish_snapshot), 'maintenance')
+        self.assertEqual(self.queue(benchmark_probe), 'default')
+
+    def test_tasks_ack_late_and_ignore_results(self):
+        self.assertTrue(send_telegram_digest.acks_late)
+        self.assertTrue(generate_image_derivatives.ignore_result)
+        self.assertEqual(celery_app.conf.worker_prefetch_multiplier, 1)
+
+
+class TelegramPipelineTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        celery_app.conf.task_always_eager = True
+        self.addCleanup(setattr, celery_app.conf, 'task_always_eager', False)
+        self.server = MockTelegramServer().__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+        settings_override = override_settings(TELEGRAM_API_URL=self.server.url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_rate_limited_message_is_retried(self):
+        self.server.rate_limited = 1
+        send_telegram_digest.delay('Заявка')
+        self.assertEqual(self.server.methods(), ['sendMessage', 'sendMessage'])
+
+    def test_rate_limiter_wait_reschedules_without_retry(self):
+        with mock.patch.object(telegram.TokenBucket, 'consume', side_effect=[5, 0]), \
+                mock.patch.object(send_telegram_digest, 'retry') as retry:
+            send_telegram_digest.delay('Заявка')
+        retry.assert_not_called()
+        self.assertEqual(self.server.methods(), ['sendMessage'])
+
+    def test_client_error_is_not_retried(self):
+        with override_settings(TELEGRAM_API_URL=f'{self.server.url}/missing'):
+            with self.assertRaises(telegram.TelegramError) as raised:
+                telegram.send_message('Заявка')
+        self.assertNotIsInstance(raised.exception, requests.RequestException)
+
+    def test_digest_respects_message_limit(self):
+        parts = telegram.build_digest(['x' * 3000, 'y' * 3000, 'z' * 10])
+        self.assertEqual(len(parts), 2)
+        self.assertTrue(all(len(part) <= telegram.MESSAGE_LIMIT for part in parts))
+
+
+class OutboxTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        celery_app.conf.task_always_eager = True
+        self.addCleanup(setattr, celery_app.conf, 'task_always_eager', False)
+        self.server = MockTelegramServer().__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+        settings_override = override_settings(TELEGRAM_API_URL=self.server.url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def make_files(self, count):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        paths = []
+        for i in range(count):
+            path = Path(directory.name) / f'cv-{i}.pdf'
+            path.write_bytes(b'%PDF-1.4')
+            paths.append(str(path))
+        return paths
+
+    def submit(self, name='Клиент'):
+        return self.client.post(reverse('contact_create'), {
+            'name': name, 'email': 'client@example.com', 'message': 'Привет', 'phone': '+996700123456',
+        })
+
+    def test_submission_writes_outbox_without_sending(self):
+        self.assertEqual(self.submit().status_code, 201)
+        message = OutboxMessage.objects.get()
+        self.assertIn('Новая заявка на консультацию', message.message)
+        self.assertIsNone(message.sent_at)
+        self.assertEqual(self.server.methods(), [])
+
+    def test_dispatch_sends_pending_batch_once(self):
+        self.submit('Клиент 1')
+        self.submit('Клиент 2')
+
+        self.assertEqual(outbox.dispatch(), 2)
+        self.assertEqual(self.server.methods(), ['sendMessage'])
+        self.assertIn('Клиент 2', self.server.calls[0]['data']['text'])
+        self.assertFalse(OutboxMessage.objects.filter(sent_at__isnull=True).exists())
+        self.assertEqual(outbox.dispatch(), 0)
+
+    @override_settings(OUTBOX_DELIVERY='direct')
+    def test_failed_delivery_is_recorded_and_retried(self):
+        self.submit()
+        with mock.patch.object(telegram, 'send_message', side_effect=telegram.TelegramError('Нет связи')):
+            self.assertEqual(outbox.dispatch(), 0)
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.attempts, message.last_error, message.sent_at), (1, 'Нет связи', None))
+
+        self.assertEqual(outbox.dispatch(), 1)
+        self.assertEqual(self.server.methods(), ['sendMessage'])
+        self.assertEqual(OutboxMessage.objects.get().attempts, 2)
+
+    def test_dispatch_sends_digest_and_media_group(self):
+        files = self.make_files(2)
+        OutboxMessage.objects.create(message='Заявка 1', file_path=files[0])
+        OutboxMessage.objects.create(message='Заявка 2', file_path=files[1])
+        OutboxMessage.objects.create(message='Заявка 3')
+
+        self.assertEqual(outbox.dispatch(), 3)
+        self.assertEqual(self.server.methods(), ['sendMessage', 'sendMediaGroup'])
+        self.assertIn('Заявка 3', self.server.calls[0]['data']['text'])
+
+    def test_queued_digest_marks_messages_only_when_delivered(self):
+        celery_app.conf.task_always_eager = False
+        self.submit()
+        with mock.patch.object(send_telegram_digest, 'delay') as delay:
+            self.assertEqual(outbox.dispatch(), 1)
+        message = OutboxMessage.objects.get()
+        self.assertIsNone(message.sent_at)
+        self.assertIsNotNone(message.claimed_until)
+        self.assertEqual(self.server.methods(), [])
+
+        send_telegram_digest.apply(delay.call_args.args)
+        self.assertEqual(self.server.methods(), ['sendMessage'])
+        message.refresh_from_db()
+        self.assertIsNotNone(message.sent_at)
+        self.assertIsNone(message.claimed_until)
+
+    @override_settings(OUTBOX_DELIVERY='direct')
+    def test_sent_text_is_not_resent_after_file_failure(self):
+        files = self.make_files(1)
+        OutboxMessage.objects.create(message='С файлом', file_path=files[0])
+        OutboxMessage.objects.create(message='Без файла')
+        with mock.patch.object(telegram, 'send_documents', side_effect=telegram.TelegramError('Нет связи')):
+            self.assertEqual(outbox.dispatch(), 1)
+        with_file, without_file = OutboxMessage.objects.order_by('id')
+        self.assertEqual((with_file.text_sent, with_file.sent_at, with_file.claimed_until), (True, None, None))
+        self.assertTrue(without_file.text_sent)
+        self.assertIsNotNone(without_file.sent_at)
+        self.assertIsNone(without_file.claimed_until)
+
+        self.assertEqual(outbox.dispatch(), 1)
+        self.assertEqual(self.server.methods(), ['sendMessage', 'sendDocument'])
+
+    def test_claimed_messages_are_skipped_until_claim_expires(self):
+        self.submit()
+        self.assertEqual(len(outbox.claim()), 1)
+        self.assertEqual(outbox.dispatch(), 0)
+        # Диспетчер, забравший пачку, умер: строки возвращаются по истечении срока.
+        OutboxMessage.objects.update(claimed_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(outbox.dispatch(), 1)
+        self.assertEqual(OutboxMessage.objects.get().attempts, 2)
+
+    def test_purge_keeps_pending_messages(self):
+        sent = OutboxMessage.objects.create(message='Старое', sent_at=timezone.now() - timedelta(days=60))
+        OutboxMessage.objects.create(message='Ждет отправки')
+        self.assertEqual(outbox.purge(days=30), 1)
+        self.assertFalse(OutboxMessage.objects.filter(pk=sent.pk).exists())
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+
+
+class SearchTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.project = Project.objects.create(
+            title='Мобильное приложение для доставки',
+            description='Разработали приложения для iOS и Android',
+        )
+        Services.objects.create(title='Дизайн', content='<p>Проектируем <b>мобильные</b> интерфейсы</p>')
+        Vacancy.objects.create(title='Мобильный разработчик', description='', requirements='', is_active=False)
+
+    def test_documents_follow_model_changes(self):
+        self.assertEqual(SearchDocument.objects.count(), 2)
+        self.assertEqual(SearchDocument.objects.get(kind='service').body, 'Проектируем мобильные интерфейсы')
+        self.project.delete()
+        self.assertFalse(SearchDocument.objects.filter(kind='project').exists())
+
+    def test_search_is_ranked_stemmed_and_highlighted(self):
+        response = self.client.get(reverse('search'), {'q': 'мобильных приложений'})
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results']
+        self.assertEqual([(item['type'], item['id']) for item in results], [('project', self.project.pk)])
+        self.assertIn('<mark>', results[0]['headline'])
+
+    def test_search_filters_by_type(self):
+        response = self.client.get(reverse('search'), {'q': 'мобильный', 'type': 'service'})
+        self.assertEqual([item['type'] for item in response.data['results']], ['service'])
+
+    def test_project_search_uses_index(self):
+        response = self.client.get(reverse('project_search'), {'q': 'доставка'})
+        self.assertEqual([item['id'] for item in response.data['results']], [self.project.pk])
+
+    def test_fts_query_uses_prefix_tokens(self):
+        self.assertEqual(search.fts_query('Мобильные "apps"!'), '"мобильные"* "apps"*')
+
+
+class RichTextTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_render_sanitizes_and_minifies(self):
+        html, excerpt, missing = richtext.render(
+            '<p onclick="steal()">Привет,\n   <b>мир</b></p>\n<script>alert(1)</script>'
+            '<p><a href="javascript:alert(1)">ссылка</a> <img src="/media/uploads/a.jpg"></p>'
+        )
+        self.assertEqual(
+            html,
+            '<p>Привет, <b>мир</b></p><p><a>ссылка</a> <img src="/media/uploads/a.jpg" loading="lazy" decoding="async"></p>',
+        )
+        self.assertEqual(excerpt, 'Привет, мир ссылка')
+        self.assertEqual(missing, ['uploads/a.jpg'])
+
+    def test_update_fields_save_keeps_rendered_columns_in_sync(self):
+        event = Event.objects.create(title='Event', description='', content='<p>Старый</p>')
+        event.content = '<p>Новый</p>'
+        event.save(update_fields=['content'])
+        event.refresh_from_db()
+        self.assertEqual((event.content_html, event.content_excerpt), ('<p>Новый</p>', 'Новый'))
+
+    def test_api_returns_rendered_content_and_excerpt(self):
+        event = Event.objects.create(title='Event', description='', content='<p style="x">Текст<script>1</script></p>')
+        self.assertEqual(event.content_excerpt, 'Текст')
+
+        response = self.client.get(reverse('event_detail', args=[event.pk]))
+        self.assertEqual(response.data['content'], '<p>Текст</p>')
+        self.assertNotIn('content_html', response.data)
+        row = self.client.get(reverse('event_list')).data['results'][0]
+        self.assertEqual(row['content_excerpt'], 'Текст')
+
+
+class ImageDerivativeTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        celery_app.conf.task_always_eager = True
+        self.addCleanup(setattr, celery_app.conf, 'task_always_eager', False)
+
+    def make_image(self, width, height):
+        buffer = tempfile.SpooledTemporaryFile()
+        Image.new('RGB', (width, height), (200, 30, 30)).save(buffer, 'JPEG')
+        buffer.seek(0)
+        return SimpleUploadedFile('photo.jpg', buffer.read(), content_type='image/jpeg')
+
+    def test_derivatives_are_generated_after_commit_and_serialized(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            project = Project.objects.create(title='Project', image=self.make_image(1000, 500))
+
+        project.refresh_from_db()
+        manifest = project.image_srcset
+        self.assertEqual(manifest['source'], project.image.name)
+        self.assertEqual(
+            sorted({(variant['width'], variant['height']) for variant in manifest['variants']}),
+            [(320, 160), (640, 320), (1000, 500)],
+        )
+
+        data = self.client.get(reverse('project_list')).data['results'][0]['image_srcset']
+        self.assertTrue(data['placeholder'].startswith('data:image/jpeg;base64,'))
+        self.assertEqual(set(data['srcset']), {'webp', 'jpeg'})
+        self.assertTrue(data['srcset']['webp'].endswith('1000w'))
+
+    def test_rich_text_images_get_responsive_derivatives(self):
+        default_storage.save('uploads/photo.jpg', self.make_image(1000, 500))
+        with self.captureOnCommitCallbacks(execute=True):
+            service = Services.objects.create(title='Service', content='<p><img src="/media/uploads/photo.jpg"></p>')
+
+        service.refresh_from_db()
+        self.assertIn('<picture><source type="image/webp"', service.content_html)
+        self.assertIn('width="1000" height="500"', service.content_html)
+        self.assertIn('loading="lazy"', service.content_html)
+
+    def test_image_without_derivatives_serializes_as_null(self):
+        Project.objects.create(title='Project', image='projects/missing.jpg')
+        self.assertIsNone(self.client.get(reverse('project_list')).data['results'][0]['image_srcset'])
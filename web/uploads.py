@@ -0,0 +1,123 @@
+import os
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .models import Upload
+
+
+class RequestTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "Размер файла не должен превышать 5 МБ!"
+    default_code = 'request_too_large'
+
+
+class OffsetMismatch(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Смещение не совпадает с уже загруженными данными"
+    default_code = 'offset_mismatch'
+
+
+class StorageExhausted(APIException):
+    status_code = status.HTTP_507_INSUFFICIENT_STORAGE
+    default_detail = "Слишком много незавершенных загрузок, попробуйте позже"
+    default_code = 'storage_exhausted'
+
+
+CHUNK_LOCK_KEY = 'web:upload:{pk}:lock'
+
+
+def content_length(request):
+    try:
+        return int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return 0
+
+
+def check_content_length(request, limit):
+    """Отклоняет запрос по заголовку Content-Length до чтения тела."""
+    if content_length(request) > limit:
+        raise RequestTooLarge()
+
+
+def check_pending_quota(size):
+    """Не дает незавершенным загрузкам занять больше UPLOAD_MAX_PENDING_SIZE байт диска."""
+    pending = Upload.objects.filter(file='').aggregate(total=Sum('size'))['total'] or 0
+    if pending + size > settings.UPLOAD_MAX_PENDING_SIZE:
+        raise StorageExhausted()
+
+
+@contextmanager
+def chunk_lock(pk):
+    """
+    Одна запись части на загрузку за раз. Часть пишется вне транзакции БД,
+    поэтому параллельный PATCH с тем же смещением отсекается здесь.
+    """
+    key = CHUNK_LOCK_KEY.format(pk=pk)
+    if not cache.add(key, 1, timeout=settings.UPLOAD_CHUNK_TIMEOUT):
+        raise OffsetMismatch("Предыдущая часть этой загрузки еще записывается")
+    try:
+        yield
+    finally:
+        cache.delete(key)
+
+
+def partial_path(upload):
+    return os.path.join(settings.MEDIA_ROOT, settings.UPLOAD_PARTIAL_DIR, f'{upload.pk}.part')
+
+
+def append_chunk(upload, stream, length):
+    """
+    Дописывает тело запроса к временному файлу загрузки блоками по
+    UPLOAD_BUFFER_SIZE, не держа часть целиком в памяти. Хвост от прерванной
+    ранее части отрезается, поэтому повтор с того же смещения безопасен.
+    Возвращает новое смещение.
+    """
+    path = partial_path(upload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'ab') as part:
+        part.truncate(upload.offset)
+        remaining = length
+        while remaining > 0:
+            data = stream.read(min(settings.UPLOAD_BUFFER_SIZE, remaining))
+            if not data:
+                break
+            part.write(data)
+            remaining -= len(data)
+    return upload.offset + length - remaining
+
+
+def finalize(upload):
+    """Переносит собранный файл в хранилище и удаляет временный."""
+    path = partial_path(upload)
+    with open(path, 'rb') as part:
+        name = upload.file.field.generate_filename(upload, f'{upload.pk}/{get_valid_filename(upload.filename)}')
+        upload.file.name = default_storage.save(name, File(part))
+    os.remove(path)
+
+
+def purge_expired():
+    """
+    Удаляет загрузки, не менявшиеся дольше UPLOAD_TTL секунд: брошенные на
+    середине и завершенные, но так и не прикрепленные к заявке.
+    """
+    expired = Upload.objects.filter(updated_at__lt=timezone.now() - timedelta(seconds=settings.UPLOAD_TTL))
+    count = 0
+    for upload in expired.iterator():
+        path = partial_path(upload)
+        if os.path.exists(path):
+            os.remove(path)
+        if upload.file:
+            upload.file.delete(save=False)
+        upload.delete()
+        count += 1
+    return count
@@ -7,24 +7,26 @@ from .views import (
     ContactCreateView, ReviewListCreateView,
     YouTubeShortListAPIView, GalleryListAPIView,
     ToolsListAPIView, ToolsDetailAPIView,
-    AboutListAPIView, ContactVacancyCreateView
+    AboutListAPIView, ContactVacancyCreateView, SearchView, SubmissionExportView,
+    UploadCreateView, UploadDetailAPIView, PhoneValidationView, HomeAPIView,
 )
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 from rest_framework import permissions
 
 from django.conf import settings
-from django.conf.urls.static import static
+
+api_info = openapi.Info(
+    title="NavisDevs API",
+    default_version='v1',
+    description="API documentation for NavisDevs",
+    terms_of_service="https://www.google.com/policies/terms/",
+    contact=openapi.Contact(email="contact@navisdevs.com"),
+    license=openapi.License(name="BSD License"),
+)
 
 schema_view = get_schema_view(
-    openapi.Info(
-        title="NavisDevs API",
-        default_version='v1',
-        description="API documentation for NavisDevs",
-        terms_of_service="https://www.google.com/policies/terms/",
-        contact=openapi.Contact(email="contact@navisdevs.com"),
-        license=openapi.License(name="BSD License"),
-    ),
+    api_info,
     public=True,
     permission_classes=(permissions.AllowAny,),
 )
@@ -47,6 +49,13 @@ urlpatterns = [
 
     path('contacts/', ContactCreateView.as_view(), name='contact_create'),
     path('contact_vacancy/', ContactVacancyCreateView.as_view(), name='contact_vacancy_create'),
+    path('contacts/export/', SubmissionExportView.as_view(export_kind='contacts'), name='contact_export'),
+    path('contact_vacancy/export/', SubmissionExportView.as_view(export_kind='contact_vacancy'), name='contact_vacancy_export'),
+
+    path('phones/validate/', PhoneValidationView.as_view(), name='phone_validate'),
+
+    path('uploads/', UploadCreateView.as_view(), name='upload_create'),
+    path('uploads/<uuid:pk>/', UploadDetailAPIView.as_view(), name='upload_detail'),
 
     path('reviews/', ReviewListCreateView.as_view(), name='review_list_create'),
 
@@ -55,15 +64,38 @@ urlpatterns = [
     path('gallery/', GalleryListAPIView.as_view(), name='gallery_list'),
 
     path('tools/', ToolsListAPIView.as_view(), name='tools_list'),
-    path('tools/<slug:slug>/', ToolsDetailAPIView.as_view(), name='tools_detail'),
+    path('tools/<int:pk>/', ToolsDetailAPIView.as_view(), name='tools_detail'),
 
     path('about/', AboutListAPIView.as_view(), name='about_list'),
 
+    path('home/', HomeAPIView.as_view(), name='home'),
+
+    path('search/', SearchView.as_view(), name='search'),
+
     path('ckeditor/', include('ckeditor_uploader.urls')),
 
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+if settings.ASYNC_VIEWS:
+    from .async_views import ASYNC_VIEWS
+
+    # Асинхронные view не видны drf_yasg, поэтому Swagger строится по синхронным маршрутам.
+    schema_view = get_schema_view(
+        api_info,
+        public=True,
+        permission_classes=(permissions.AllowAny,),
+        patterns=[path('api/', include(list(urlpatterns)))],
+    )
+    swagger_urls = [
+        path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
+        path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    ]
+    swagger_names = {pattern.name for pattern in swagger_urls}
+    urlpatterns = [
+        path(str(pattern.pattern), ASYNC_VIEWS[pattern.name].as_view(), name=pattern.name)
+        if getattr(pattern, 'name', None) in ASYNC_VIEWS else pattern
+        for pattern in urlpatterns
+        if getattr(pattern, 'name', None) not in swagger_names
+    ] + swagger_urls
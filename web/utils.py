@@ -1,34 +1,140 @@
 import requests
-from django.conf import settings
+from django.apps import apps
+from django.core.cache import cache
 from celery import shared_task
+from celery.exceptions import Ignore
 import logging
+import time
+
+from . import home, outbox, richtext, snapshots, telegram, uploads
+from .cache import bump_model_version
+from .images import build_manifest, ensure_manifest, srcset_field_name
 
 logger = logging.getLogger(__name__)
 
-@shared_task
-def send_telegram_notification(message, file_path=None):
-    logger.info(f"Начало отправки уведомления: {message}, файл: {file_path}")
+RETRY_POLICY = {
+    'autoretry_for': (requests.RequestException,),
+    'retry_backoff': True,
+    'retry_backoff_max': 600,
+    'retry_jitter': True,
+    'max_retries': 8,
+}
+
+
+def throttle(task):
+    """
+    Берет токен из общего лимита или ставит задачу заново через время ожидания.
+    Ожидание лимита - не ошибка, поэтому не расходует max_retries.
+    """
+    wait = telegram.get_rate_limiter().consume()
+    if wait:
+        task.apply_async(task.request.args, task.request.kwargs, countdown=wait)
+        raise Ignore()
+
+
+def contact_message(contact):
+    return f"Новая заявка на консультацию! 🎉\nИмя: {contact.name} 😊\nEmail: {contact.email or 'Не указан'} 📧\nСообщение: {contact.message} 💬\nТелефон: {contact.phone} 📞\nДата: {contact.created_at} 🕒"
+
+
+def contact_vacancy_message(contact):
+    return f"Новая заявка на вакансию! 🚀\nИмя: {contact.name} 😊\nEmail: {contact.email} 📧\nСсылка на соцсеть: {contact.link} 🔗\nТелефон: {contact.phone} 📞\nДата: {contact.created_at} 🕒"
+
+
+@shared_task(bind=True, **RETRY_POLICY)
+def send_telegram_digest(self, text, message_ids=()):
+    throttle(self)
     try:
+        telegram.send_message(text)
+    except telegram.TelegramRetryAfter as e:
+        raise self.retry(countdown=e.retry_after)
+    outbox.text_delivered(message_ids)
+    logger.info("Дайджест уведомлений отправлен")
+
+
+@shared_task(bind=True, **RETRY_POLICY)
+def send_telegram_documents(self, file_paths, message_ids=()):
+    throttle(self)
+    try:
+        telegram.send_documents(file_paths)
+    except telegram.TelegramRetryAfter as e:
+        raise self.retry(countdown=e.retry_after)
+    outbox.files_delivered(message_ids)
+    logger.info("Файлы уведомлений отправлены: %s", len(file_paths))
+
+
+@shared_task
+def dispatch_outbox():
+    return outbox.dispatch()
+
+
+@shared_task
+def purge_outbox():
+    deleted = outbox.purge()
+    logger.info("Удалено отправленных уведомлений outbox: %s", deleted)
+    return deleted
+
+
+@shared_task
+def purge_uploads():
+    deleted = uploads.purge_expired()
+    logger.info("Удалено просроченных загрузок: %s", deleted)
+    return deleted
+
+
+@shared_task
+def generate_image_derivatives(model_label, pk, field_name, source):
+    model = apps.get_model(model_label)
+    manifest = build_manifest(source)
+    # update() не вызывает post_save, поэтому версию кэша поднимаем вручную;
+    # фильтр по имени файла не даст записать манифест поверх нового изображения.
+    updated = model.objects.filter(pk=pk, **{field_name: source}).update(**{srcset_field_name(field_name): manifest})
+    if updated:
+        bump_model_version(model)
+    logger.info("Производные изображения %s готовы: %s", source, len(manifest['variants']))
+    return updated
+
+
+@shared_task
+def render_rich_text(model_label, pk):
+    """Перерисовывает RichText-поля с адаптивными версиями встроенных изображений."""
+    model = apps.get_model(model_label)
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return 0
+    richtext.prepare(instance, ensure_manifest)
+    fields = richtext.richtext_fields(model)
+    rendered = {
+        name: getattr(instance, name)
+        for field_name in fields
+        for name in (richtext.html_field_name(field_name), richtext.excerpt_field_name(field_name))
+    }
+    # Фильтр по исходному HTML не даст записать результат поверх новой правки.
+    updated = model.objects.filter(pk=pk, **{name: getattr(instance, name) for name in fields}).update(**rendered)
+    if updated:
+        bump_model_version(model)
+    return updated
+
+
+@shared_task
+def rebuild_home_document():
+    # Ключ снимается до сборки: правки, сделанные во время нее, поставят новую.
+    cache.delete(home.PENDING_KEY)
+    document = home.rebuild()
+    logger.info("Документ главной страницы пересобран: %s", document['etag'])
+
 
-        send_message_url = f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/sendMessage"
-        message_data = {
-            "chat_id": settings.TELEGRAM_CHAT_ID,
-            "text": message
-        }
-        response = requests.post(send_message_url, data=message_data)
-        response.raise_for_status()
-        logger.info("Текст уведомления успешно отправлен")
-
-        if file_path:
-            send_document_url = f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/sendDocument"
-            with open(file_path, 'rb') as file:
-                document_data = {
-                    "chat_id": settings.TELEGRAM_CHAT_ID,
-                }
-                files = {"document": file}
-                response = requests.post(send_document_url, data=document_data, files=files)
-                response.raise_for_status()
-            logger.info("Файл успешно отправлен")
-    except Exception as e:
-        logger.error(f"Ошибка отправки уведомления: {e}")
-        raise
\ No newline at end of file
+@shared_task
+def publish_snapshot():
+    cache.delete(snapshots.PENDING_KEY)
+    version, count = snapshots.publish()
+    logger.info("Снимок API %s опубликован: %s файлов", version, count)
+    return version
+
+
+@shared_task
+def benchmark_probe(run_id, index, sent_at, work_ms=0):
+    """Задача-зонд для manage.py benchmark_celery: записывает задержку в очереди и время завершения."""
+    started = time.time()
+    if work_ms:
+        time.sleep(work_ms / 1000)
+    cache.set(f'web:celery-benchmark:{run_id}:{index}', (started - sent_at, time.time()), timeout=60 * 60)
@@ -1,41 +1,56 @@
-from rest_framework import generics, mixins
+from rest_framework import generics, mixins, status
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from .models import Event, Services, Vacancy, Project, Contact, Review, YouTubeShort, About, Gallery, Tools, ContactVacancy
-from .serializers import ServicesSerializer, VacancySerializer, ProjectSerializer, ContactVacancySerializer, ContactSerializer, ReviewSerializer, YouTubeShortSerializer, AboutSerializer, GallerySerializer, ToolsSerializer
-from .utils import send_telegram_notification
+from .models import Event, EventImage, Services, Vacancy, Project, Contact, Review, YouTubeShort, About, Gallery, Tools, ToolImage, ContactVacancy, SearchDocument, Upload
+from .serializers import narrow_queryset, ServicesSerializer, VacancySerializer, ProjectSerializer, ContactVacancySerializer, ContactSerializer, ReviewSerializer, YouTubeShortSerializer, AboutSerializer, GallerySerializer, ToolsSerializer, SearchResultSerializer, UploadSerializer
+from .utils import contact_message, contact_vacancy_message
+from .cache import CachedListMixin, cache_response, is_not_modified
+from .pagination import StandardResultsSetPagination
+from . import exports, home, outbox, phones, replicas, search, uploads
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import permissions
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date, quote_etag
+from django.http import StreamingHttpResponse
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Case, When
 from .models import Event
 from .serializers import EventSerializer
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.parsers import MultiPartParser, FormParser
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.throttling import ScopedRateThrottle
 import logging
 
 
 logger = logging.getLogger(__name__)
 
 
-class StandardResultsSetPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = 'page_size'
-    max_page_size = 100
+class SparseFieldsMixin:
+    """Сужает SELECT списка до колонок полей, которые попадут в ответ (?fields=, ?omit=, ?expand=)."""
+
+    def filter_queryset(self, queryset):
+        return narrow_queryset(super().filter_queryset(queryset), self.get_serializer(many=True))
+
 
 class EventDetailAPIView(APIView):
     permission_classes = [permissions.AllowAny]
+    cache_models = (Event, EventImage)
     parser_classes = [MultiPartParser, FormParser]
 
+    @cache_response()
     def get(self, request, pk):
-        logger.info(f"Получен GET-запрос на /api/events/{pk}/")
-        event = get_object_or_404(Event, pk=pk)
+        logger.info("Получен GET-запрос на /api/events/%s/", pk)
+        event = get_object_or_404(Event.objects.prefetch_related('gallery'), pk=pk)
         serializer = EventSerializer(event)
         return Response(serializer.data)
 
-class EventListAPIView(generics.ListAPIView):
-    queryset = Event.objects.all().order_by('created_at')
+class EventListAPIView(CachedListMixin, SparseFieldsMixin, generics.ListAPIView):
+    cache_models = (Event, EventImage)
+    queryset = Event.objects.prefetch_related('gallery').order_by('created_at')
     serializer_class = EventSerializer
     permission_classes = [permissions.AllowAny]
     pagination_class = StandardResultsSetPagination
@@ -44,15 +59,18 @@ class EventListAPIView(generics.ListAPIView):
 
 class ServicesDetailAPIView(APIView):
     permission_classes = [permissions.AllowAny]
+    cache_models = (Services,)
 
+    @cache_response()
     def get(self, request, pk):
-        logger.info(f"Получен GET-запрос на /api/services/{pk}/")
+        logger.info("Получен GET-запрос на /api/services/%s/", pk)
         service = get_object_or_404(Services, pk=pk)
         serializer = ServicesSerializer(service)
         return Response(serializer.data)
 
 
-class ServicesListAPIView(generics.ListAPIView):
+class ServicesListAPIView(CachedListMixin, SparseFieldsMixin, generics.ListAPIView):
+    cache_models = (Services,)
     queryset = Services.objects.all().order_by('created_at')
     serializer_class = ServicesSerializer
     permission_classes = [permissions.AllowAny]
@@ -62,15 +80,18 @@ class ServicesListAPIView(generics.ListAPIView):
 
 class VacancyDetailAPIView(APIView):
     permission_classes = [permissions.AllowAny]
+    cache_models = (Vacancy,)
 
+    @cache_response()
     def get(self, request, pk):
-        logger.info(f"Получен GET-запрос на /api/vacancies/{pk}/")
+        logger.info("Получен GET-запрос на /api/vacancies/%s/", pk)
         vacancy = get_object_or_404(Vacancy, pk=pk)
         serializer = VacancySerializer(vacancy)
         return Response(serializer.data)
 
 
-class VacancyListAPIView(generics.ListAPIView):
+class VacancyListAPIView(CachedListMixin, SparseFieldsMixin, generics.ListAPIView):
+    cache_models = (Vacancy,)
     queryset = Vacancy.objects.all().order_by('created_at')
     serializer_class = VacancySerializer
     permission_classes = [permissions.AllowAny]
@@ -80,14 +101,17 @@ class VacancyListAPIView(generics.ListAPIView):
 
 class ProjectDetailAPIView(APIView):
     permission_classes = [permissions.AllowAny]
+    cache_models = (Project,)
 
+    @cache_response()
     def get(self, request, pk):
         project = get_object_or_404(Project, pk=pk)
         serializer = ProjectSerializer(project)
         return Response(serializer.data)
 
 
-class ProjectListAPIView(generics.ListAPIView):
+class ProjectListAPIView(CachedListMixin, SparseFieldsMixin, generics.ListAPIView):
+    cache_models = (Project,)
     queryset = Project.objects.all().order_by('created_at')
     serializer_class = ProjectSerializer
     permission_classes = [permissions.AllowAny]
@@ -95,23 +119,69 @@ class ProjectListAPIView(generics.ListAPIView):
     filter_backends = [DjangoFilterBackend]
 
 
-class ProjectFilterView(generics.ListAPIView):
+class ProjectFilterView(CachedListMixin, SparseFieldsMixin, generics.ListAPIView):
+    cache_models = (Project,)
     serializer_class = ProjectSerializer
-    filterset_fields = ['category', 'is_featured']
+    filterset_fields = ['is_featured']
 
     def get_queryset(self):
         return Project.objects.all()
 
 
-class ProjectSearchView(generics.ListAPIView):
+class ProjectSearchView(CachedListMixin, SparseFieldsMixin, generics.ListAPIView):
+    cache_models = (Project, SearchDocument)
     serializer_class = ProjectSerializer
 
     def get_queryset(self):
-        query = self.request.query_params.get('q', '')
-        return Project.objects.filter(title__icontains=query)
+        query = self.request.query_params.get('q', '').strip()
+        if not query:
+            return Project.objects.all().order_by('created_at')
+        ids = search.ranked_object_ids(query, 'project')
+        ordering = Case(*[When(pk=pk, then=position) for position, pk in enumerate(ids)], default=len(ids))
+        return Project.objects.filter(pk__in=ids).order_by(ordering)
+
+
+class HomeAPIView(APIView):
+    """Все секции главной страницы одним ответом из заранее собранного документа."""
+    permission_classes = [permissions.AllowAny]
+
+    @swagger_auto_schema(
+        operation_description="Секции лендинга: о компании, услуги, избранные и последние проекты, отзывы, "
+                              "YouTube Shorts, инструменты, галерея и открытые вакансии",
+    )
+    def get(self, request):
+        document = home.get_document()
+        headers = {'ETag': quote_etag(document['etag']), 'Last-Modified': http_date(document['built_at'])}
+        if is_not_modified(request, document['etag'], document['built_at']):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(document['data'], headers=headers)
+
+
+class SearchView(CachedListMixin, generics.ListAPIView):
+    cache_models = (SearchDocument,)
+    serializer_class = SearchResultSerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = StandardResultsSetPagination
+
+    @swagger_auto_schema(
+        operation_description="Полнотекстовый поиск по проектам, услугам, мероприятиям, вакансиям и инструментам",
+        manual_parameters=[
+            openapi.Parameter('q', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='Поисковый запрос', required=True),
+            openapi.Parameter('type', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='Типы через запятую: project, service, event, vacancy, tool', required=False),
+        ],
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def get_queryset(self):
+        query = self.request.query_params.get('q', '').strip()
+        if not query:
+            return SearchDocument.objects.none()
+        kinds = [kind for kind in self.request.query_params.get('type', '').split(',') if kind in search.SEARCHABLE]
+        return search.search(query, kinds)
 
 
-class ContactCreateView(mixins.ListModelMixin, generics.CreateAPIView):
+class ContactCreateView(SparseFieldsMixin, mixins.ListModelMixin, generics.CreateAPIView):
     queryset = Contact.objects.all().order_by('created_at')
     serializer_class = ContactSerializer
     parser_classes = [MultiPartParser, FormParser]
@@ -132,6 +202,7 @@ class ContactCreateView(mixins.ListModelMixin, generics.CreateAPIView):
             openapi.Parameter('email', openapi.IN_FORM, type=openapi.TYPE_STRING, description='Email (опционально)', required=False),
             openapi.Parameter('message', openapi.IN_FORM, type=openapi.TYPE_STRING, description='Сообщение', required=True),
             openapi.Parameter('file', openapi.IN_FORM, type=openapi.TYPE_FILE, description='Прикрепленный файл (опционально)', required=False),
+            openapi.Parameter('upload_id', openapi.IN_FORM, type=openapi.TYPE_STRING, description='ID завершенной загрузки из /api/uploads/ вместо файла (опционально)', required=False),
             openapi.Parameter('phone', openapi.IN_FORM, type=openapi.TYPE_STRING, description='Номер телефона (начинается с +996, обязателен)', required=True),
         ],
         responses={
@@ -140,18 +211,15 @@ class ContactCreateView(mixins.ListModelMixin, generics.CreateAPIView):
         }
     )
     def post(self, request, *args, **kwargs):
-        logger.info(f"Получен POST-запрос на /api/contacts/ с данными: {request.data}")
+        uploads.check_content_length(request, settings.CONTACT_FORM_MAX_SIZE)
         return super().post(request, *args, **kwargs)
 
     def perform_create(self, serializer):
-        contact = serializer.save()
-        logger.info(f"Создана новая заявка: {contact} 🌟")
-        message = f"Новая заявка на консультацию! 🎉\nИмя: {contact.name} 😊\nEmail: {contact.email or 'Не указан'} 📧\nСообщение: {contact.message} 💬\nТелефон: {contact.phone} 📞\nДата: {contact.created_at} 🕒"
-        file_path = contact.file.path if contact.file else None
-        logger.info(f"Отправка уведомления с файлом: {file_path} 📤")
-        send_telegram_notification.delay(message, file_path)
-
-class YouTubeShortListAPIView(generics.ListAPIView):
+        contact = outbox.save_with_notification(serializer, contact_message)
+        logger.info("Создана заявка %s", contact.pk)
+
+class YouTubeShortListAPIView(CachedListMixin, SparseFieldsMixin, generics.ListAPIView):
+    cache_models = (YouTubeShort,)
     queryset = YouTubeShort.objects.all().order_by('created_at')
     serializer_class = YouTubeShortSerializer
     permission_classes = [permissions.AllowAny]
@@ -159,8 +227,9 @@ class YouTubeShortListAPIView(generics.ListAPIView):
     filter_backends = [DjangoFilterBackend]
 
 
-class ReviewListCreateView(generics.ListCreateAPIView):
-    queryset = Review.objects.all().order_by('created_at')
+class ReviewListCreateView(CachedListMixin, SparseFieldsMixin, generics.ListCreateAPIView):
+    cache_models = (Review, User)
+    queryset = Review.objects.select_related('author').order_by('created_at')
     serializer_class = ReviewSerializer
     permission_classes = [permissions.AllowAny]
     pagination_class = StandardResultsSetPagination
@@ -170,8 +239,9 @@ class ReviewListCreateView(generics.ListCreateAPIView):
         serializer.save(author=user)
 
 
-class GalleryListAPIView(generics.ListAPIView):
-    queryset = Gallery.objects.all().order_by('created_at')
+class GalleryListAPIView(CachedListMixin, SparseFieldsMixin, generics.ListAPIView):
+    cache_models = (Gallery, Services, Project)
+    queryset = Gallery.objects.select_related('related_service', 'related_project').order_by('created_at')
     serializer_class = GallerySerializer
     permission_classes = [permissions.AllowAny]
     pagination_class = StandardResultsSetPagination
@@ -179,29 +249,33 @@ class GalleryListAPIView(generics.ListAPIView):
 
 class ToolsDetailAPIView(APIView):
     permission_classes = [permissions.AllowAny]
+    cache_models = (Tools, ToolImage)
 
-    def get(self, request, slug):
-        logger.info(f"Получен GET-запрос на /api/directions/{slug}/")
-        tool = get_object_or_404(Tools, slug=slug)
+    @cache_response()
+    def get(self, request, pk):
+        logger.info("Получен GET-запрос на /api/tools/%s/", pk)
+        tool = get_object_or_404(Tools.objects.prefetch_related('images'), pk=pk)
         serializer = ToolsSerializer(tool)
         return Response(serializer.data)
 
-class ToolsListAPIView(generics.ListAPIView):
-    queryset = Tools.objects.all().order_by('created_at')
+class ToolsListAPIView(CachedListMixin, SparseFieldsMixin, generics.ListAPIView):
+    cache_models = (Tools, ToolImage)
+    queryset = Tools.objects.prefetch_related('images').order_by('created_at')
     serializer_class = ToolsSerializer
     permission_classes = [permissions.AllowAny]
     pagination_class = StandardResultsSetPagination
     filter_backends = [DjangoFilterBackend]
 
 
-class AboutListAPIView(generics.ListAPIView):
+class AboutListAPIView(CachedListMixin, SparseFieldsMixin, generics.ListAPIView):
+    cache_models = (About,)
     queryset = About.objects.all().order_by('created_at')
     serializer_class = AboutSerializer
     permission_classes = [permissions.AllowAny]
 
 
 
-class ContactVacancyCreateView(mixins.ListModelMixin, generics.CreateAPIView):
+class ContactVacancyCreateView(SparseFieldsMixin, mixins.ListModelMixin, generics.CreateAPIView):
     queryset = ContactVacancy.objects.all().order_by('created_at')
     serializer_class = ContactVacancySerializer
     parser_classes = [MultiPartParser, FormParser]
@@ -229,6 +303,7 @@ class ContactVacancyCreateView(mixins.ListModelMixin, generics.CreateAPIView):
                 format=openapi.FORMAT_URI
             ),
             openapi.Parameter('file', openapi.IN_FORM, type=openapi.TYPE_FILE, description='Прикрепленный файл (опционально)', required=False),
+            openapi.Parameter('upload_id', openapi.IN_FORM, type=openapi.TYPE_STRING, description='ID завершенной загрузки из /api/uploads/ вместо файла (опционально)', required=False),
             openapi.Parameter('phone', openapi.IN_FORM, type=openapi.TYPE_STRING, description='Номер телефона (начинается с +996, обязателен)', required=True),
         ],
         responses={
@@ -237,13 +312,142 @@ class ContactVacancyCreateView(mixins.ListModelMixin, generics.CreateAPIView):
         }
     )
     def post(self, request, *args, **kwargs):
-        logger.info(f"Получен POST-запрос на /api/contact_vacancy/ с данными: {request.data}")
+        uploads.check_content_length(request, settings.CONTACT_FORM_MAX_SIZE)
         return super().post(request, *args, **kwargs)
 
     def perform_create(self, serializer):
-        contact = serializer.save()
-        logger.info(f"Создана новая заявка: {contact} ✨")
-        message = f"Новая заявка на вакансию! 🚀\nИмя: {contact.name} 😊\nEmail: {contact.email} 📧\nСсылка на соцсеть: {contact.link} 🔗\nТелефон: {contact.phone} 📞\nДата: {contact.created_at} 🕒"
-        file_path = contact.file.path if contact.file else None
-        logger.info(f"Отправка уведомления с файлом: {file_path} 📤")
-        send_telegram_notification.delay(message, file_path)
+        contact = outbox.save_with_notification(serializer, contact_vacancy_message)
+        logger.info("Создана заявка на вакансию %s", contact.pk)
+
+
+class SubmissionExportView(APIView):
+    """Потоковая выгрузка заявок в CSV/NDJSON для отдела продаж."""
+    permission_classes = [permissions.IsAdminUser]
+    renderer_classes = [exports.CSVRenderer, exports.NDJSONRenderer]
+    export_kind = None
+
+    @swagger_auto_schema(
+        operation_description="Выгрузить заявки целиком (CSV или NDJSON), при необходимости сжатые gzip",
+        manual_parameters=[
+            openapi.Parameter('format', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='csv (по умолчанию) или ndjson', required=False),
+            openapi.Parameter('date_from', openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE, description='Начальная дата включительно', required=False),
+            openapi.Parameter('date_to', openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE, description='Конечная дата включительно', required=False),
+            openapi.Parameter('gzip', openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN, description='Сжать выгрузку gzip', required=False),
+        ],
+    )
+    def get(self, request):
+        export_format = request.accepted_renderer.format
+        compress = request.query_params.get('gzip', '').lower() in ('1', 'true')
+        fields, rows = exports.export_queryset(
+            self.export_kind, request.query_params.get('date_from'), request.query_params.get('date_to'),
+        )
+        logger.info("Выгрузка %s в формате %s", self.export_kind, export_format)
+
+        response = StreamingHttpResponse(
+            exports.iter_export(fields, rows, export_format, compress),
+            content_type='application/gzip' if compress else request.accepted_renderer.media_type + '; charset=utf-8',
+        )
+        filename = exports.export_filename(self.export_kind, export_format, compress)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class UploadCreateView(generics.CreateAPIView):
+    """
+    Начинает загрузку вложения частями: клиент объявляет имя и размер файла,
+    затем отправляет части PATCH-запросами на /api/uploads/<id>/.
+    """
+    queryset = Upload.objects.all()
+    serializer_class = UploadSerializer
+    permission_classes = [permissions.AllowAny]
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'uploads'
+
+    def perform_create(self, serializer):
+        uploads.check_pending_quota(serializer.validated_data['size'])
+        serializer.save()
+
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        response['Location'] = reverse('upload_detail', args=[response.data['id']])
+        response['Upload-Offset'] = '0'
+        return response
+
+
+class UploadDetailAPIView(replicas.PrimaryReadsMixin, APIView):
+    """
+    Протокол в духе tus: HEAD возвращает текущее смещение для возобновления,
+    PATCH с заголовком Upload-Offset дописывает сырое тело запроса. Часть,
+    выходящая за объявленный размер, отклоняется по Content-Length до чтения.
+    Смещение читается из default: с реплики оно может отставать от PATCH.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def upload_headers(self, upload):
+        return {'Upload-Offset': str(upload.offset), 'Upload-Length': str(upload.size)}
+
+    def head(self, request, pk):
+        upload = get_object_or_404(Upload, pk=pk)
+        return Response(headers=self.upload_headers(upload))
+
+    @swagger_auto_schema(
+        operation_description="Дописать часть файла",
+        manual_parameters=[
+            openapi.Parameter('Upload-Offset', openapi.IN_HEADER, type=openapi.TYPE_INTEGER, description='Смещение части в байтах', required=True),
+        ],
+        responses={204: 'Часть принята', 409: 'Смещение не совпадает', 413: 'Превышен объявленный размер'},
+    )
+    def patch(self, request, pk):
+        length = uploads.content_length(request)
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+        except ValueError:
+            return Response({'detail': "Требуется заголовок Upload-Offset"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Медленная часть пишется на диск без открытой транзакции; смещение
+        # сдвигается одним условным UPDATE, который проверяет, что его никто
+        # не сдвинул раньше.
+        with uploads.chunk_lock(pk):
+            upload = get_object_or_404(Upload, pk=pk)
+            if upload.is_complete or offset != upload.offset:
+                raise uploads.OffsetMismatch()
+            uploads.check_content_length(request, upload.size - upload.offset)
+
+            upload.offset = uploads.append_chunk(upload, request.stream, length) if length else upload.offset
+            if upload.offset == upload.size:
+                uploads.finalize(upload)
+            moved = Upload.objects.filter(pk=upload.pk, offset=offset).update(
+                offset=upload.offset, file=upload.file.name, updated_at=timezone.now(),
+            )
+            if not moved:
+                raise uploads.OffsetMismatch()
+
+        logger.info("Загрузка %s: %s из %s байт", upload.pk, upload.offset, upload.size)
+        return Response(status=status.HTTP_204_NO_CONTENT, headers=self.upload_headers(upload))
+
+
+class PhoneValidationView(APIView):
+    """Пакетная нормализация номеров для импорта списков лидов."""
+    permission_classes = [permissions.IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description="Проверить и нормализовать список номеров телефонов",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            required=['phones'],
+            properties={'phones': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_STRING))},
+        ),
+    )
+    def post(self, request):
+        numbers = request.data.get('phones')
+        if not isinstance(numbers, list):
+            return Response({'phones': "Ожидается список номеров"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(numbers) > settings.PHONE_BULK_LIMIT:
+            return Response({'phones': f"Не больше {settings.PHONE_BULK_LIMIT} номеров за запрос"}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = phones.normalize_many(numbers)
+        return Response({
+            'valid': sum(1 for result in results if result['error'] is None),
+            'invalid': sum(1 for result in results if result['error'] is not None),
+            'results': results,
+        })